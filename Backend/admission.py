@@ -0,0 +1,185 @@
+# backend/admission.py
+# Contrôle d'admission devant l'inférence, par direction.
+# Sans limite, une rafale de requêtes s'empile dans les files des micro-batchers : les
+# dernières attendent plus longtemps que leur client, qui abandonne, et le CPU traduit
+# quand même des textes que plus personne n'attend. Ici, pour chaque direction :
+#   - le nombre de segments admis (en file ou en cours) est borné : au-delà, la requête
+#     est refusée tout de suite (429 + Retry-After) ;
+#   - le nombre de batches exécutés en même temps est borné (sémaphore partagé par les
+#     micro-batchers de tous les profils de la direction) ;
+#   - chaque segment a une échéance : deadline_ms du client, sinon INFERENCE_QUEUE_TIMEOUT_MS
+#     après son admission. Une requête dont l'attente estimée dépasse déjà l'échéance est
+#     refusée (503 + Retry-After), et un segment qui n'a plus le temps d'être traduit quand
+#     vient son tour est retiré du batch avant model.generate.
+# L'attente est estimée à partir de la durée moyenne (EWMA) d'un segment dans un batch.
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import ADMISSIONS
+
+# Poids de la dernière mesure dans la moyenne glissante de la durée par segment
+_EWMA_ALPHA = 0.2
+
+
+class OverloadedError(Exception):
+    """Requête refusée avant d'atteindre le modèle (`status_code`, `retry_after` en secondes)."""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class QueueFullError(OverloadedError):
+    """La file d'inférence de la direction est pleine."""
+
+    status_code = 429
+
+
+class DeadlineUnreachableError(OverloadedError):
+    """L'échéance de la requête ne peut plus être tenue."""
+
+    status_code = 503
+
+
+class DirectionGate:
+    """File bornée et limite de concurrence d'une direction."""
+
+    def __init__(self, name, max_pending=256, max_concurrency=1, queue_timeout=30.0, min_generate_seconds=0.05):
+        self.name = name
+        self.max_pending = max(1, int(max_pending))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.queue_timeout = queue_timeout
+        self.min_generate_seconds = min_generate_seconds
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.item_seconds = None
+
+    def expires_at(self, deadline=None):
+        """Échéance d'un segment admis maintenant (time.monotonic())."""
+        return deadline if deadline is not None else time.monotonic() + self.queue_timeout
+
+    def _estimated_wait_locked(self):
+        return (self.pending * (self.item_seconds or 0.0)) / self.max_concurrency
+
+    def estimated_wait(self):
+        """Attente estimée (secondes) d'un segment admis maintenant avant son passage dans le modèle."""
+        with self._lock:
+            return self._estimated_wait_locked()
+
+    def admit(self, count, expires_at=None):
+        """Réserve `count` places dans la file, ou lève QueueFullError / DeadlineUnreachableError.
+
+        Une requête plus grosse que la file entière reste admise quand la direction est
+        inactive, pour ne pas être refusée indéfiniment.
+        """
+        with self._lock:
+            wait = self._estimated_wait_locked()
+            if self.pending and self.pending + count > self.max_pending:
+                ADMISSIONS.inc(count, direction=self.name, result="queue_full")
+                raise QueueFullError(
+                    f"File d'inférence pleine pour '{self.name}' ({self.pending} segments en attente).", wait
+                )
+            if expires_at is not None and time.monotonic() + wait + self.min_generate_seconds > expires_at:
+                ADMISSIONS.inc(count, direction=self.name, result="deadline")
+                raise DeadlineUnreachableError(
+                    f"L'attente estimée pour '{self.name}' ({wait:.1f} s) dépasse l'échéance de la requête.", wait
+                )
+            self.pending += count
+        ADMISSIONS.inc(count, direction=self.name, result="admitted")
+
+    def release(self, count=1):
+        with self._lock:
+            self.pending = max(0, self.pending - count)
+
+    def should_drop(self, expires_at):
+        """Vrai si un segment n'a plus le temps d'être traduit avant son échéance."""
+        return expires_at is not None and expires_at - time.monotonic() < self.min_generate_seconds
+
+    def drop(self, count=1):
+        ADMISSIONS.inc(count, direction=self.name, result="dropped")
+
+    @contextmanager
+    def slot(self, expires_at=None):
+        """Occupe une des `max_concurrency` places d'exécution de la direction.
+
+        Avec `expires_at`, l'attente d'une place est bornée par l'échéance.
+        """
+        timeout = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+        if not self._slots.acquire(timeout=timeout):
+            self.drop()
+            raise DeadlineUnreachableError(
+                f"Aucune place d'inférence libérée pour '{self.name}' avant l'échéance.", self.estimated_wait()
+            )
+        with self._lock:
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._slots.release()
+
+    def observe(self, seconds, items):
+        """Met à jour la durée moyenne par segment après un batch de `items` segments."""
+        if items <= 0:
+            return
+        with self._lock:
+            value = seconds / items
+            self.item_seconds = value if self.item_seconds is None else (
+                _EWMA_ALPHA * value + (1 - _EWMA_ALPHA) * self.item_seconds
+            )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "running": self.running,
+                "maxPending": self.max_pending,
+                "maxConcurrency": self.max_concurrency,
+                "itemSeconds": round(self.item_seconds, 4) if self.item_seconds is not None else None,
+                "estimatedWaitSeconds": round(self._estimated_wait_locked(), 3),
+            }
+
+
+class AdmissionController:
+    """Crée et garde un DirectionGate par direction (clé de MODEL_CONFIGS)."""
+
+    def __init__(self):
+        self.max_pending = 256
+        self.max_concurrency = 1
+        self.queue_timeout = 30.0
+        self.min_generate_seconds = 0.05
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_pending = app.config.get("INFERENCE_MAX_PENDING_PER_DIRECTION", self.max_pending)
+        # Par défaut, un batch à la fois par worker d'inférence (1 dans le processus web)
+        self.max_concurrency = app.config.get("INFERENCE_MAX_CONCURRENCY_PER_DIRECTION") or max(
+            1, app.config.get("INFERENCE_WORKERS", 0)
+        )
+        self.queue_timeout = app.config.get("INFERENCE_QUEUE_TIMEOUT_MS", self.queue_timeout * 1000) / 1000.0
+        self.min_generate_seconds = app.config.get("INFERENCE_MIN_GENERATE_MS", self.min_generate_seconds * 1000) / 1000.0
+
+    def gate(self, direction):
+        with self._lock:
+            gate = self._gates.get(direction)
+            if gate is None:
+                gate = self._gates[direction] = DirectionGate(
+                    direction, self.max_pending, self.max_concurrency, self.queue_timeout, self.min_generate_seconds
+                )
+            return gate
+
+    def stats(self):
+        with self._lock:
+            gates = dict(self._gates)
+        return {direction: gate.stats() for direction, gate in gates.items()}
+
+
+admission_controller = AdmissionController()
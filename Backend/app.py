@@ -2,17 +2,35 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
-from models import db, bcrypt, jwt
+from models import db, bcrypt, jwt, Translation
+from translation_cache import translation_cache
+from translation_memory import translation_memory
+from jobs import job_manager
+from worker_pool import inference_worker_pool
+from admission import admission_controller
+from model_registry import model_registry
+from history_writer import configure_sqlite_engine, history_writer
+import metrics
+import atexit
 
 
-def create_app():
+def create_app(preload_models=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if preload_models is not None:
+        app.config["PRELOAD_MODELS"] = preload_models
 
     db.init_app(app)
+    # Latence par route et par étape, servie sur /metrics (format Prometheus)
+    metrics.init_app(app)
     jwt.init_app(app)
     bcrypt.init_app(app)
-    CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}})
+    CORS(
+        app,
+        resources={r"/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}},
+        # Curseur de la page suivante et validateur de l'historique paginé
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
 
     from routes.auth import auth_bp
     from routes.translation import translation_bp
@@ -22,17 +40,54 @@ def create_app():
 
     # --- AJOUTEZ CECI POUR CRÉER LES TABLES LORSQUE L'APP DÉMARRE (en dev) ---
     with app.app_context():
+        if app.config.get("SQLITE_WAL_ENABLED", True):
+            configure_sqlite_engine(db.engine)
         db.create_all() # Crée les tables définies dans models.py si elles n'existent pas
+        # create_all n'ajoute pas les nouveaux index aux tables existantes
+        for index in Translation.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
     # ----------------------------------------------------------------------
 
+    # Cache des traductions, préchargé avec les sources les plus fréquentes de l'historique
+    translation_cache.init_app(app)
+    # Mémoire de traduction (corrections utilisateurs), construite en arrière-plan
+    translation_memory.init_app(app)
+    job_manager.init_app(app)
+    # Historique : les requêtes concurrentes partagent un commit (group commit)
+    history_writer.init_app(app)
+    model_registry.init_app(app)
+    inference_worker_pool.init_app(app)
+    atexit.register(inference_worker_pool.shutdown)
+    # File bornée et limite de concurrence par direction devant l'inférence
+    admission_controller.init_app(app)
+
+    # Chargement + préchauffage de tous les modèles en arrière-plan : /api/ready
+    # renvoie 503 tant qu'ils ne sont pas prêts (les pods froids ne reçoivent pas de trafic)
+    if app.config.get("PRELOAD_MODELS"):
+        if inference_worker_pool.enabled:
+            # Chaque worker charge ses modèles au démarrage
+            inference_worker_pool.start()
+        else:
+            from inference import preload_all_models
+            preload_all_models(wait=False)
+
     try:
-        from cli_commands import db_cli, run_server
+        from cli_commands import (
+            db_cli, run_server, export_model, check_parity_command, translate_file_command, preprocess_corpus_command,
+            prune_vocab_command, evaluate_profiles_command,
+        )
         @app.cli.command("db")
         def db_command():
             """Run database commands."""
             db_cli()
 
         app.cli.add_command(run_server)
+        app.cli.add_command(export_model)
+        app.cli.add_command(check_parity_command)
+        app.cli.add_command(translate_file_command)
+        app.cli.add_command(preprocess_corpus_command)
+        app.cli.add_command(prune_vocab_command)
+        app.cli.add_command(evaluate_profiles_command)
     except ImportError:
         print("Avertissement: cli_commands.py non trouvé ou ne contient pas les commandes attendues.")
         print("Les commandes 'flask db' et 'flask run_server' ne seront pas disponibles.")
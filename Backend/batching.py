@@ -0,0 +1,191 @@
+# backend/batching.py
+# Micro-batching dynamique devant model.generate.
+# Les requêtes d'une même direction (entrée de MODEL_CONFIGS) sont regroupées
+# pendant une courte fenêtre, puis traduites en un seul appel batch (padding),
+# ce qui remplit beaucoup mieux les multiplications matricielles sur CPU.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from admission import DeadlineUnreachableError
+from metrics import BATCH_SIZE, STAGE_SECONDS, stage
+
+# Dans un même lot, une échéance plus de DEADLINE_GROUP_RATIO fois plus lointaine que la
+# plus proche part dans un lot séparé : elle n'est pas coupée par celle de ses voisins.
+DEADLINE_GROUP_RATIO = 2.0
+
+
+class _PendingItem:
+    __slots__ = ("text", "future", "enqueued_at", "deadline", "expires_at")
+
+    def __init__(self, text, deadline=None, expires_at=None):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.deadline = deadline
+        self.expires_at = expires_at
+
+
+class MicroBatcher:
+    """Collecte les textes soumis et les passe par lots à `batch_fn`.
+
+    `batch_fn(textes, échéance)` doit renvoyer la liste des traductions dans le
+    même ordre ; l'échéance (time.monotonic(), ou None) est la plus proche de
+    celles des requêtes du lot. Les textes collectés sont d'abord répartis par
+    échéance (voir _deadline_groups) : un texte sans échéance n'est jamais
+    coupé par celle d'un voisin. Un lot part dès que `max_batch_size`
+    requêtes sont en attente ou que `max_wait_ms` est écoulé depuis la
+    première requête du lot. `concurrency` fixe le nombre de lots pouvant être
+    exécutés en même temps (un par worker d'inférence, 1 dans le processus web).
+
+    Avec un `gate` (admission.DirectionGate), les soumissions sont admises (ou
+    refusées) par la file bornée de la direction, chaque lot occupe une place
+    d'exécution de la direction et les textes qui n'ont plus le temps d'être
+    traduits sont retirés du lot avant `batch_fn`.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=16, max_wait_ms=10.0, concurrency=1, gate=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.gate = gate
+        self._queue = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"batcher-{name}-{index}", daemon=True)
+            for index in range(max(1, int(concurrency)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, text, deadline=None):
+        """Ajoute un texte à la file et renvoie un Future résolu avec sa traduction."""
+        return self.submit_many([text], deadline)[0]
+
+    def submit_many(self, texts, deadline=None):
+        """Ajoute plusieurs textes (ex. les segments d'une même requête) à la file.
+
+        Lève admission.OverloadedError si le gate refuse la requête : rien n'est alors mis en file.
+        """
+        expires_at = None
+        if self.gate is not None:
+            expires_at = self.gate.expires_at(deadline)
+            self.gate.admit(len(texts), expires_at)
+        items = [_PendingItem(text, deadline, expires_at) for text in texts]
+        for item in items:
+            self._queue.put(item)
+        return [item.future for item in items]
+
+    def translate(self, text, timeout=None, deadline=None):
+        """Version bloquante de `submit` utilisée par les routes Flask."""
+        return self.submit(text, deadline).result(timeout=timeout)
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drop_expired(self, batch):
+        """Retire du lot (en échec) les textes qui ne peuvent plus tenir leur échéance."""
+        kept = []
+        for item in batch:
+            if self.gate.should_drop(item.expires_at):
+                item.future.set_exception(DeadlineUnreachableError(
+                    f"Échéance dépassée dans la file d'inférence '{self.name}'.", self.gate.estimated_wait()
+                ))
+            else:
+                kept.append(item)
+        dropped = len(batch) - len(kept)
+        if dropped:
+            self.gate.drop(dropped)
+            self.gate.release(dropped)
+        return kept
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if self.gate is None:
+                for group in _deadline_groups(batch):
+                    self._execute(group)
+                continue
+            batch = self._drop_expired(batch)
+            if not batch:
+                continue
+            with self.gate.slot():
+                for group in _deadline_groups(batch):
+                    # L'attente d'une place (ou les lots précédents) a pu faire expirer d'autres textes
+                    group = self._drop_expired(group)
+                    if group:
+                        self._execute(group)
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        for item in batch:
+            STAGE_SECONDS.observe(started - item.enqueued_at, stage="queue_wait", direction=self.name)
+        BATCH_SIZE.observe(len(batch), direction=self.name)
+        deadlines = [item.deadline for item in batch if item.deadline is not None]
+        try:
+            with stage("batch", self.name):
+                results = self.batch_fn([item.text for item in batch], min(deadlines) if deadlines else None)
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Le batch '{self.name}' a renvoyé {len(results)} résultats pour {len(batch)} textes."
+                )
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+            return
+        finally:
+            if self.gate is not None:
+                self.gate.observe(time.perf_counter() - started, len(batch))
+                self.gate.release(len(batch))
+
+        for item, result in zip(batch, results):
+            item.future.set_result(result)
+
+
+def _deadline_groups(batch):
+    """Répartit un lot en sous-lots d'échéances voisines, les plus urgents d'abord.
+
+    Les textes sans échéance forment un sous-lot à part (exécuté en dernier, sans
+    max_time) ; les autres, triés par échéance, changent de sous-lot dès que le temps
+    restant dépasse DEADLINE_GROUP_RATIO fois celui du premier texte du sous-lot.
+    """
+    now = time.monotonic()
+    groups = []
+    group_remaining = None
+    for item in sorted((item for item in batch if item.deadline is not None), key=lambda item: item.deadline):
+        remaining = max(0.0, item.deadline - now)
+        if not groups or remaining > DEADLINE_GROUP_RATIO * group_remaining:
+            groups.append([])
+            group_remaining = max(remaining, 1e-3)
+        groups[-1].append(item)
+    without_deadline = [item for item in batch if item.deadline is None]
+    if without_deadline:
+        groups.append(without_deadline)
+    return groups
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name, batch_fn, max_batch_size=16, max_wait_ms=10.0, concurrency=1, gate=None):
+    """Renvoie le MicroBatcher associé à `name`, en le créant au premier appel."""
+    with _batchers_lock:
+        batcher = _batchers.get(name)
+        if batcher is None:
+            batcher = MicroBatcher(
+                name, batch_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, concurrency=concurrency,
+                gate=gate
+            )
+            _batchers[name] = batcher
+        return batcher
@@ -0,0 +1,84 @@
+# backend/benchmarks/history_benchmark.py
+# Compare l'écriture de l'historique avec un commit par requête (HISTORY_GROUP_COMMIT=false)
+# et avec le group commit de history_writer.py, sur une base SQLite temporaire (WAL,
+# mêmes pragmas que le serveur). Chaque "requête" enregistre une ligne, comme /translate ;
+# la phase concurrency=1 vérifie qu'une requête seule n'attend pas plus qu'avec un
+# commit par requête.
+#
+# Usage (depuis Backend/) :
+#   python benchmarks/history_benchmark.py --requests 2000 --concurrency 1,8,32
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(writer, user_id, requests, concurrency):
+    from load_test import percentile
+
+    def save(index):
+        started = time.perf_counter()
+        writer.enqueue(user_id=user_id, source_text=f"phrase {index}", translated_text=f"traduction {index}",
+                       from_lang="fr", to_lang="ar-TD")
+        return time.perf_counter() - started
+
+    flushes = writer.flushes
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="history-bench") as executor:
+        latencies = sorted(executor.map(save, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "p50Ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95Ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "rowsPerSecond": round(requests / wall, 1),
+        "commits": writer.flushes - flushes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commit par requête contre group commit pour l'historique.")
+    parser.add_argument("--requests", type=int, default=2000, help="Lignes écrites par phase.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Requêtes simultanées, séparées par des virgules.")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="history-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["PRELOAD_MODELS"] = "false"
+    os.environ["TRANSLATION_CACHE_WARMUP_SIZE"] = "0"
+
+    from app import create_app
+    from history_writer import HistoryWriter
+    from models import User, db
+
+    app = create_app(preload_models=False)
+    with app.app_context():
+        user = User(email="benchmark@example.com")
+        user.set_password("benchmark")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    report = {}
+    for concurrency in (int(value) for value in args.concurrency.split(",") if value.strip()):
+        for mode, enabled in (("per_request", False), ("group_commit", True)):
+            writer = HistoryWriter(enabled=enabled)
+            writer.init_app(app)
+            writer.enabled = enabled
+            result = run(writer, user_id, args.requests, concurrency)
+            report.setdefault(mode, []).append(result)
+            print(f"{mode}: {json.dumps(result)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# backend/benchmarks/load_test.py
+# Test de charge hors ligne du backend Flask, exécuté dans le processus (client de test).
+# Les modèles de MODEL_CONFIGS sont remplacés par un petit modèle NLLB aléatoire construit
+# localement (tiny_model.py) : aucun accès réseau, aucun téléchargement Hugging Face.
+# Les phrases de modele_dataset/mini_dataset sont rejouées avec `--concurrency` requêtes
+# simultanées sur /api/translate, /api/get_translations et /api/save_correction ; le
+# rapport (p50/p95/p99, requêtes/s, pic de RSS) est écrit en JSON et peut être comparé
+# à un rapport de référence (--baseline) pour détecter une régression.
+#
+# Usage (depuis Backend/) :
+#   python benchmarks/load_test.py --requests 200 --concurrency 8 --output bench.json
+#   python benchmarks/load_test.py --baseline bench.json --tolerance 0.2
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ("translate", "get_translations", "save_correction")
+
+
+def percentile(sorted_values, fraction):
+    """Percentile par rang le plus proche d'une liste triée."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class RssSampler:
+    """Relève la mémoire résidente du processus (Linux : /proc/self/statm) pendant une phase."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    @staticmethod
+    def current_bytes():
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # Autres systèmes : pic depuis le démarrage (octets sur macOS, Ko sous Linux)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+
+def load_sentences(limit):
+    """(phrases françaises, phrases arabe tchadien) de mini_dataset, `limit` de chaque."""
+    dataset_dir = os.path.join(BACKEND_DIR, "..", "modele_dataset", "mini_dataset")
+    sentences = {}
+    for lang, file_name in (("fr", "for_dataset_fr.txt"), ("ar-TD", "for_dataset_arb.txt")):
+        with open(os.path.join(dataset_dir, file_name), encoding="utf-8") as dataset_file:
+            lines = [line.strip() for line in dataset_file if line.strip()]
+        step = max(1, len(lines) // max(1, limit))
+        sentences[lang] = lines[::step][:limit]
+    return sentences
+
+
+def run_phase(name, calls, concurrency, make_client):
+    """Exécute les appels `calls` (fonctions client -> statut HTTP) avec `concurrency` threads."""
+    local = threading.local()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(call):
+        nonlocal errors
+        if not hasattr(local, "client"):
+            local.client = make_client()
+        started = time.perf_counter()
+        try:
+            status = call(local.client)
+        except Exception as e:
+            print(f"[{name}] erreur : {e}")
+            status = None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status is None or status >= 400:
+                errors += 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"load-{name}") as executor:
+            list(executor.map(timed, calls))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50Ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95Ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99Ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "meanMs": round(sum(latencies) / len(latencies) * 1000, 3),
+        "requestsPerSecond": round(len(latencies) / wall, 2) if wall else None,
+        "peakRssMb": round(rss.peak_bytes / (1024 * 1024), 1),
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Liste des régressions : p95 plus lent ou débit plus faible que la référence de plus de `tolerance`."""
+    regressions = []
+    for endpoint, current in report["endpoints"].items():
+        reference = baseline.get("endpoints", {}).get(endpoint)
+        if not reference:
+            continue
+        if current["p95Ms"] > reference["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {current['p95Ms']} ms > {reference['p95Ms']} ms (référence)")
+        if current["requestsPerSecond"] < reference["requestsPerSecond"] * (1 - tolerance):
+            regressions.append(
+                f"{endpoint}: {current['requestsPerSecond']} req/s < {reference['requestsPerSecond']} req/s (référence)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge hors ligne du backend (modèle NLLB miniature).")
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes par route.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requêtes simultanées.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Routes à mesurer, séparées par des virgules.")
+    parser.add_argument("--with-cache", action="store_true",
+                        help="Garde le cache et la mémoire de traduction (par défaut désactivés : chaque requête passe par le modèle).")
+    parser.add_argument("--model-dir", default=os.path.join(tempfile.gettempdir(), "nllb-tiny-benchmark"),
+                        help="Dossier du modèle miniature (construit au premier lancement puis réutilisé).")
+    parser.add_argument("--output", default=None, help="Fichier JSON du rapport.")
+    parser.add_argument("--baseline", default=None, help="Rapport JSON de référence à comparer.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Régression tolérée (0.2 = 20 %%).")
+    args = parser.parse_args()
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+
+    tmp_dir = tempfile.mkdtemp(prefix="load-test-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["PRELOAD_MODELS"] = "false"
+    os.environ["MODEL_REGISTRY_FILE"] = ""
+    if not args.with_cache:
+        os.environ["TRANSLATION_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["TRANSLATION_CACHE_WARMUP_SIZE"] = "0"
+        os.environ["TRANSLATION_MEMORY_ENABLED"] = "false"
+
+    import inference
+    from tiny_model import build_tiny_model
+
+    language_codes = [code for config in inference.MODEL_CONFIGS.values()
+                      for code in (config["source_lang_nllb"], config["target_lang_nllb"])]
+    model_dir = build_tiny_model(args.model_dir, language_codes)
+    for model_config in inference.MODEL_CONFIGS.values():
+        model_config["id"] = model_dir
+        model_config["backend"] = "torch"
+
+    from app import create_app
+    from flask_jwt_extended import create_access_token
+    from models import User, db
+
+    app = create_app(preload_models=False)
+    with app.app_context():
+        user = User(email="benchmark@example.com")
+        user.set_password("benchmark")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        auth = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    sentences = load_sentences(args.requests)
+    directions = [("fr", "ar-TD"), ("ar-TD", "fr")]
+
+    # Chargement des modèles et première génération hors mesure
+    warmup_client = app.test_client()
+    for from_lang, to_lang in directions:
+        warmup_client.post("/api/translate", json={"source_text": "Bonjour.", "from_lang": from_lang, "to_lang": to_lang})
+
+    saved_ids = []
+    saved_lock = threading.Lock()
+
+    def translate_call(index):
+        from_lang, to_lang = directions[index % 2]
+        text = sentences[from_lang][index % len(sentences[from_lang])]
+
+        def call(client):
+            response = client.post("/api/translate", json={
+                "source_text": text, "from_lang": from_lang, "to_lang": to_lang, "user_id": user_id,
+            })
+            if response.status_code == 200:
+                with saved_lock:
+                    saved_ids.append((response.get_json()["id"], text, from_lang, to_lang))
+            return response.status_code
+        return call
+
+    def history_call(index):
+        return lambda client: client.get("/api/get_translations?limit=50", headers=auth).status_code
+
+    def correction_call(index):
+        def call(client):
+            original_id, text, from_lang, to_lang = saved_ids[index % len(saved_ids)]
+            return client.post("/api/save_correction", headers=auth, json={
+                "source_text": text, "translated_text": f"correction {index}", "from_lang": from_lang,
+                "to_lang": to_lang, "is_correction": True, "original_translation_id": original_id,
+            }).status_code
+        return call
+
+    phases = {"translate": translate_call, "get_translations": history_call, "save_correction": correction_call}
+    report = {
+        "meta": {
+            "startedAt": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "withCache": args.with_cache,
+            "modelDir": model_dir,
+        },
+        "endpoints": {},
+    }
+    for endpoint in endpoints:
+        if endpoint not in phases:
+            parser.error(f"Route inconnue : {endpoint}. Choix : {', '.join(ENDPOINTS)}.")
+        if endpoint == "save_correction" and not saved_ids:
+            # Les corrections portent sur des traductions enregistrées : on en crée d'abord
+            run_phase("seed", [translate_call(i) for i in range(args.concurrency)], args.concurrency, app.test_client)
+        calls = [phases[endpoint](index) for index in range(args.requests)]
+        report["endpoints"][endpoint] = run_phase(endpoint, calls, args.concurrency, app.test_client)
+        print(f"{endpoint}: {json.dumps(report['endpoints'][endpoint])}")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_to_baseline(report, json.load(baseline_file), args.tolerance)
+        report["regressions"] = regressions
+        if regressions:
+            print("Régressions par rapport à la référence :")
+            for regression in regressions:
+                print(f"  - {regression}")
+            exit_code = 1
+        else:
+            print("Aucune régression par rapport à la référence.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Rapport écrit dans {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# backend/benchmarks/startup_benchmark.py
+# Mesure le temps de démarrage des chemins "légers" (CLI base de données, auth,
+# création de l'application) avec `python -X importtime`, et échoue si une
+# bibliothèque d'inférence lourde (torch, transformers...) y est importée.
+# Le budget est un surcoût par rapport à un interpréteur qui importe seulement Flask et
+# Flask-SQLAlchemy, mesuré sur la même machine : le résultat ne dépend ni de la vitesse
+# du disque ni de celle du CPU.
+#
+# Usage (depuis Backend/) :
+#   python benchmarks/startup_benchmark.py [--budget 0.5] [--runs 3]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules qui ne doivent être importés qu'au premier besoin d'inférence
+HEAVY_MODULES = ("torch", "transformers", "tokenizers", "safetensors", "huggingface_hub", "onnxruntime", "optimum")
+
+# Référence : le minimum incompressible de toute commande du backend
+BASELINE_CODE = "import flask, flask_sqlalchemy"
+
+SCENARIOS = {
+    "create_app": "from app import create_app; create_app()",
+    "cli_commands": "import cli_commands",
+    "auth_routes": "import routes.auth",
+}
+
+
+def _run(args, env):
+    started = time.perf_counter()
+    result = subprocess.run(args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Échec de `{' '.join(args)}` :\n{result.stderr[-2000:]}")
+    return elapsed, result
+
+
+def time_scenario(code, env):
+    """Durée totale (s) d'un nouvel interpréteur exécutant `code`."""
+    return _run([sys.executable, "-c", code], env)[0]
+
+
+def imported_modules(code, env):
+    """Liste des modules importés par `code`, d'après `python -X importtime`."""
+    _, result = _run([sys.executable, "-X", "importtime", "-c", code], env)
+
+    modules = []
+    for line in result.stderr.splitlines():
+        # Format : "import time: self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                modules.append(name)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage sans imports lourds.")
+    parser.add_argument(
+        "--budget", type=float, default=0.5,
+        help="Surcoût maximal (s) par scénario au-delà de l'import de flask + flask_sqlalchemy."
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Nombre d'exécutions (on garde la meilleure).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'startup.db')}"
+        env["PRELOAD_MODELS"] = "false"
+
+        baseline = min(time_scenario(BASELINE_CODE, env) for _ in range(max(1, args.runs)))
+        report = {"baseline": {"code": BASELINE_CODE, "seconds": round(baseline, 3)}}
+        failures = []
+        for name, code in SCENARIOS.items():
+            heavy = {m for m in imported_modules(code, env) if m.split(".")[0] in HEAVY_MODULES}
+            best = min(time_scenario(code, env) for _ in range(max(1, args.runs)))
+            overhead = best - baseline
+            report[name] = {"seconds": round(best, 3), "overheadSeconds": round(overhead, 3), "heavyImports": sorted(heavy)}
+            if heavy:
+                failures.append(f"{name}: imports lourds au démarrage : {', '.join(sorted(heavy)[:10])}")
+            if overhead > args.budget:
+                failures.append(
+                    f"{name}: {best:.3f}s, soit {overhead:.3f}s de plus que la référence > budget de {args.budget:.3f}s"
+                )
+
+    print(json.dumps(report, indent=2))
+    if failures:
+        print("ÉCHEC du benchmark de démarrage :")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("Benchmark de démarrage OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
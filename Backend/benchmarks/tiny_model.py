@@ -0,0 +1,55 @@
+# backend/benchmarks/tiny_model.py
+# Construit localement un tout petit modèle d'architecture NLLB (M2M100) initialisé
+# aléatoirement, avec un tokenizer SentencePiece entraîné sur mini_dataset.
+# Aucun téléchargement : les benchmarks tournent hors ligne. Les traductions produites
+# n'ont aucun sens, seuls les temps (tokenisation, generate, décodage...) comptent.
+#
+# Nécessite torch, transformers, sentencepiece et protobuf.
+import os
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATASET_FILES = [
+    os.path.join(BACKEND_DIR, "..", "modele_dataset", "mini_dataset", "for_dataset_arb.txt"),
+    os.path.join(BACKEND_DIR, "..", "modele_dataset", "mini_dataset", "for_dataset_fr.txt"),
+]
+
+
+def build_tiny_model(output_dir, language_codes, vocab_size=800, d_model=32, layers=1, seed=0):
+    """Écrit tokenizer + modèle dans `output_dir` (réutilisé s'il existe déjà) et renvoie le chemin."""
+    if os.path.exists(os.path.join(output_dir, "config.json")):
+        return output_dir
+
+    import sentencepiece as spm
+    import torch
+    from transformers import M2M100Config, M2M100ForConditionalGeneration, NllbTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, "sentencepiece.bpe")
+        spm.SentencePieceTrainer.train(
+            input=",".join(DATASET_FILES), model_prefix=prefix, vocab_size=vocab_size,
+            model_type="unigram", character_coverage=1.0, minloglevel=2,
+        )
+        # Les codes de langue doivent être des tokens spéciaux : "fra_Latn" (préfixe posé
+        # par tokenizer.src_lang) et "__fra_Latn__" (forced_bos_token_id dans inference.py).
+        codes = sorted(set(language_codes))
+        tokenizer = NllbTokenizer.from_pretrained(
+            tmp_dir, additional_special_tokens=codes + [f"__{code}__" for code in codes]
+        )
+
+    torch.manual_seed(seed)
+    config = M2M100Config(
+        vocab_size=len(tokenizer), d_model=d_model,
+        encoder_layers=layers, decoder_layers=layers,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=d_model * 2, decoder_ffn_dim=d_model * 2,
+        max_position_embeddings=256,
+        pad_token_id=tokenizer.pad_token_id, bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id, decoder_start_token_id=tokenizer.eos_token_id,
+    )
+    model = M2M100ForConditionalGeneration(config)
+    model.eval()
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
@@ -0,0 +1,205 @@
+# backend/bulk_translation.py
+# Traduction de gros fichiers texte (rétro-traduction pour agrandir le corpus parallèle),
+# utilisée par la commande `flask translate-file`.
+#   - le fichier d'entrée est lu ligne par ligne, par blocs de `chunk_size` lignes :
+#     il n'est jamais chargé entièrement en mémoire ;
+#   - chaque bloc est traduit par un processus worker : ses segments sont triés par
+#     longueur en caractères puis regroupés en batches de longueurs proches (la
+#     tokenisation n'a lieu qu'une fois, dans perform_batch_translation) ;
+#   - les blocs sont écrits dans l'ordre d'origine, quel que soit l'ordre de fin ;
+#   - après chaque bloc écrit, un point de reprise (offsets en octets de l'entrée et de
+#     la sortie) est enregistré : une exécution interrompue reprend au bloc suivant.
+import json
+import multiprocessing
+import os
+import time
+
+from segmentation import join_segments, split_into_segments
+
+_worker_state = {}
+
+
+def _init_worker(model_config, num_threads):
+    import torch
+    from worker_pool import _load_worker_model
+
+    torch.set_num_threads(num_threads)
+    _worker_state["config"] = model_config
+    _worker_state["model"] = _load_worker_model(model_config)
+
+
+def _translate_chunk(chunk_index, lines, batch_size, max_segment_chars):
+    """Traduit un bloc de lignes ; les lignes vides restent vides. Renvoie (index, traductions)."""
+    from inference import perform_batch_translation
+
+    model_config = _worker_state["config"]
+    tokenizer, model, device = _worker_state["model"]
+
+    line_segments = [split_into_segments(line, max_segment_chars) if line.strip() else [] for line in lines]
+    texts = [segment.text for segments in line_segments for segment in segments]
+
+    # Tri par longueur en caractères, proche de la longueur en tokens : chaque batch
+    # regroupe des segments de longueurs proches
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    translations = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        results = perform_batch_translation(
+            [texts[i] for i in batch], tokenizer, model, device,
+            model_config["source_lang_nllb"], model_config["target_lang_nllb"]
+        )
+        for i, translated in zip(batch, results):
+            translations[i] = translated
+
+    output = []
+    position = 0
+    for segments in line_segments:
+        # Une ligne d'entrée = une ligne de sortie : l'alignement du corpus en dépend
+        output.append(join_segments(segments, translations[position:position + len(segments)]).replace("\n", " "))
+        position += len(segments)
+    return chunk_index, output
+
+
+def _read_chunks(input_file, chunk_size):
+    """Itère sur (lignes décodées, offset en octets après le bloc) depuis la position courante."""
+    while True:
+        lines = []
+        while len(lines) < chunk_size:
+            raw = input_file.readline()
+            if not raw:
+                break
+            lines.append(raw.decode("utf-8").rstrip("\r\n"))
+        if not lines:
+            return
+        yield lines, input_file.tell()
+
+
+class Checkpoint:
+    """Point de reprise écrit de façon atomique (fichier temporaire puis os.replace)."""
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state.get("signature") != self.signature:
+            raise ValueError(
+                f"Le point de reprise {self.path} correspond à une autre exécution "
+                "(fichier d'entrée, direction ou options différents). Utilisez --restart."
+            )
+        return state
+
+    def save(self, input_offset, output_offset, lines_done):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump({
+                "signature": self.signature,
+                "inputOffset": input_offset,
+                "outputOffset": output_offset,
+                "linesDone": lines_done,
+                "savedAt": time.time(),
+            }, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def translate_file(input_path, output_path, model_config, workers=1, threads_per_worker=None,
+                   chunk_size=256, batch_size=32, max_segment_chars=200,
+                   checkpoint_path=None, restart=False, progress=None):
+    """Traduit `input_path` ligne à ligne vers `output_path` avec `workers` processus.
+
+    `progress(stats)` est appelé après chaque bloc écrit avec linesDone, linesPerSecond,
+    fraction (d'après les octets lus) et etaSeconds. Renvoie les statistiques finales.
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+    input_size = os.path.getsize(input_path)
+    checkpoint = Checkpoint(checkpoint_path, {
+        "input": os.path.abspath(input_path),
+        "inputSize": input_size,
+        "modelId": model_config["id"],
+        "sourceLang": model_config["source_lang_nllb"],
+        "targetLang": model_config["target_lang_nllb"],
+        "chunkSize": chunk_size,
+        "maxSegmentChars": max_segment_chars,
+    })
+    if restart:
+        checkpoint.remove()
+    state = checkpoint.load() or {"inputOffset": 0, "outputOffset": 0, "linesDone": 0}
+    if state["outputOffset"] and (not os.path.exists(output_path) or os.path.getsize(output_path) < state["outputOffset"]):
+        raise ValueError(f"Le fichier de sortie {output_path} est plus court que le point de reprise. Utilisez --restart.")
+
+    workers = max(1, workers)
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    started = time.perf_counter()
+    start_offset = state["inputOffset"]
+    lines_done = state["linesDone"]
+    lines_this_run = 0
+
+    # Ouverture sans troncature, puis retour à la position du dernier bloc validé
+    mode = "r+b" if state["outputOffset"] else "wb"
+    with open(input_path, "rb") as input_file, open(output_path, mode) as output_file, context.Pool(
+        processes=workers, initializer=_init_worker, initargs=(dict(model_config), threads_per_worker)
+    ) as pool:
+        input_file.seek(start_offset)
+        output_file.seek(state["outputOffset"])
+        output_file.truncate()
+
+        chunks = _read_chunks(input_file, chunk_size)
+        in_flight = {}      # index -> (AsyncResult, offset d'entrée après le bloc)
+        next_to_submit = 0
+        next_to_write = 0
+        exhausted = False
+        while True:
+            # Au plus deux blocs en attente par worker : l'entrée n'est lue qu'au fil de l'eau
+            while not exhausted and len(in_flight) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                lines, end_offset = chunk
+                in_flight[next_to_submit] = (
+                    pool.apply_async(_translate_chunk, (next_to_submit, lines, batch_size, max_segment_chars)),
+                    end_offset,
+                )
+                next_to_submit += 1
+            if next_to_write not in in_flight:
+                break
+
+            # Écriture dans l'ordre : on attend toujours le plus ancien bloc non écrit
+            result, end_offset = in_flight.pop(next_to_write)
+            _, translations = result.get()
+            output_file.write("".join(f"{line}\n" for line in translations).encode("utf-8"))
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            lines_done += len(translations)
+            lines_this_run += len(translations)
+            checkpoint.save(end_offset, output_file.tell(), lines_done)
+            next_to_write += 1
+
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                bytes_per_second = (end_offset - start_offset) / elapsed if elapsed else 0
+                progress({
+                    "linesDone": lines_done,
+                    "linesPerSecond": round(lines_this_run / elapsed, 2) if elapsed else None,
+                    "fraction": end_offset / input_size if input_size else 1.0,
+                    "etaSeconds": round((input_size - end_offset) / bytes_per_second) if bytes_per_second else None,
+                })
+
+    checkpoint.remove()
+    elapsed = time.perf_counter() - started
+    return {
+        "linesDone": lines_done,
+        "linesThisRun": lines_this_run,
+        "resumedFromLine": state["linesDone"],
+        "seconds": round(elapsed, 3),
+        "linesPerSecond": round(lines_this_run / elapsed, 2) if elapsed else None,
+    }
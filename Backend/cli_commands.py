@@ -1,5 +1,10 @@
 # backend/cli_commands.py
+import json
+import os
+import sys
+import time
 import click
+from flask.cli import with_appcontext
 from app import create_app
 from models import db
 
@@ -21,13 +26,212 @@ def init_db():
 @click.option("--host", default="127.0.0.1", help="Host address.")
 @click.option("--port", default=5000, type=int, help="Port number.")
 @click.option("--debug/--no-debug", default=True, help="Enable/disable debug mode.")
-def run_server(host, port, debug):
+@click.option("--preload/--no-preload", default=None, help="Preload and warm up all translation models at startup.")
+def run_server(host, port, debug, preload):
     """Run the development server."""
-    app = create_app()
+    app = create_app(preload_models=preload)
     app.run(host=host, port=port, debug=debug)
     click.echo(f"Serveur démarré sur http://{host}:{port} (debug={debug}).")
 
 
+
+@click.command("export-model")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS (ex. ar-TD_to_fr).")
+@click.option("--output", "output_dir", required=True, type=click.Path(file_okay=False), help="Dossier de sortie de l'export.")
+@click.option("--quantize/--no-quantize", default=True, help="Quantifier les graphes ONNX en int8.")
+def export_model(model_key, output_dir, quantize):
+    """Export a translation model to ONNX Runtime (encoder/decoder with KV cache)."""
+    from inference import MODEL_CONFIGS
+    from inference_backends import export_onnx_model
+
+    if model_key not in MODEL_CONFIGS:
+        raise click.BadParameter(f"Direction inconnue : {model_key}. Choix : {', '.join(MODEL_CONFIGS)}.")
+    export_onnx_model(MODEL_CONFIGS[model_key]["id"], output_dir, quantize=quantize)
+    click.echo(f"Modèle '{model_key}' exporté vers {output_dir} (int8={quantize}).")
+    click.echo(f'Utilisez "id": "{output_dir}", "backend": "onnx" dans MODEL_CONFIGS pour le servir.')
+
+
+@click.command("check-parity")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS (ex. ar-TD_to_fr).")
+@click.option("--backend", required=True, type=click.Choice(["torch", "torch-int8", "onnx"]), help="Backend à comparer au fp32.")
+@click.option("--model-path", default=None, help="Chemin du modèle à évaluer (ex. export ONNX), par défaut l'id de MODEL_CONFIGS.")
+@click.option("--samples", default=200, type=int, help="Nombre de phrases du mini_dataset.")
+@click.option("--bleu-tolerance", default=1.0, type=float, help="Baisse de BLEU maximale acceptée.")
+@click.option("--corpus-dir", default=None, type=click.Path(exists=True, file_okay=False), help="Corpus prétraité (flask preprocess-corpus) à utiliser au lieu de mini_dataset.")
+def check_parity_command(model_key, backend, model_path, samples, bleu_tolerance, corpus_dir):
+    """Compare outputs and BLEU of an inference backend against the fp32 model."""
+    from evaluation import check_parity
+
+    report = check_parity(model_key, backend, model_path=model_path, samples=samples, bleu_tolerance=bleu_tolerance,
+                          corpus_dir=corpus_dir)
+    click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+    if not report["passed"]:
+        click.echo("ÉCHEC : la baisse de BLEU dépasse la tolérance.", err=True)
+        sys.exit(1)
+
+
+
+@click.command("evaluate-profiles")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS (ex. ar-TD_to_fr).")
+@click.option("--profiles", default=None, help="Profils à comparer, séparés par des virgules (par défaut : tous).")
+@click.option("--samples", default=200, type=int, help="Nombre de phrases du mini_dataset.")
+@click.option("--batch-size", default=1, type=int, help="Phrases par appel à generate (1 = latence d'une requête isolée).")
+@click.option("--deadline-ms", default=None, type=float, help="Échéance appliquée à chaque lot, en millisecondes.")
+@click.option("--corpus-dir", default=None, type=click.Path(exists=True, file_okay=False), help="Corpus prétraité (flask preprocess-corpus) à utiliser au lieu de mini_dataset.")
+def evaluate_profiles_command(model_key, profiles, samples, batch_size, deadline_ms, corpus_dir):
+    """Compare latency and BLEU of the decoding profiles on the evaluation data."""
+    from decoding_profiles import resolve_profile
+    from evaluation import evaluate_profiles
+
+    try:
+        profiles = [resolve_profile(name.strip()) for name in profiles.split(",")] if profiles else None
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    report = evaluate_profiles(model_key, profiles, samples=samples, batch_size=batch_size,
+                               deadline_ms=deadline_ms, corpus_dir=corpus_dir)
+    click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+@click.command("translate-file")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS (ex. fr_to_ar-TD).")
+@click.option("--input", "input_path", required=True, type=click.Path(exists=True, dir_okay=False), help="Fichier texte à traduire (une phrase par ligne).")
+@click.option("--output", "output_path", required=True, type=click.Path(dir_okay=False), help="Fichier de sortie (une traduction par ligne).")
+@click.option("--workers", default=1, type=int, help="Nombre de processus de traduction.")
+@click.option("--threads-per-worker", default=None, type=int, help="Threads torch par processus (par défaut : cœurs / workers).")
+@click.option("--chunk-size", default=256, type=int, help="Lignes par bloc (unité de travail et de reprise).")
+@click.option("--batch-size", default=32, type=int, help="Segments par appel à generate.")
+@click.option("--max-segment-chars", default=200, type=int, help="Longueur maximale d'un segment avant découpage.")
+@click.option("--checkpoint", "checkpoint_path", default=None, help="Fichier de reprise (par défaut : <output>.checkpoint.json).")
+@click.option("--restart", is_flag=True, help="Ignore le point de reprise et recommence depuis le début.")
+def translate_file_command(model_key, input_path, output_path, workers, threads_per_worker, chunk_size,
+                           batch_size, max_segment_chars, checkpoint_path, restart):
+    """Translate a large text file line by line, in parallel and resumably."""
+    from bulk_translation import translate_file
+    from inference import MODEL_CONFIGS
+
+    if model_key not in MODEL_CONFIGS:
+        raise click.BadParameter(f"Direction inconnue : {model_key}. Choix : {', '.join(MODEL_CONFIGS)}.")
+
+    def report_progress(progress):
+        eta = f"{progress['etaSeconds']} s" if progress["etaSeconds"] is not None else "?"
+        click.echo(
+            f"{progress['linesDone']} lignes ({progress['fraction'] * 100:.1f} %), "
+            f"{progress['linesPerSecond']} lignes/s, reste ~{eta}"
+        )
+
+    try:
+        stats = translate_file(
+            input_path, output_path, MODEL_CONFIGS[model_key], workers=workers,
+            threads_per_worker=threads_per_worker, chunk_size=chunk_size, batch_size=batch_size,
+            max_segment_chars=max_segment_chars, checkpoint_path=checkpoint_path, restart=restart,
+            progress=report_progress,
+        )
+    except ValueError as e:
+        click.echo(f"Erreur : {e}", err=True)
+        sys.exit(1)
+    click.echo(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+@click.command("preprocess-corpus")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS (langues et tokenizer, ex. ar-TD_to_fr).")
+@click.option("--output", "output_dir", required=True, type=click.Path(file_okay=False), help="Dossier du corpus prétraité.")
+@click.option("--source-file", default=None, type=click.Path(exists=True, dir_okay=False), help="Fichier source (par défaut : mini_dataset).")
+@click.option("--target-file", default=None, type=click.Path(exists=True, dir_okay=False), help="Fichier cible aligné ligne à ligne (par défaut : mini_dataset).")
+@click.option("--tokenizer", "tokenizer_id", default=None, help="Tokenizer à utiliser, par défaut celui du modèle de la direction.")
+@click.option("--workers", default=None, type=int, help="Processus de prétraitement (par défaut : nombre de cœurs).")
+@click.option("--shard-size", default=50000, type=int, help="Paires par shard.")
+@click.option("--max-length", default=128, type=int, help="Longueur maximale en tokens (troncature, comme à l'entraînement).")
+@click.option("--max-ratio", default=3.0, type=float, help="Rapport maximal entre les longueurs des deux côtés d'une paire.")
+@click.option("--max-chars", default=1000, type=int, help="Longueur maximale d'une phrase en caractères.")
+def preprocess_corpus_command(model_key, output_dir, source_file, target_file, tokenizer_id, workers, shard_size,
+                              max_length, max_ratio, max_chars):
+    """Clean, dedupe and pre-tokenize the parallel corpus into memory-mapped shards."""
+    from corpus_preprocessing import preprocess_corpus, validate_corpus
+    from evaluation import DATASET_FILES
+    from inference import MODEL_CONFIGS
+
+    if model_key not in MODEL_CONFIGS:
+        raise click.BadParameter(f"Direction inconnue : {model_key}. Choix : {', '.join(MODEL_CONFIGS)}.")
+    model_config = MODEL_CONFIGS[model_key]
+
+    last_report = [0.0]
+
+    def report_progress(stats):
+        # Une ligne toutes les 5 s au plus
+        if time.monotonic() - last_report[0] >= 5:
+            last_report[0] = time.monotonic()
+            click.echo(f"{stats['pairsRead']} paires lues, {stats['pairsKept']} retenues")
+
+    try:
+        manifest = preprocess_corpus(
+            source_file or DATASET_FILES[model_config["source_lang_app"]],
+            target_file or DATASET_FILES[model_config["target_lang_app"]],
+            output_dir, tokenizer_id or model_config["id"],
+            model_config["source_lang_nllb"], model_config["target_lang_nllb"],
+            workers=workers, shard_size=shard_size, max_length=max_length,
+            max_ratio=max_ratio, max_chars=max_chars, progress=report_progress,
+        )
+    except ValueError as e:
+        click.echo(f"Erreur : {e}", err=True)
+        sys.exit(1)
+    click.echo(json.dumps(manifest["stats"], indent=2, ensure_ascii=False))
+
+    problems = validate_corpus(output_dir)
+    if problems:
+        for problem in problems:
+            click.echo(f"ÉCHEC de validation : {problem}", err=True)
+        sys.exit(1)
+    click.echo(f"{len(manifest['shards'])} shard(s) validé(s) dans {output_dir}.")
+
+
+@click.command("prune-vocab")
+@click.option("--model-key", required=True, help="Direction de MODEL_CONFIGS dont le checkpoint est réduit.")
+@click.option("--output", "output_dir", required=True, type=click.Path(file_okay=False), help="Dossier du checkpoint réduit.")
+@click.option("--corpus-dir", default=None, type=click.Path(exists=True, file_okay=False), help="Corpus prétraité à utiliser au lieu de mini_dataset.")
+@click.option("--history/--no-history", default=True, help="Ajouter les phrases de l'historique (table Translation) de la direction.")
+@click.option("--check/--no-check", default=True, help="Comparer le BLEU du checkpoint réduit à celui d'origine.")
+@click.option("--samples", default=200, type=int, help="Nombre de phrases pour le contrôle du BLEU.")
+@click.option("--bleu-tolerance", default=0.5, type=float, help="Baisse de BLEU maximale acceptée.")
+@with_appcontext
+def prune_vocab_command(model_key, output_dir, corpus_dir, history, check, samples, bleu_tolerance):
+    """Build a vocabulary-pruned checkpoint from the tokens used by the corpus and history."""
+    from transformers import AutoTokenizer
+    from evaluation import check_parity, load_eval_pairs
+    from inference import MODEL_CONFIGS
+    from models import Translation
+    from vocab_pruning import PRUNED_VOCAB_FILE, collect_used_token_ids, prune_checkpoint
+
+    if model_key not in MODEL_CONFIGS:
+        raise click.BadParameter(f"Direction inconnue : {model_key}. Choix : {', '.join(MODEL_CONFIGS)}.")
+    model_config = MODEL_CONFIGS[model_key]
+    if os.path.isfile(os.path.join(model_config["id"], PRUNED_VOCAB_FILE)):
+        raise click.BadParameter(f"Le modèle de '{model_key}' a déjà un vocabulaire réduit ; partez du checkpoint d'origine.")
+
+    sources, targets = load_eval_pairs(model_key, limit=0, corpus_dir=corpus_dir)
+    history_pairs = []
+    if history:
+        history_pairs = [
+            (row.source_text, row.translated_text)
+            for row in Translation.query.with_entities(Translation.source_text, Translation.translated_text)
+            .filter(Translation.from_lang == model_config["source_lang_app"],
+                    Translation.to_lang == model_config["target_lang_app"])
+            .yield_per(1000)
+        ]
+    tokenizer = AutoTokenizer.from_pretrained(model_config["id"])
+    kept_ids = collect_used_token_ids(tokenizer, model_config, zip(sources, targets), history_pairs)
+    summary = prune_checkpoint(model_config["id"], output_dir, kept_ids, metadata={
+        "modelKey": model_key, "corpusPairs": len(sources), "historyPairs": len(history_pairs),
+    })
+    click.echo(json.dumps(summary, indent=2))
+    click.echo(f'Utilisez "id": "{output_dir}" dans MODEL_CONFIGS (ou le fichier du registre) pour le servir.')
+
+    if check:
+        report = check_parity(model_key, "torch", model_path=output_dir, samples=samples, bleu_tolerance=bleu_tolerance)
+        click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+        if not report["passed"]:
+            click.echo("ÉCHEC : la baisse de BLEU du checkpoint réduit dépasse la tolérance.", err=True)
+            sys.exit(1)
+
 if __name__ == '__main__':
     # Ceci ne devrait normalement pas être exécuté directement,
     # mais plutôt via 'flask db init' ou 'flask run'
@@ -2,7 +2,88 @@
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
-    SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "instance", "app.db")}?check_same_thread=False'
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL',
+        f'sqlite:///{os.path.join(basedir, "instance", "app.db")}?check_same_thread=False'
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.environ.get('SECRET_KEY') 
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') 
\ No newline at end of file
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') 
+
+    # --- Micro-batching des appels à model.generate (une file par direction) ---
+    # Taille maximale d'un batch et temps d'attente maximal (en millisecondes)
+    # avant de lancer la génération avec les requêtes déjà reçues.
+    TRANSLATION_BATCH_MAX_SIZE = int(os.environ.get('TRANSLATION_BATCH_MAX_SIZE', 16))
+    TRANSLATION_BATCH_MAX_WAIT_MS = float(os.environ.get('TRANSLATION_BATCH_MAX_WAIT_MS', 10))
+
+    # --- Profils de décodage (standard / fast / balanced / quality, voir decoding_profiles.py) ---
+    # Profil des requêtes qui n'en précisent pas ; seules ses traductions entrent dans le cache.
+    # "standard" garde le décodage d'origine (glouton, max_new_tokens=200)
+    DECODING_DEFAULT_PROFILE = os.environ.get('DECODING_DEFAULT_PROFILE', 'standard')
+
+    # --- Cache des résultats de traduction (clé : direction + texte source normalisé) ---
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', 10000))
+    TRANSLATION_CACHE_MAX_BYTES = int(os.environ.get('TRANSLATION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    # Nombre de sources les plus fréquentes de la table Translation chargées au démarrage (0 = désactivé)
+    TRANSLATION_CACHE_WARMUP_SIZE = int(os.environ.get('TRANSLATION_CACHE_WARMUP_SIZE', 500))
+
+    # --- Découpage des textes longs en segments (phrases / propositions) ---
+    TRANSLATION_MAX_SEGMENTS = int(os.environ.get('TRANSLATION_MAX_SEGMENTS', 64))
+    TRANSLATION_MAX_SEGMENT_CHARS = int(os.environ.get('TRANSLATION_MAX_SEGMENT_CHARS', 200))
+
+    # --- Traduction groupée (/api/translate/batch) et tâches asynchrones (/api/jobs) ---
+    TRANSLATION_BATCH_MAX_TEXTS = int(os.environ.get('TRANSLATION_BATCH_MAX_TEXTS', 256))
+    TRANSLATION_JOB_MAX_TEXTS = int(os.environ.get('TRANSLATION_JOB_MAX_TEXTS', 20000))
+    TRANSLATION_JOB_CHUNK_SIZE = int(os.environ.get('TRANSLATION_JOB_CHUNK_SIZE', 32))
+    TRANSLATION_JOB_WORKERS = int(os.environ.get('TRANSLATION_JOB_WORKERS', 2))
+    # Nombre de tâches gardées en mémoire (les plus anciennes terminées sont oubliées)
+    TRANSLATION_JOB_RETENTION = int(os.environ.get('TRANSLATION_JOB_RETENTION', 100))
+
+    # --- Mémoire de traduction (corrections + historique), consultée avant le modèle ---
+    TRANSLATION_MEMORY_ENABLED = os.environ.get('TRANSLATION_MEMORY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Score minimal (coefficient de Dice sur trigrammes, 1.0 = correspondance exacte seulement)
+    TRANSLATION_MEMORY_THRESHOLD = float(os.environ.get('TRANSLATION_MEMORY_THRESHOLD', 0.9))
+
+    # --- Historique paginé (/api/get_translations) ---
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 200))
+
+    # --- Écriture groupée de l'historique (group commit, voir history_writer.py) ---
+    # Les lignes arrivées pendant un commit partagent le suivant ; chaque requête attend
+    # celui de son lot (ids de la base). Une requête seule est écrite sans délai.
+    HISTORY_GROUP_COMMIT = os.environ.get('HISTORY_GROUP_COMMIT', 'true').lower() in ('1', 'true', 'yes')
+    HISTORY_FLUSH_MAX_ROWS = int(os.environ.get('HISTORY_FLUSH_MAX_ROWS', 100))
+    # Durée de mise en cache de l'existence d'un utilisateur
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 300))
+    # Mode WAL et pragmas SQLite (synchronous=NORMAL, busy_timeout...) sur le moteur de la base
+    SQLITE_WAL_ENABLED = os.environ.get('SQLITE_WAL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # --- Registre des modèles (directions, checkpoints) et budget mémoire ---
+    # Fichier JSON des directions (voir model_registry.example.json) ; absent = directions par défaut
+    MODEL_REGISTRY_FILE = os.environ.get('MODEL_REGISTRY_FILE', os.path.join(basedir, 'model_registry.json'))
+    # Budget RAM total des modèles résidents en Mo (prioritaire sur celui du fichier, 0 = illimité)
+    MODEL_MEMORY_BUDGET_MB = float(os.environ['MODEL_MEMORY_BUDGET_MB']) if os.environ.get('MODEL_MEMORY_BUDGET_MB') else None
+
+    # --- Profilage d'une requête à la demande (en-tête X-Profile: 1), désactivé par défaut ---
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+    # Dossier des profils (piles "collapsed"), par défaut instance/profiles
+    PROFILING_OUTPUT_DIR = os.environ.get('PROFILING_OUTPUT_DIR')
+
+    # --- Préchargement des modèles au démarrage (voir /api/ready) ---
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', 'false').lower() in ('1', 'true', 'yes')
+
+    # --- Pool de processus d'inférence (0 = inférence dans le processus web) ---
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+    # Threads torch par worker (par défaut : nombre de coeurs / nombre de workers)
+    INFERENCE_THREADS_PER_WORKER = int(os.environ.get('INFERENCE_THREADS_PER_WORKER', 0))
+
+    # --- Contrôle d'admission devant l'inférence, par direction (voir admission.py) ---
+    # Segments admis (en file ou en cours) au-delà desquels les requêtes reçoivent un 429
+    INFERENCE_MAX_PENDING_PER_DIRECTION = int(os.environ.get('INFERENCE_MAX_PENDING_PER_DIRECTION', 256))
+    # Batches exécutés en même temps par direction (0 = un par worker d'inférence, 1 sans pool)
+    INFERENCE_MAX_CONCURRENCY_PER_DIRECTION = int(os.environ.get('INFERENCE_MAX_CONCURRENCY_PER_DIRECTION', 0))
+    # Échéance des requêtes sans deadline_ms : au-delà, elles sont retirées de la file (503)
+    INFERENCE_QUEUE_TIMEOUT_MS = float(os.environ.get('INFERENCE_QUEUE_TIMEOUT_MS', 30000))
+    # Temps minimal restant avant l'échéance pour lancer la génération d'un segment
+    INFERENCE_MIN_GENERATE_MS = float(os.environ.get('INFERENCE_MIN_GENERATE_MS', 50))
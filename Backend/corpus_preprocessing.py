@@ -0,0 +1,329 @@
+# backend/corpus_preprocessing.py
+# Préparation du corpus parallèle (remplace le nettoyage de traitement_données.ipynb),
+# utilisée par la commande `flask preprocess-corpus`.
+#   - les deux fichiers (une phrase par ligne) sont lus ensemble, au fil de l'eau ;
+#   - chaque paire est normalisée (NFKC, tirets et apostrophes, espaces), puis écartée
+#     si un côté est vide, si le rapport de longueurs est suspect (paire décalée) ou
+#     si elle est trop longue ; les doublons sont éliminés par empreinte (blake2b) ;
+#   - le nettoyage et la tokenisation (comme code_entrainement.ipynb : src_lang,
+#     text_target, max_length) sont répartis sur plusieurs processus ;
+#   - le résultat est écrit en shards de tableaux .npy (ids concaténés + offsets) ouverts
+#     en mmap par PreprocessedCorpus : l'entraînement et l'évaluation ne re-tokenisent
+#     plus le corpus à chaque exécution. manifest.json décrit les shards (nombre de
+#     paires, sha256) et permet de les valider.
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from itertools import zip_longest
+
+import numpy as np
+
+from text_normalization import collapse_whitespace, fold_characters
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+_ARRAYS = ("source_ids", "source_offsets", "target_ids", "target_offsets")
+_TEXTS = ("source.txt", "target.txt")
+# Caractères de contrôle (hors tabulation) laissés par les extractions PDF / scraping
+_CONTROL_RE = re.compile(r"[\u0000-\u0008\u000b-\u001f\u007f-\u009f\u200b\u200e\u200f\ufeff]")
+
+_worker_state = {}
+
+
+def clean_text(text):
+    """Normalise une phrase du corpus. La casse est conservée (contrairement au cache)."""
+    text = _CONTROL_RE.sub("", fold_characters(text))
+    return collapse_whitespace(text)
+
+
+def pair_digest(source, target):
+    """Empreinte d'une paire pour la déduplication (insensible à la casse et aux espaces)."""
+    key = f"{source.casefold()}\t{target.casefold()}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=12).digest()
+
+
+def _init_worker(tokenizer_id, source_lang_nllb, target_lang_nllb, max_length, num_threads):
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    os.environ["RAYON_NUM_THREADS"] = str(num_threads)
+    from vocab_pruning import load_tokenizer
+
+    tokenizer = load_tokenizer(tokenizer_id)
+    tokenizer.src_lang = source_lang_nllb
+    tokenizer.tgt_lang = target_lang_nllb
+    _worker_state.update(tokenizer=tokenizer, max_length=max_length)
+
+
+def _process_chunk(chunk_index, pairs, max_ratio, max_chars):
+    """Nettoie, filtre et tokenise un bloc de paires brutes (None = ligne manquante)."""
+    counts = {"empty": 0, "misaligned": 0, "ratio": 0, "tooLong": 0, "truncated": 0}
+    kept = []
+    for source, target in pairs:
+        if source is None or target is None:
+            counts["misaligned"] += 1
+            continue
+        source, target = clean_text(source), clean_text(target)
+        if not source or not target:
+            counts["empty"] += 1
+            continue
+        if len(source) > max_chars or len(target) > max_chars:
+            counts["tooLong"] += 1
+            continue
+        shorter, longer = sorted((len(source), len(target)))
+        if longer > max_ratio * shorter:
+            counts["ratio"] += 1
+            continue
+        kept.append((source, target))
+
+    tokenizer = _worker_state["tokenizer"]
+    max_length = _worker_state["max_length"]
+    sources = [source for source, _ in kept]
+    targets = [target for _, target in kept]
+    source_ids = tokenizer(sources, truncation=False)["input_ids"] if kept else []
+    target_ids = tokenizer(text_target=targets, truncation=False)["input_ids"] if kept else []
+
+    records = []
+    for (source, target), src_ids, tgt_ids in zip(kept, source_ids, target_ids):
+        if len(src_ids) > max_length or len(tgt_ids) > max_length:
+            # Tronqué comme à l'entraînement (truncation=True) : le dernier token reste </s>
+            counts["truncated"] += 1
+            src_ids = src_ids[:max_length - 1] + src_ids[-1:] if len(src_ids) > max_length else src_ids
+            tgt_ids = tgt_ids[:max_length - 1] + tgt_ids[-1:] if len(tgt_ids) > max_length else tgt_ids
+        records.append((pair_digest(source, target), source, target, src_ids, tgt_ids))
+    return chunk_index, records, counts
+
+
+def _read_pairs(source_path, target_path, chunk_size):
+    """Itère sur des blocs de paires (source, cible) lus en parallèle dans les deux fichiers."""
+    with open(source_path, encoding="utf-8") as source_file, open(target_path, encoding="utf-8") as target_file:
+        chunk = []
+        # zip_longest : un fichier plus court que l'autre produit des paires incomplètes,
+        # comptées comme décalées au lieu d'être silencieusement tronquées par zip()
+        for source, target in zip_longest(source_file, target_file):
+            chunk.append((source, target))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _ShardWriter:
+    """Accumule les paires retenues et écrit un shard tous les `shard_size` paires."""
+
+    def __init__(self, output_dir, shard_size):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.shards = []
+        self._reset()
+
+    def _reset(self):
+        self.sources, self.targets = [], []
+        self.source_ids, self.target_ids = [], []
+
+    def add(self, source, target, source_ids, target_ids):
+        self.sources.append(source)
+        self.targets.append(target)
+        self.source_ids.append(source_ids)
+        self.target_ids.append(target_ids)
+        if len(self.sources) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if not self.sources:
+            return
+        name = f"shard-{len(self.shards):05d}"
+        shard_dir = os.path.join(self.output_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+        arrays = {}
+        for side, sequences in (("source", self.source_ids), ("target", self.target_ids)):
+            offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+            np.cumsum([len(ids) for ids in sequences], out=offsets[1:])
+            flat = np.fromiter((token for ids in sequences for token in ids), dtype=np.int32, count=int(offsets[-1]))
+            arrays[f"{side}_ids"], arrays[f"{side}_offsets"] = flat, offsets
+        files = {}
+        for array_name, array in arrays.items():
+            path = os.path.join(shard_dir, f"{array_name}.npy")
+            np.save(path, array)
+            files[f"{array_name}.npy"] = _sha256(path)
+        for file_name, lines in zip(_TEXTS, (self.sources, self.targets)):
+            path = os.path.join(shard_dir, file_name)
+            with open(path, "w", encoding="utf-8") as text_file:
+                text_file.writelines(f"{line}\n" for line in lines)
+            files[file_name] = _sha256(path)
+        self.shards.append({"name": name, "pairs": len(self.sources), "files": files})
+        self._reset()
+
+
+def preprocess_corpus(source_path, target_path, output_dir, tokenizer_id, source_lang_nllb, target_lang_nllb,
+                      workers=None, chunk_size=1000, shard_size=50000, max_length=128,
+                      max_ratio=3.0, max_chars=1000, progress=None):
+    """Nettoie, déduplique et tokenise le corpus parallèle vers `output_dir`.
+
+    Renvoie le manifeste (statistiques comprises), également écrit dans manifest.json.
+    """
+    if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        raise ValueError(f"{output_dir} contient déjà un corpus prétraité. Choisissez un autre dossier.")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, workers or os.cpu_count() or 1)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    stats = {"pairsRead": 0, "pairsKept": 0, "duplicates": 0,
+             "empty": 0, "misaligned": 0, "ratio": 0, "tooLong": 0, "truncated": 0}
+    seen = set()
+    writer = _ShardWriter(output_dir, shard_size)
+    started = time.perf_counter()
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        processes=workers, initializer=_init_worker,
+        initargs=(tokenizer_id, source_lang_nllb, target_lang_nllb, max_length, threads_per_worker),
+    ) as pool:
+        chunks = _read_pairs(source_path, target_path, chunk_size)
+        in_flight = {}
+        next_to_submit = next_to_write = 0
+        exhausted = False
+        while True:
+            # Lecture bornée : au plus deux blocs en attente par worker
+            while not exhausted and len(in_flight) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                stats["pairsRead"] += len(chunk)
+                in_flight[next_to_submit] = pool.apply_async(
+                    _process_chunk, (next_to_submit, chunk, max_ratio, max_chars)
+                )
+                next_to_submit += 1
+            if next_to_write not in in_flight:
+                break
+
+            # Traitement dans l'ordre du corpus : la déduplication garde la première occurrence
+            _, records, counts = in_flight.pop(next_to_write).get()
+            next_to_write += 1
+            for key, value in counts.items():
+                stats[key] += value
+            for digest, source, target, source_ids, target_ids in records:
+                if digest in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(digest)
+                writer.add(source, target, source_ids, target_ids)
+                stats["pairsKept"] += 1
+            if progress is not None:
+                progress(dict(stats))
+    writer.flush()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    manifest = {
+        "formatVersion": FORMAT_VERSION,
+        "createdAt": time.time(),
+        "source": {"path": os.path.abspath(source_path), "lang": source_lang_nllb},
+        "target": {"path": os.path.abspath(target_path), "lang": target_lang_nllb},
+        "tokenizer": tokenizer_id,
+        "maxLength": max_length,
+        "filters": {"maxRatio": max_ratio, "maxChars": max_chars},
+        "stats": stats,
+        "shards": writer.shards,
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, ensure_ascii=False)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    return manifest
+
+
+def validate_corpus(corpus_dir, vocab_size=None, check_hashes=True):
+    """Vérifie les shards d'un corpus prétraité. Renvoie la liste des problèmes (vide si valide)."""
+    with open(os.path.join(corpus_dir, MANIFEST_FILE), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("formatVersion") != FORMAT_VERSION:
+        return [f"Version de format {manifest.get('formatVersion')} non prise en charge."]
+    problems = []
+    total = 0
+    for shard in manifest["shards"]:
+        shard_dir = os.path.join(corpus_dir, shard["name"])
+        missing = [name for name in shard["files"] if not os.path.exists(os.path.join(shard_dir, name))]
+        if missing:
+            problems.append(f"{shard['name']}: fichier(s) manquant(s) : {', '.join(missing)}.")
+            continue
+        if check_hashes:
+            for name, expected in shard["files"].items():
+                if _sha256(os.path.join(shard_dir, name)) != expected:
+                    problems.append(f"{shard['name']}/{name}: empreinte sha256 différente du manifeste.")
+        arrays = {name: np.load(os.path.join(shard_dir, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+        for side in ("source", "target"):
+            ids, offsets = arrays[f"{side}_ids"], arrays[f"{side}_offsets"]
+            if len(offsets) != shard["pairs"] + 1 or offsets[0] != 0 or offsets[-1] != len(ids):
+                problems.append(f"{shard['name']}: offsets {side} incohérents avec le nombre de paires.")
+            elif np.any(np.diff(offsets) <= 0):
+                problems.append(f"{shard['name']}: séquence {side} vide.")
+            if len(ids) and (ids.min() < 0 or (vocab_size and ids.max() >= vocab_size)):
+                problems.append(f"{shard['name']}: ids {side} hors du vocabulaire.")
+        for name in _TEXTS:
+            with open(os.path.join(shard_dir, name), encoding="utf-8") as text_file:
+                lines = sum(1 for _ in text_file)
+            if lines != shard["pairs"]:
+                problems.append(f"{shard['name']}/{name}: {lines} lignes pour {shard['pairs']} paires.")
+        total += shard["pairs"]
+    if total != manifest["stats"]["pairsKept"]:
+        problems.append(f"{total} paires dans les shards pour {manifest['stats']['pairsKept']} annoncées.")
+    return problems
+
+
+class PreprocessedCorpus:
+    """Corpus prétraité ouvert en mmap. corpus[i] -> {"input_ids", "labels"} (format du
+    DataCollatorForSeq2Seq), utilisable directement comme dataset d'entraînement."""
+
+    def __init__(self, corpus_dir):
+        with open(os.path.join(corpus_dir, MANIFEST_FILE), encoding="utf-8") as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self._shards = []
+        self._starts = []
+        total = 0
+        for shard in self.manifest["shards"]:
+            shard_dir = os.path.join(corpus_dir, shard["name"])
+            self._shards.append((shard_dir, {
+                name: np.load(os.path.join(shard_dir, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS
+            }))
+            self._starts.append(total)
+            total += shard["pairs"]
+        self._length = total
+
+    def __len__(self):
+        return self._length
+
+    def _locate(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        shard_index = int(np.searchsorted(self._starts, index, side="right")) - 1
+        return shard_index, index - self._starts[shard_index]
+
+    def __getitem__(self, index):
+        shard_index, row = self._locate(index)
+        arrays = self._shards[shard_index][1]
+        item = {}
+        for side, key in (("source", "input_ids"), ("target", "labels")):
+            offsets = arrays[f"{side}_offsets"]
+            item[key] = arrays[f"{side}_ids"][offsets[row]:offsets[row + 1]].tolist()
+        return item
+
+    def texts(self):
+        """Itère sur les paires (source, cible) nettoyées, dans l'ordre du corpus."""
+        for shard_dir, _ in self._shards:
+            with open(os.path.join(shard_dir, _TEXTS[0]), encoding="utf-8") as source_file, \
+                    open(os.path.join(shard_dir, _TEXTS[1]), encoding="utf-8") as target_file:
+                for source, target in zip(source_file, target_file):
+                    yield source.rstrip("\n"), target.rstrip("\n")
@@ -0,0 +1,101 @@
+# backend/decoding_profiles.py
+# Profils de décodage nommés, choisis par requête (champ "profile" de /translate...).
+# Auparavant, chaque génération était gloutonne avec max_new_tokens=200 fixe : une
+# salutation de trois mots avait le même plafond qu'un paragraphe, et une génération
+# qui boucle (hallucination) allait jusqu'au 200e pas. Un profil fixe :
+#   - num_beams : compromis latence / qualité (avec early_stopping, la recherche en
+#     faisceau s'arrête dès que num_beams hypothèses sont terminées) ;
+#   - le plafond de tokens générés, proportionnel à la longueur de la source :
+#     length_ratio * tokens source + length_margin, borné par max_new_tokens ;
+#   - no_repeat_ngram_size, qui interdit de répéter un n-gramme déjà généré et coupe
+#     ainsi les boucles.
+# "standard" (profil par défaut) reproduit ce décodage d'origine, sans garde : les
+# autres profils changent les sorties et ne sont utilisés que sur demande (champ
+# "profile", ou DECODING_DEFAULT_PROFILE après comparaison avec flask evaluate-profiles).
+# Une échéance (deadline, en secondes de time.monotonic()) devient le max_time de
+# generate : la génération s'arrête et renvoie la meilleure hypothèse obtenue.
+import time
+
+from config import Config
+
+# Un réglage à None n'est pas passé à generate (valeur par défaut du modèle) ;
+# length_ratio None : plafond fixe de max_new_tokens tokens.
+DECODING_PROFILES = {
+    "standard": {
+        "num_beams": 1,
+        "length_ratio": None,
+        "length_margin": 0,
+        "max_new_tokens": 200,
+        "no_repeat_ngram_size": None,
+    },
+    "fast": {
+        "num_beams": 1,
+        "length_ratio": 1.5,
+        "length_margin": 8,
+        "max_new_tokens": 160,
+        "no_repeat_ngram_size": 4,
+    },
+    "balanced": {
+        "num_beams": 2,
+        "length_ratio": 2.0,
+        "length_margin": 10,
+        "max_new_tokens": 200,
+        "no_repeat_ngram_size": 4,
+    },
+    "quality": {
+        "num_beams": 4,
+        "length_ratio": 2.5,
+        "length_margin": 16,
+        "max_new_tokens": 256,
+        "no_repeat_ngram_size": 4,
+        "length_penalty": 1.0,
+    },
+}
+
+# Temps minimal laissé à generate quand l'échéance est (presque) dépassée : au moins un pas
+_MIN_TIME_SECONDS = 0.001
+
+
+def resolve_profile(name=None):
+    """Nom du profil à utiliser (DECODING_DEFAULT_PROFILE si `name` est vide).
+
+    Lève ValueError pour un profil inconnu.
+    """
+    name = name or Config.DECODING_DEFAULT_PROFILE
+    if name not in DECODING_PROFILES:
+        raise ValueError(
+            f"Profil de décodage inconnu : '{name}' (profils disponibles : {', '.join(DECODING_PROFILES)})."
+        )
+    return name
+
+
+def max_new_tokens_for(profile, source_length):
+    """Plafond de tokens générés pour une source de `source_length` tokens."""
+    settings = DECODING_PROFILES[resolve_profile(profile)]
+    if settings["length_ratio"] is None:
+        return settings["max_new_tokens"]
+    budget = int(settings["length_ratio"] * source_length) + settings["length_margin"]
+    return max(1, min(settings["max_new_tokens"], budget))
+
+
+def generation_kwargs(profile, source_length, deadline=None, streaming=False):
+    """Arguments de model.generate pour un profil et la plus longue source d'un batch.
+
+    Avec `streaming`, la génération reste gloutonne (TextIteratorStreamer ne gère pas
+    la recherche en faisceau) ; le plafond de tokens et les gardes restent ceux du profil.
+    """
+    settings = DECODING_PROFILES[resolve_profile(profile)]
+    num_beams = 1 if streaming else settings["num_beams"]
+    kwargs = {
+        "num_beams": num_beams,
+        "max_new_tokens": max_new_tokens_for(profile, source_length),
+        "do_sample": False,
+    }
+    if settings["no_repeat_ngram_size"] is not None:
+        kwargs["no_repeat_ngram_size"] = settings["no_repeat_ngram_size"]
+    if num_beams > 1:
+        kwargs["early_stopping"] = True
+        kwargs["length_penalty"] = settings.get("length_penalty", 1.0)
+    if deadline is not None:
+        kwargs["max_time"] = max(_MIN_TIME_SECONDS, deadline - time.monotonic())
+    return kwargs
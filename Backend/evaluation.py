@@ -0,0 +1,166 @@
+# backend/evaluation.py
+# Évaluation hors ligne des modèles sur modele_dataset/mini_dataset :
+# BLEU (sacrebleu, comme dans code_entrainement.ipynb), contrôle de parité
+# d'un backend d'inférence (int8, ONNX...) par rapport au modèle PyTorch fp32 et
+# comparaison des profils de décodage (latence / BLEU).
+import os
+import time
+
+from decoding_profiles import DECODING_PROFILES
+
+from inference import MODEL_CONFIGS, load_model_and_tokenizer, perform_batch_translation
+
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "modele_dataset", "mini_dataset"))
+
+# Fichier du corpus parallèle pour chaque langue de l'application
+DATASET_FILES = {
+    "ar-TD": os.path.join(DATASET_DIR, "for_dataset_arb.txt"),
+    "fr": os.path.join(DATASET_DIR, "for_dataset_fr.txt"),
+}
+
+
+def load_eval_pairs(model_key, limit=200, corpus_dir=None):
+    """Renvoie (sources, références) pour une direction, échantillonnées sur tout le corpus.
+
+    Les lignes sont prises à pas régulier plutôt qu'en tête de fichier (la Genèse),
+    pour couvrir des styles variés. Les paires dont un côté est vide sont ignorées.
+    Avec `corpus_dir`, les paires nettoyées d'un corpus prétraité (flask preprocess-corpus)
+    sont utilisées à la place des fichiers bruts.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    if corpus_dir:
+        from corpus_preprocessing import PreprocessedCorpus
+
+        corpus = PreprocessedCorpus(corpus_dir)
+        languages = (corpus.manifest["source"]["lang"], corpus.manifest["target"]["lang"])
+        if languages != (model_config["source_lang_nllb"], model_config["target_lang_nllb"]):
+            raise ValueError(f"Le corpus {corpus_dir} ({languages[0]} -> {languages[1]}) ne correspond pas à '{model_key}'.")
+        pairs = list(corpus.texts())
+    else:
+        with open(DATASET_FILES[model_config["source_lang_app"]], encoding="utf-8") as source_file, \
+                open(DATASET_FILES[model_config["target_lang_app"]], encoding="utf-8") as target_file:
+            pairs = [
+                (source.strip(), target.strip())
+                for source, target in zip(source_file, target_file)
+                if source.strip() and target.strip()
+            ]
+    if limit and len(pairs) > limit:
+        step = len(pairs) / limit
+        pairs = [pairs[int(i * step)] for i in range(limit)]
+    return [source for source, _ in pairs], [target for _, target in pairs]
+
+
+def corpus_bleu(hypotheses, references):
+    try:
+        import sacrebleu
+    except ImportError as e:
+        raise RuntimeError("Le calcul du BLEU nécessite sacrebleu (pip install sacrebleu).") from e
+    return sacrebleu.corpus_bleu(hypotheses, [references]).score
+
+
+def translate_corpus(texts, tokenizer, model, device, source_lang_nllb, target_lang_nllb, batch_size=16,
+                     profile=None, deadline_ms=None, batch_seconds=None):
+    """Traduit `texts` par lots et renvoie (traductions, durée en secondes).
+
+    Avec `deadline_ms`, chaque lot a sa propre échéance ; `batch_seconds` (liste)
+    reçoit la durée de chaque lot.
+    """
+    started = time.perf_counter()
+    translations = []
+    for start in range(0, len(texts), batch_size):
+        batch_started = time.perf_counter()
+        deadline = time.monotonic() + deadline_ms / 1000.0 if deadline_ms else None
+        translations.extend(perform_batch_translation(
+            texts[start:start + batch_size], tokenizer, model, device,
+            source_lang_nllb, target_lang_nllb, profile=profile, deadline=deadline
+        ))
+        if batch_seconds is not None:
+            batch_seconds.append(time.perf_counter() - batch_started)
+    return translations, time.perf_counter() - started
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def evaluate_profiles(model_key, profiles=None, samples=200, batch_size=1, deadline_ms=None, corpus_dir=None):
+    """Mesure la latence et le BLEU de chaque profil de décodage sur une direction.
+
+    Avec batch_size=1 (par défaut), les latences sont celles d'une phrase, comme pour
+    une requête /translate isolée. Les profils sont évalués sur le même modèle chargé
+    une seule fois, après un préchauffage.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    profiles = list(profiles or DECODING_PROFILES)
+    sources, references = load_eval_pairs(model_key, samples, corpus_dir)
+    languages = (model_config["source_lang_nllb"], model_config["target_lang_nllb"])
+    tokenizer, model, device = load_model_and_tokenizer(model_config["id"], model_config.get("backend", "torch"))
+    if not model or not tokenizer:
+        raise RuntimeError(f"Impossible de charger '{model_config['id']}'.")
+    perform_batch_translation(sources[:1], tokenizer, model, device, *languages)
+
+    results = {}
+    for profile in profiles:
+        batch_seconds = []
+        translations, seconds = translate_corpus(
+            sources, tokenizer, model, device, *languages, batch_size=batch_size,
+            profile=profile, deadline_ms=deadline_ms, batch_seconds=batch_seconds
+        )
+        results[profile] = {
+            "bleu": round(corpus_bleu(translations, references), 2),
+            "seconds": round(seconds, 3),
+            "sentencesPerSecond": round(len(sources) / seconds, 2) if seconds else None,
+            "p50BatchSeconds": round(_percentile(batch_seconds, 0.5), 4) if batch_seconds else None,
+            "p95BatchSeconds": round(_percentile(batch_seconds, 0.95), 4) if batch_seconds else None,
+            "outputChars": sum(len(translation) for translation in translations),
+        }
+    return {
+        "modelKey": model_key,
+        "samples": len(sources),
+        "batchSize": batch_size,
+        "deadlineMs": deadline_ms,
+        "profiles": results,
+    }
+
+
+def check_parity(model_key, backend, model_path=None, samples=200, bleu_tolerance=1.0, batch_size=16, corpus_dir=None):
+    """Compare un backend au modèle PyTorch fp32 de référence pour une direction.
+
+    `model_path` permet d'évaluer un export (ex. dossier ONNX) différent de l'id de
+    MODEL_CONFIGS. Le contrôle échoue si le BLEU baisse de plus de `bleu_tolerance`.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    sources, references = load_eval_pairs(model_key, samples, corpus_dir)
+    languages = (model_config["source_lang_nllb"], model_config["target_lang_nllb"])
+
+    results = {}
+    for name, (model_id, model_backend) in {
+        "baseline": (model_config["id"], "torch"),
+        "candidate": (model_path or model_config["id"], backend),
+    }.items():
+        tokenizer, model, device = load_model_and_tokenizer(model_id, model_backend)
+        if not model or not tokenizer:
+            raise RuntimeError(f"Impossible de charger '{model_id}' avec le backend '{model_backend}'.")
+        translations, seconds = translate_corpus(sources, tokenizer, model, device, *languages, batch_size=batch_size)
+        results[name] = {
+            "modelId": model_id,
+            "backend": model_backend,
+            "bleu": round(corpus_bleu(translations, references), 2),
+            "seconds": round(seconds, 3),
+            "translations": translations,
+        }
+
+    baseline, candidate = results["baseline"], results["candidate"]
+    identical = sum(a == b for a, b in zip(baseline.pop("translations"), candidate.pop("translations")))
+    bleu_delta = round(candidate["bleu"] - baseline["bleu"], 2)
+    return {
+        "modelKey": model_key,
+        "samples": len(sources),
+        "baseline": baseline,
+        "candidate": candidate,
+        "bleuDelta": bleu_delta,
+        "identicalOutputRate": round(identical / len(sources), 4) if sources else 1.0,
+        "speedup": round(baseline["seconds"] / candidate["seconds"], 2) if candidate["seconds"] else None,
+        "passed": bleu_delta >= -bleu_tolerance,
+    }
@@ -0,0 +1,233 @@
+# backend/history_writer.py
+# Écriture groupée (group commit) de l'historique des traductions.
+# Sans regroupement, chaque /translate paie son propre commit SQLite, et les commits des
+# requêtes concurrentes se suivent un par un. Avec HISTORY_GROUP_COMMIT (défaut), une
+# requête qui arrive quand aucun commit n'est en cours écrit ses lignes tout de suite ;
+# celles qui arrivent pendant ce commit attendent qu'il se termine, puis la première
+# d'entre elles insère les lignes de toutes les autres en un seul INSERT + commit (au
+# plus HISTORY_FLUSH_MAX_ROWS lignes). Aucun délai n'est ajouté à une requête seule.
+#
+# L'id de chaque ligne est attribué par la base : la requête attend le commit de son
+# lot avant de renvoyer l'id que le front utilise ensuite pour une correction, et une
+# écriture en échec est signalée à l'appelant (exception) au lieu d'un id qui n'existe
+# pas. Plusieurs processus peuvent donc écrire dans la même base. Sans
+# HISTORY_GROUP_COMMIT, chaque requête insère ses lignes elle-même, dans son propre commit.
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+
+from sqlalchemy import event
+
+from models import Translation, User, db
+
+# Réglages appliqués à chaque connexion SQLite : en WAL, les lectures ne bloquent plus
+# l'écriture et synchronous=NORMAL ne fait un fsync qu'aux checkpoints.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+
+def configure_sqlite_engine(engine):
+    """Active WAL et les pragmas ci-dessus sur toutes les connexions d'un moteur SQLite."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    # Connexions déjà ouvertes par le pool (create_all...) : elles sont recréées
+    engine.dispose()
+
+
+class _PendingRow:
+    __slots__ = ("row", "future")
+
+    def __init__(self, row):
+        self.row = row
+        self.future = Future()
+
+
+class HistoryWriter:
+    """Insertions de Translation regroupées par commit (group commit, sans thread dédié)."""
+
+    def __init__(self, enabled=True, flush_max_rows=100, user_cache_size=10000, user_cache_ttl=300):
+        self.enabled = enabled
+        self.flush_max_rows = flush_max_rows
+        self.user_cache_size = user_cache_size
+        self.user_cache_ttl = user_cache_ttl
+        self._app = None
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        # Un seul commit à la fois : les lignes arrivées pendant un commit forment le lot suivant
+        self._flush_lock = threading.Lock()
+        self._known_users = OrderedDict()
+        self._users_lock = threading.Lock()
+        self.rows_written = 0
+        self.flushes = 0
+        self.failed_rows = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("HISTORY_GROUP_COMMIT", self.enabled)
+        self.flush_max_rows = app.config.get("HISTORY_FLUSH_MAX_ROWS", self.flush_max_rows)
+        self.user_cache_ttl = app.config.get("USER_CACHE_TTL_SECONDS", self.user_cache_ttl)
+        self._app = app
+
+    # --- Utilisateurs ---
+
+    def user_exists(self, user_id):
+        """Existence d'un utilisateur, mise en cache (les comptes ne sont jamais supprimés).
+
+        Seuls les résultats positifs sont gardés : un compte créé entre-temps est vu tout de suite.
+        """
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        now = time.monotonic()
+        with self._users_lock:
+            checked_at = self._known_users.get(user_id)
+            if checked_at is not None and now - checked_at < self.user_cache_ttl:
+                self._known_users.move_to_end(user_id)
+                return True
+        if db.session.query(User.id).filter(User.id == user_id).first() is None:
+            return False
+        with self._users_lock:
+            self._known_users[user_id] = now
+            self._known_users.move_to_end(user_id)
+            while len(self._known_users) > self.user_cache_size:
+                self._known_users.popitem(last=False)
+        return True
+
+    # --- Mise en file ---
+
+    def enqueue_many(self, rows):
+        """Enregistre des lignes (colonnes de Translation, sans id) et renvoie les objets
+        Translation correspondants, avec l'id attribué par la base, non attachés à la session.
+
+        Revient après le commit du lot qui contient les lignes ; lève l'erreur d'écriture sinon.
+        """
+        pending = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault("timestamp", datetime.utcnow())
+            row.setdefault("is_correction", False)
+            row.setdefault("original_translation_id", None)
+            pending.append(_PendingRow(row))
+        if not pending:
+            return []
+
+        if not self.enabled:
+            self._write(pending)
+        else:
+            with self._pending_lock:
+                self._pending.extend(pending)
+            # Pendant l'attente du verrou, le commit en cours a pu emporter nos lignes ;
+            # sinon on écrit le lot suivant, avec les lignes des autres requêtes en attente
+            while not pending[-1].future.done():
+                with self._flush_lock:
+                    if not pending[-1].future.done():
+                        self._flush_pending()
+        return [item.future.result() for item in pending]
+
+    def enqueue(self, **row):
+        return self.enqueue_many([row])[0]
+
+    # --- Écriture ---
+
+    def flush(self):
+        """Écrit toutes les lignes en attente. Sans effet si la file est vide."""
+        with self._flush_lock:
+            while self._flush_pending():
+                pass
+
+    def _flush_pending(self):
+        """Écrit le lot suivant (au plus flush_max_rows lignes) ; faux si la file est vide."""
+        with self._pending_lock:
+            batch = self._pending[:self.flush_max_rows]
+            del self._pending[:self.flush_max_rows]
+        if batch:
+            self._write(batch)
+        return bool(batch)
+
+    def _write(self, batch):
+        """Insère un lot en une transaction et résout le Future de chaque ligne avec son
+        objet Translation (id attribué par la base), ou avec l'erreur d'écriture."""
+        with self._app.app_context():
+            try:
+                started = time.perf_counter()
+                entries = [Translation(**item.row) for item in batch]
+                db.session.add_all(entries)
+                db.session.flush()
+                ids = [entry.id for entry in entries]
+                db.session.commit()
+                self._observe_commit(batch, time.perf_counter() - started)
+            except Exception as e:
+                db.session.rollback()
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                else:
+                    # Une ligne invalide ne doit pas faire perdre celles des autres requêtes
+                    print(f"Erreur lors de l'écriture groupée de l'historique ({len(batch)} lignes): {e}. Nouvel essai ligne par ligne.")
+                    for item in batch:
+                        self._write_row(item)
+            else:
+                self.rows_written += len(batch)
+                for item, entry_id in zip(batch, ids):
+                    item.future.set_result(Translation(**item.row, id=entry_id))
+            finally:
+                db.session.remove()
+        self.flushes += 1
+
+    @staticmethod
+    def _observe_commit(batch, seconds):
+        """Durée du commit dans translation_stage_seconds{stage="db_commit"}, pour chaque
+        direction du lot (comparable aux autres étapes par direction)."""
+        from metrics import STAGE_SECONDS
+
+        directions = {f"{item.row.get('from_lang')}_to_{item.row.get('to_lang')}" for item in batch}
+        for direction in directions:
+            STAGE_SECONDS.observe(seconds, stage="db_commit", direction=direction)
+
+    def _write_row(self, item):
+        try:
+            entry = Translation(**item.row)
+            db.session.add(entry)
+            db.session.flush()
+            entry_id = entry.id
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._fail(item, e)
+            return
+        self.rows_written += 1
+        item.future.set_result(Translation(**item.row, id=entry_id))
+
+    def _fail(self, item, error):
+        self.failed_rows += 1
+        print(f"Erreur: traduction non enregistrée dans l'historique: {error}")
+        item.future.set_exception(error)
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "pendingRows": pending,
+            "rowsWritten": self.rows_written,
+            "failedRows": self.failed_rows,
+            "flushes": self.flushes,
+            "cachedUsers": len(self._known_users),
+        }
+
+
+history_writer = HistoryWriter()
@@ -0,0 +1,358 @@
+# backend/inference.py
+# Chargement des modèles NLLB et inférence locale.
+# torch et transformers (plusieurs secondes d'import) ne sont importés qu'au premier
+# chargement d'un modèle : les commandes base de données / authentification et le
+# démarrage du serveur n'en paient pas le coût.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from inference_backends import DEFAULT_BACKEND, load_backend_model
+from model_registry import model_registry, load_model_configs
+from decoding_profiles import generation_kwargs, resolve_profile
+from metrics import GENERATIONS, TOKENS, TOKENS_PER_SECOND, stage
+
+# --- Configuration des Modèles Hugging Face locaux ---
+# Ajout des codes de langue NLLB (utilisés pour tokenizer.src_lang et forced_bos_token_id)
+# "backend" choisit le moteur d'inférence : "torch", "torch-int8" ou "onnx" (voir inference_backends.py)
+# Directions par défaut, remplacées par celles du fichier MODEL_REGISTRY_FILE s'il existe
+# (voir model_registry.example.json).
+DEFAULT_MODEL_CONFIGS = {
+    "ar-TD_to_fr": {
+        "id": "Koubra-Gaby/facebook-NLLB-arb-fr", # Ou "Koubra-Gaby/facebook-NLLB-arb-fr" si c'est le même modèle renommé
+        "source_lang_app": "ar-TD", # Langue utilisée par l'application frontend
+        "target_lang_app": "fr",    # Langue utilisée par l'application frontend
+        "source_lang_nllb": "acm_Latn", # Code NLLB réel pour l'arabe tchadien (latin)
+        "target_lang_nllb": "fra_Latn",  # Code NLLB réel pour le français
+        "backend": "torch"
+    },
+    "fr_to_ar-TD": {
+        "id": "Koubra-Gaby/facebook-NLLB-fr-arb", # Ou "/content/sample_data/Modele_facebook/checkpoint-19000" si c'est un chemin local spécifique
+        "source_lang_app": "fr",
+        "target_lang_app": "ar-TD",
+        "source_lang_nllb": "fra_Latn",
+        "target_lang_nllb": "arb_Latn", # Code NLLB réel pour l'arabe standard (latin) ou acm_Latn si c'est Tchadien
+        "backend": "torch"
+    }
+}
+
+MODEL_CONFIGS, _registry_budget_mb = load_model_configs(Config.MODEL_REGISTRY_FILE, DEFAULT_MODEL_CONFIGS)
+if _registry_budget_mb:
+    model_registry.budget_bytes = int(_registry_budget_mb * 1024 * 1024)
+
+_global_device = None
+
+
+def get_device():
+    """Périphérique des modèles, déterminé (avec l'import de torch) au premier besoin."""
+    global _global_device
+    if _global_device is None:
+        import torch
+        _global_device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Périphérique global pour les modèles : {_global_device.upper()}")
+    return _global_device
+
+# Les modèles chargés vivent dans le registre (model_registry.py) : état de chargement
+# par modèle exposé par /api/ready et /api/models, un seul chargement à la fois par
+# modèle, éviction LRU sous budget mémoire.
+warmup_seconds = {}
+# Directions chargées par preload_all_models dont la génération de préchauffage n'est
+# pas terminée : /api/ready les compte comme non prêtes
+_warming_up = set()
+
+# tokenizer.src_lang est un état partagé : le choix de la langue source et la
+# tokenisation doivent être atomiques quand plusieurs threads (directions, streaming,
+# tâches) utilisent le même tokenizer.
+_tokenize_lock = threading.Lock()
+
+
+def _load_from_disk(model_id, backend):
+    from vocab_pruning import load_tokenizer
+
+    print(f"Chargement du tokenizer '{model_id}'...")
+    tokenizer = load_tokenizer(model_id)
+    print(f"Chargement du modèle '{model_id}' (backend {backend})...")
+    model, device = load_backend_model(model_id, backend, get_device())
+    print(f"Modèle '{model_id}' chargé localement et mis en cache sur {device.upper()}.")
+    return tokenizer, model, device
+
+
+def load_model_and_tokenizer(model_id, backend=DEFAULT_BACKEND, pinned=False):
+    """Charge (ou récupère dans le registre) un modèle. Renvoie (None, None, None) en cas d'échec.
+
+    Sans bail, le modèle peut être évincé dès que le budget mémoire l'exige : les
+    chemins de requête utilisent direction_model_lease.
+    """
+    try:
+        return model_registry.load((model_id, backend), lambda: _load_from_disk(model_id, backend), pinned)
+    except Exception as e:
+        print(f"ERREUR: Impossible de charger le modèle '{model_id}'.")
+        print(f"Détails de l'erreur: {e}")
+        return None, None, None
+
+
+def _direction_key(model_key):
+    model_config = MODEL_CONFIGS[model_key]
+    return model_config["id"], model_config.get("backend", DEFAULT_BACKEND)
+
+
+def load_direction_model(model_key):
+    """Charge (ou récupère en cache) le modèle d'une direction de MODEL_CONFIGS avec son backend."""
+    model_id, backend = _direction_key(model_key)
+    return load_model_and_tokenizer(model_id, backend, MODEL_CONFIGS[model_key].get("pinned", False))
+
+
+def prefetch_direction_model(model_key):
+    """Relance en arrière-plan le chargement du modèle évincé d'une direction (voir ModelRegistry.prefetch)."""
+    model_id, backend = _direction_key(model_key)
+    return model_registry.prefetch(
+        (model_id, backend), lambda: _load_from_disk(model_id, backend), MODEL_CONFIGS[model_key].get("pinned", False)
+    )
+
+
+def direction_model_lease(model_key, timeout=None):
+    """Bail sur le modèle d'une direction : `with direction_model_lease(k) as (tokenizer, model, device)`.
+
+    Le modèle reste résident pendant le bloc ; s'il a été évincé, il est rechargé
+    en arrière-plan et le bloc attend (au plus `timeout` secondes) son chargement.
+    """
+    model_id, backend = _direction_key(model_key)
+    return model_registry.lease(
+        (model_id, backend), lambda: _load_from_disk(model_id, backend),
+        MODEL_CONFIGS[model_key].get("pinned", False), timeout
+    )
+
+
+def warm_up_direction(model_key):
+    """Charge le modèle d'une direction puis lance une courte génération de préchauffage.
+
+    La première génération est nettement plus lente (initialisation des noyaux) :
+    mieux vaut la payer au démarrage que sur la première requête d'un utilisateur.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    started = None
+    try:
+        with direction_model_lease(model_key) as (tokenizer, model, device):
+            started = time.perf_counter()
+            perform_batch_translation(
+                ["Bonjour."], tokenizer, model, device,
+                model_config["source_lang_nllb"], model_config["target_lang_nllb"],
+                direction=model_key
+            )
+    except Exception as e:
+        if started is None:
+            return False
+        print(f"Avertissement: préchauffage de '{model_key}' impossible: {e}")
+        return False
+    warmup_seconds[model_key] = round(time.perf_counter() - started, 3)
+    print(f"Direction '{model_key}' préchauffée.")
+    return True
+
+
+def preload_all_models(wait=False):
+    """Charge et préchauffe toutes les directions de MODEL_CONFIGS en parallèle.
+
+    Avec wait=False, le chargement se fait en arrière-plan et /api/ready indique
+    l'avancement ; avec wait=True, la fonction rend la main une fois tout chargé.
+    """
+    for model_key in MODEL_CONFIGS:
+        model_registry.mark_loading(_direction_key(model_key))
+        _warming_up.add(model_key)
+
+    def preload(model_key):
+        try:
+            return warm_up_direction(model_key)
+        finally:
+            _warming_up.discard(model_key)
+
+    executor = ThreadPoolExecutor(max_workers=len(MODEL_CONFIGS), thread_name_prefix="model-preload")
+    futures = [executor.submit(preload, model_key) for model_key in MODEL_CONFIGS]
+    executor.shutdown(wait=wait)
+    if wait:
+        return all(future.result() for future in futures)
+    return None
+
+
+def get_models_readiness(require_all=True):
+    """Renvoie (prêt, détail par direction) pour /api/ready."""
+    directions = {}
+    for model_key, model_config in MODEL_CONFIGS.items():
+        backend = model_config.get("backend", DEFAULT_BACKEND)
+        status = model_registry.status((model_config["id"], backend)) or {"status": "not_loaded", "loadSeconds": None, "error": None}
+        directions[model_key] = {
+            "modelId": model_config["id"],
+            "backend": backend,
+            "warmupSeconds": warmup_seconds.get(model_key),
+            **status
+        }
+        if status["status"] == "ready" and model_key in _warming_up:
+            # Chargé, mais la première génération (la plus lente) n'a pas encore eu lieu
+            directions[model_key]["status"] = "warming_up"
+    states = [direction["status"] for direction in directions.values()]
+    if require_all:
+        # Un modèle évincé par le budget mémoire est rechargé à la demande : pas bloquant
+        ready = all(state in ("ready", "evicted") for state in states)
+    else:
+        ready = not any(state in ("loading", "warming_up", "failed") for state in states)
+    return ready, directions
+
+
+# MODIFICATION ICI : perform_translation doit maintenant accepter les codes de langue NLLB
+def perform_batch_translation(texts, tokenizer, model, device, source_lang_nllb, target_lang_nllb, bucket_ratio=2.0,
+                              direction=None, profile=None, deadline=None):
+    """Traduit une liste de textes et renvoie les traductions dans le même ordre.
+
+    Les textes sont triés par longueur (en tokens) et regroupés en seaux de
+    longueurs proches, pour limiter le padding : un appel à model.generate par seau.
+    `direction` sert d'étiquette aux métriques (par défaut, la paire de codes NLLB).
+    `profile` est un profil de decoding_profiles.py (par défaut DECODING_DEFAULT_PROFILE) ;
+    passé `deadline` (time.monotonic()), chaque seau renvoie la meilleure hypothèse obtenue.
+    """
+    if not model or not tokenizer:
+        raise RuntimeError("Le modèle de traduction ou le tokenizer n'a pas pu être chargé.")
+    direction = direction or f"{source_lang_nllb}_to_{target_lang_nllb}"
+    profile = resolve_profile(profile)
+
+    with _tokenize_lock, stage("tokenize", direction):
+        # 1. Configurer le tokenizer pour la langue source NLLB
+        tokenizer.src_lang = source_lang_nllb
+
+        # 2. Tokeniser l'entrée (le tokenizer ajoute automatiquement le token de langue source)
+        encoded = tokenizer(list(texts), truncation=True)
+
+    # 3. Obtenir l'ID du token de langue cible NLLB
+    # On préfixe et on suffixe avec "__" pour qu'il corresponde à la forme des tokens de langue NLLB
+    target_lang_token_id = tokenizer.convert_tokens_to_ids(f"__{target_lang_nllb}__")
+    
+    if target_lang_token_id is None:
+        raise ValueError(f"Impossible de trouver l'ID du token pour la langue cible NLLB: {target_lang_nllb}")
+
+    # 4. Regrouper par longueur : un seau s'arrête dès qu'un texte dépasse
+    # `bucket_ratio` fois la longueur du plus court du seau.
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    TOKENS.inc(sum(lengths), direction=direction, kind="input")
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets = []
+    for i in order:
+        if buckets and lengths[i] <= bucket_ratio * lengths[buckets[-1][0]]:
+            buckets[-1].append(i)
+        else:
+            buckets.append([i])
+
+    # 5. Générer puis décoder chaque seau
+    translations = [None] * len(lengths)
+    for bucket in buckets:
+        inputs = tokenizer.pad(
+            {k: [encoded[k][i] for i in bucket] for k in ("input_ids", "attention_mask")},
+            return_tensors="pt"
+        )
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        # Plafond de tokens calculé sur la source la plus longue du seau
+        options = generation_kwargs(profile, max(lengths[i] for i in bucket), deadline)
+        started = time.perf_counter()
+        with stage("generate", direction):
+            outputs = model.generate(
+                **inputs,
+                forced_bos_token_id=target_lang_token_id, # Utilisation de l'ID corrigé
+                **options
+            )
+        generate_seconds = time.perf_counter() - started
+        GENERATIONS.inc(direction=direction, profile=profile,
+                        deadline=str(deadline is not None and time.monotonic() >= deadline).lower())
+        output_tokens = int((outputs != tokenizer.pad_token_id).sum())
+        TOKENS.inc(output_tokens, direction=direction, kind="output")
+        if generate_seconds > 0:
+            TOKENS_PER_SECOND.observe(output_tokens / generate_seconds, direction=direction)
+        with stage("decode", direction):
+            decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        for i, translated in zip(bucket, decoded):
+            translations[i] = translated
+
+    return translations
+
+
+def perform_translation(text, tokenizer, model, device, source_lang_nllb, target_lang_nllb, profile=None, deadline=None):
+    return perform_batch_translation([text], tokenizer, model, device, source_lang_nllb, target_lang_nllb,
+                                     profile=profile, deadline=deadline)[0]
+
+
+def _stop_when_set(flag):
+    """StoppingCriteria qui arrête model.generate dès que `flag` (threading.Event) est levé."""
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _FlagStoppingCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), flag.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([_FlagStoppingCriteria()])
+
+
+def stream_translation(text, tokenizer, model, device, source_lang_nllb, target_lang_nllb, profile=None, deadline=None):
+    """Générateur qui renvoie les morceaux de texte décodés pendant que model.generate tourne.
+
+    Le décodage reste glouton quel que soit le profil (pas de faisceau en streaming).
+    Si le générateur est fermé avant la fin (client déconnecté), la génération est
+    arrêtée au token suivant et le thread est attendu avant de rendre la main.
+    """
+    if not model or not tokenizer:
+        raise RuntimeError("Le modèle de traduction ou le tokenizer n'a pas pu être chargé.")
+
+    with _tokenize_lock:
+        tokenizer.src_lang = source_lang_nllb
+        inputs = tokenizer(text, return_tensors="pt", truncation=True)
+    inputs = {k: v.to(device) for k, v in inputs.items()}
+    options = generation_kwargs(profile, inputs["input_ids"].shape[1], deadline, streaming=True)
+    target_lang_token_id = tokenizer.convert_tokens_to_ids(f"__{target_lang_nllb}__")
+
+    if target_lang_token_id is None:
+        raise ValueError(f"Impossible de trouver l'ID du token pour la langue cible NLLB: {target_lang_nllb}")
+
+    from transformers import TextIteratorStreamer
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    stop_flag = threading.Event()
+    errors = []
+
+    def run_generate():
+        try:
+            model.generate(
+                **inputs,
+                forced_bos_token_id=target_lang_token_id,
+                streamer=streamer,
+                stopping_criteria=_stop_when_set(stop_flag),
+                **options
+            )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    generation_thread = threading.Thread(target=run_generate, name="stream-generate", daemon=True)
+    generation_thread.start()
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+    finally:
+        # Fin normale, erreur ou fermeture du générateur : la génération ne doit pas
+        # continuer à occuper le CPU après la libération de sa place d'inférence.
+        stop_flag.set()
+        generation_thread.join()
+    if errors:
+        raise errors[0]
+
+
+def resolve_model_key(from_lang, to_lang):
+    """Renvoie la clé de MODEL_CONFIGS correspondant à la paire de langues, ou None.
+
+    Si plusieurs checkpoints servent la même paire, celui marqué "default" l'emporte,
+    sinon le premier déclaré.
+    """
+    matches = [
+        model_key for model_key, model_config in MODEL_CONFIGS.items()
+        if from_lang == model_config["source_lang_app"] and to_lang == model_config["target_lang_app"]
+    ]
+    for model_key in matches:
+        if MODEL_CONFIGS[model_key].get("default"):
+            return model_key
+    return matches[0] if matches else None
@@ -0,0 +1,167 @@
+# backend/inference_backends.py
+# Backends d'inférence sélectionnables par entrée de MODEL_CONFIGS (clé "backend").
+# Tous renvoient un objet exposant `generate(...)` comme un modèle transformers,
+# perform_batch_translation n'a donc pas à connaître le backend utilisé :
+#   - "torch"      : modèle PyTorch fp32 (comportement historique) ;
+#   - "torch-int8" : quantification dynamique int8 des couches Linear (CPU uniquement) ;
+#   - "onnx"       : encodeur / décodeur exportés pour ONNX Runtime, avec cache KV.
+#                    L'"id" du modèle doit alors pointer vers un export produit par
+#                    `flask export-model` (voir export_onnx_model).
+# torch, transformers et optimum ne sont importés qu'au chargement d'un modèle ; le
+# backend de chaque direction est vérifié dès la lecture de la configuration
+# (check_backend), sans ces imports.
+import importlib.util
+import os
+import shutil
+
+DEFAULT_BACKEND = "torch"
+# Paquets nécessaires en plus de torch / transformers
+_BACKEND_REQUIREMENTS = {
+    "onnx": ("optimum", "onnxruntime"),
+}
+_ONNX_INSTALL_HINT = "pip install \"optimum[onnxruntime]\""
+
+
+def _load_torch(model_id, device):
+    from transformers import AutoModelForSeq2SeqLM
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_id)
+    model.to(device)
+    model.eval()
+    return model, device
+
+
+def _load_torch_int8(model_id, device):
+    import torch
+
+    # La quantification dynamique de PyTorch ne s'exécute que sur CPU
+    model, _ = _load_torch(model_id, "cpu")
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, "cpu"
+
+
+def _load_onnx(model_id, device):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise RuntimeError(f"Le backend 'onnx' nécessite optimum et onnxruntime ({_ONNX_INSTALL_HINT}).") from e
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_id, use_cache=True, provider="CPUExecutionProvider")
+    return model, "cpu"
+
+
+def load_torch_model_mmap(model_id):
+    """Charge un checkpoint safetensors en mémoire mappée (mmap), sans copie des poids.
+
+    Le squelette du modèle est créé sur le périphérique "meta" puis ses paramètres
+    sont remplacés (assign=True) par les tenseurs mappés du fichier : les pages des
+    poids restent celles du cache de fichiers du noyau, partagées copy-on-write entre
+    tous les processus qui chargent le même checkpoint (workers d'inférence).
+    Lève une exception si le checkpoint n'est pas au format safetensors.
+    """
+    import glob
+    import torch
+    from safetensors import safe_open
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, GenerationConfig
+
+    checkpoint_dir = model_id
+    if not os.path.isdir(checkpoint_dir):
+        from huggingface_hub import snapshot_download
+        checkpoint_dir = snapshot_download(model_id, allow_patterns=["*.json", "*.safetensors"])
+
+    weight_files = sorted(glob.glob(os.path.join(checkpoint_dir, "*.safetensors")))
+    if not weight_files:
+        raise FileNotFoundError(f"Aucun fichier safetensors dans '{checkpoint_dir}'.")
+
+    state_dict = {}
+    for weight_file in weight_files:
+        with safe_open(weight_file, framework="pt") as f:
+            state_dict.update({name: f.get_tensor(name) for name in f.keys()})
+
+    config = AutoConfig.from_pretrained(checkpoint_dir)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(config)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+
+    # Les buffers non sauvegardés (positions sinusoïdales de NLLB/M2M100) sont recalculés
+    for module in model.modules():
+        for name, buffer in list(module.named_buffers(recurse=False)):
+            if buffer.is_meta and hasattr(module, "make_weights"):
+                num_positions = buffer.shape[0]
+                delattr(module, name)
+                module.make_weights(num_positions, module.embedding_dim, module.padding_idx)
+
+    still_meta = [name for name, tensor in list(model.named_parameters()) + list(model.named_buffers()) if tensor.is_meta]
+    if still_meta:
+        raise RuntimeError(f"Poids absents du checkpoint '{model_id}' : {', '.join(still_meta[:5])}")
+
+    if os.path.exists(os.path.join(checkpoint_dir, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(checkpoint_dir)
+    model.eval()
+    return model
+
+
+BACKEND_LOADERS = {
+    "torch": _load_torch,
+    "torch-int8": _load_torch_int8,
+    "onnx": _load_onnx,
+}
+
+
+def check_backend(backend):
+    """Vérifie qu'un backend existe et que ses dépendances sont installées, sans les importer.
+
+    Renvoie le nom du backend (DEFAULT_BACKEND si vide) ; lève ValueError sinon.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKEND_LOADERS:
+        raise ValueError(f"Backend d'inférence inconnu : '{backend}'. Choix possibles : {', '.join(BACKEND_LOADERS)}.")
+    missing = [name for name in _BACKEND_REQUIREMENTS.get(backend, ()) if importlib.util.find_spec(name) is None]
+    if missing:
+        raise ValueError(
+            f"Le backend '{backend}' nécessite {' et '.join(missing)}, non installé(s) ({_ONNX_INSTALL_HINT})."
+        )
+    return backend
+
+
+def load_backend_model(model_id, backend, device):
+    """Charge `model_id` avec le backend demandé. Renvoie (modèle, périphérique effectif)."""
+    return BACKEND_LOADERS[check_backend(backend)](model_id, device)
+
+
+def export_onnx_model(model_id, output_dir, quantize=True):
+    """Exporte un checkpoint NLLB vers ONNX (encodeur + décodeur avec cache KV).
+
+    Avec quantize=True, les graphes sont en plus quantifiés dynamiquement en int8
+    (ONNX Runtime). Le tokenizer est sauvegardé dans le même dossier, qui peut
+    ensuite servir d'"id" à une entrée de MODEL_CONFIGS avec "backend": "onnx".
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise RuntimeError(f"L'export ONNX nécessite optimum et onnxruntime ({_ONNX_INSTALL_HINT}).") from e
+    from transformers import AutoTokenizer
+
+    # Sans quantification, l'export fp32 est écrit directement dans output_dir ;
+    # sinon il est gardé dans output_dir/fp32 et les graphes int8 vont dans output_dir.
+    export_dir = os.path.join(output_dir, "fp32") if quantize else output_dir
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_id, export=True, use_cache=True)
+    model.save_pretrained(export_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    tokenizer.save_pretrained(output_dir)
+    # Checkpoint au vocabulaire réduit : la table des ids suit le tokenizer
+    from vocab_pruning import PRUNED_VOCAB_FILE
+    if os.path.isfile(os.path.join(model_id, PRUNED_VOCAB_FILE)):
+        shutil.copy(os.path.join(model_id, PRUNED_VOCAB_FILE), os.path.join(output_dir, PRUNED_VOCAB_FILE))
+
+    if quantize:
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for file_name in sorted(os.listdir(export_dir)):
+            if file_name.endswith(".onnx"):
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+                quantizer.quantize(save_dir=output_dir, quantization_config=qconfig, file_suffix=None)
+            elif file_name.endswith(".json"):
+                shutil.copy(os.path.join(export_dir, file_name), os.path.join(output_dir, file_name))
+    return output_dir
@@ -0,0 +1,103 @@
+# backend/jobs.py
+# Tâches de traduction asynchrones (documents volumineux).
+# Une tâche est soumise, exécutée sur un pool de threads en arrière-plan
+# (les modèles déjà chargés sont réutilisés), puis interrogée jusqu'à la fin.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class TranslationJob:
+    def __init__(self, total, **metadata):
+        self.id = uuid.uuid4().hex
+        self.status = JOB_PENDING
+        self.total = total
+        self.done = 0
+        self.results = None
+        self.error = None
+        self.metadata = metadata
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def advance(self, count):
+        self.done = min(self.total, self.done + count)
+
+    def to_dict(self):
+        return {
+            'jobId': self.id,
+            'status': self.status,
+            'total': self.total,
+            'done': self.done,
+            'progress': (self.done / self.total) if self.total else 1.0,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            **self.metadata,
+        }
+
+
+class JobManager:
+    """Exécute des tâches sur un pool de threads et garde les dernières en mémoire."""
+
+    def __init__(self, max_workers=2, retention=100):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("TRANSLATION_JOB_WORKERS", self.max_workers)
+        self.retention = app.config.get("TRANSLATION_JOB_RETENTION", self.retention)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="translation-job")
+            return self._executor
+
+    def submit(self, work_fn, total, **metadata):
+        """Crée une tâche et planifie `work_fn(job)`, qui doit renvoyer la liste des résultats."""
+        job = TranslationJob(total, **metadata)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._get_executor().submit(self._run, job, work_fn)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, work_fn):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.results = work_fn(job)
+            job.done = job.total
+            job.status = JOB_COMPLETED
+        except Exception as e:
+            print(f"Erreur dans la tâche de traduction {job.id}: {e}")
+            job.error = f"{type(e).__name__}: {str(e)}"
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        # On ne supprime que des tâches terminées, les plus anciennes d'abord.
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (JOB_COMPLETED, JOB_FAILED)]
+        excess = len(self._jobs) - self.retention
+        for job_id in finished[:max(0, excess)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,338 @@
+# backend/metrics.py
+# Instrumentation du chemin de traduction, sans dépendance externe.
+# Histogrammes de latence par étape (parsing JSON, recherche utilisateur, tokenisation,
+# generate, batch_decode, commit SQLite...) et par direction, compteurs de tokens,
+# attente dans la file du micro-batcher, hits du cache et de la mémoire de traduction.
+# Le tout est exposé au format texte de Prometheus sur /metrics.
+# Les workers du pool d'inférence (processus séparés) vident leurs propres métriques
+# après chaque batch (registry.drain()) et les renvoient avec le résultat : le serveur
+# web les ajoute aux siennes (registry.merge()).
+#
+# Profilage à la demande : si PROFILING_ENABLED est actif, une requête portant l'en-tête
+# `X-Profile: 1` est échantillonnée (piles de tous les threads, y compris ceux des
+# micro-batchers qui exécutent model.generate). Les piles agrégées sont écrites au
+# format "collapsed" (flamegraph.pl, speedscope) et l'id du profil est renvoyé dans
+# l'en-tête X-Profile-Id.
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+# Bornes (en secondes) adaptées à des étapes de quelques ms (cache) à quelques s (generate)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def drain(self):
+        """Renvoie les valeurs accumulées et les remet à zéro."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class CounterMetric(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def merge(self, values):
+        with self._lock:
+            for key, (bucket_counts, total, count) in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+                state[0] = [own + other for own, other in zip(state[0], bucket_counts)]
+                state[1] += total
+                state[2] += count
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = CounterMetric(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = HistogramMetric(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """`collector()` renvoie des (nom, aide, {labels}, valeur) lus au moment du scrape (jauges).
+
+        Un collecteur déjà enregistré (nouvel appel à create_app) n'est pas ajouté une seconde fois.
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def drain(self):
+        """Valeurs accumulées depuis le dernier appel, par nom de métrique (pour merge())."""
+        snapshot = {}
+        for metric in self._metrics:
+            values = metric.drain()
+            if values:
+                snapshot[metric.name] = values
+        return snapshot
+
+    def merge(self, snapshot):
+        """Ajoute les valeurs vidées par drain() dans un autre processus."""
+        metrics = {metric.name: metric for metric in self._metrics}
+        for name, values in snapshot.items():
+            if name in metrics:
+                metrics[name].merge(values)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        gauges = {}
+        for collector in self._collectors:
+            try:
+                for name, documentation, labels, value in collector():
+                    gauges.setdefault(name, (documentation, []))[1].append((labels, value))
+            except Exception as e:
+                print(f"Avertissement: collecteur de métriques en erreur: {e}")
+        for name, (documentation, samples) in gauges.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "translation_stage_seconds", "Durée de chaque étape du chemin de traduction.", ("stage", "direction")
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP par route.", ("endpoint", "method", "status")
+)
+TOKENS = registry.counter(
+    "translation_tokens_total", "Tokens traités par model.generate (kind=input|output).", ("direction", "kind")
+)
+TOKENS_PER_SECOND = registry.histogram(
+    "translation_generate_tokens_per_second", "Débit de génération (tokens produits / s) par appel à generate.",
+    ("direction",), RATE_BUCKETS
+)
+BATCH_SIZE = registry.histogram(
+    "translation_batch_size", "Nombre de textes par batch du micro-batcher.", ("direction",), SIZE_BUCKETS
+)
+GENERATIONS = registry.counter(
+    "translation_generations_total",
+    "Appels à model.generate par profil de décodage (deadline=true si l'échéance a coupé la génération).",
+    ("direction", "profile", "deadline")
+)
+ADMISSIONS = registry.counter(
+    "translation_admission_total",
+    "Segments admis ou refusés par le contrôle d'admission (result=admitted|queue_full|deadline|dropped).",
+    ("direction", "result")
+)
+LOOKUPS = registry.counter(
+    "translation_lookups_total", "Consultations de la mémoire de traduction et du cache (result=hit|miss).",
+    ("source", "direction", "result")
+)
+
+
+@contextmanager
+def stage(name, direction=""):
+    """Mesure la durée du bloc dans translation_stage_seconds{stage, direction}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, direction=direction)
+
+
+def record_lookup(source, direction, hit):
+    LOOKUPS.inc(source=source, direction=direction, result="hit" if hit else "miss")
+
+
+class SamplingProfiler:
+    """Échantillonne périodiquement les piles de tous les threads du processus."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as profile_file:
+            for stack, count in self.samples.most_common():
+                profile_file.write(f"{stack} {count}\n")
+
+
+def _service_gauges():
+    # Jauges lues au moment du scrape dans les composants du service
+    from admission import admission_controller
+    from history_writer import history_writer
+    from model_registry import model_registry
+    from translation_cache import translation_cache
+    from translation_memory import translation_memory
+    from worker_pool import inference_worker_pool
+
+    cache = translation_cache.stats()
+    yield "translation_cache_entries", "Entrées du cache de traduction.", {}, cache["entries"]
+    yield "translation_cache_bytes", "Mémoire estimée du cache de traduction.", {}, cache["bytes"]
+    yield "history_pending_rows", "Traductions en attente d'écriture dans l'historique.", {}, history_writer.stats()["pendingRows"]
+    for direction, entries in translation_memory.stats()["entries"].items():
+        yield "translation_memory_entries", "Entrées de la mémoire de traduction.", {"direction": direction}, entries
+    for model in model_registry.stats()["models"]:
+        labels = {"model_id": model["modelId"], "backend": model["backend"]}
+        yield "model_resident_bytes", "Mémoire estimée des modèles résidents.", labels, model["residentBytes"]
+        yield "model_leases", "Requêtes en cours d'utilisation du modèle.", labels, model["leases"]
+    for direction, gate in admission_controller.stats().items():
+        yield "inference_pending_segments", "Segments admis en file ou en cours d'inférence.", {"direction": direction}, gate["pending"]
+        yield "inference_running_batches", "Batches en cours d'inférence.", {"direction": direction}, gate["running"]
+    if inference_worker_pool.enabled:
+        pool = inference_worker_pool.stats()
+        yield "inference_pool_pending_batches", "Batches en attente dans le pool d'inférence.", {}, pool["pendingBatches"]
+
+
+def init_app(app):
+    """Mesure la durée de chaque requête, sert /metrics et branche le profilage par en-tête X-Profile."""
+    from flask import Response, g, request
+
+    registry.register_collector(_service_gauges)
+    app.add_url_rule(
+        "/metrics", "metrics",
+        lambda: Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"),
+    )
+
+    profiling_enabled = app.config.get("PROFILING_ENABLED", False)
+    profile_dir = app.config.get("PROFILING_OUTPUT_DIR") or os.path.join(app.instance_path, "profiles")
+    interval = app.config.get("PROFILING_INTERVAL_MS", 5) / 1000.0
+    # Un seul profil à la fois : l'échantillonnage couvre tous les threads du processus
+    profiling_slot = threading.Semaphore(1)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.profiler = None
+        if profiling_enabled and request.headers.get("X-Profile") == "1" and profiling_slot.acquire(blocking=False):
+            g.profiler = SamplingProfiler(interval)
+            g.profiler.start()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+                method=request.method,
+                status=response.status_code,
+            )
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            profiling_slot.release()
+            try:
+                os.makedirs(profile_dir, exist_ok=True)
+                profile_id = uuid.uuid4().hex
+                profiler.write_collapsed(os.path.join(profile_dir, f"{profile_id}.collapsed"))
+                response.headers["X-Profile-Id"] = profile_id
+            except OSError as e:
+                print(f"Avertissement: écriture du profil impossible: {e}")
+        return response
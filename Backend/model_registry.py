@@ -0,0 +1,312 @@
+# backend/model_registry.py
+# Registre des modèles résidents en mémoire, sous un budget de RAM global.
+# Les directions (et leurs checkpoints : versions A/B, modèle distillé de secours...)
+# sont décrites dans un fichier JSON ; chaque modèle chargé est compté pour son
+# empreinte estimée, et les moins récemment utilisés sont déchargés quand le budget
+# est dépassé. Un modèle n'est jamais déchargé pendant qu'une requête l'utilise
+# (bail ouvert par lease()). Les chargements (et rechargements après éviction) se
+# font sur un thread dédié, partagé par toutes les requêtes qui attendent le modèle :
+# prefetch() lance le rechargement d'un modèle évincé dès qu'une requête arrive, sans
+# la bloquer, et lease() n'attend ce chargement que le temps accordé (`timeout`).
+# Avec le pool d'inférence, chaque worker a son propre registre (budget / nombre de workers).
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from inference_backends import check_backend
+
+REQUIRED_DIRECTION_KEYS = ("id", "source_lang_app", "target_lang_app", "source_lang_nllb", "target_lang_nllb")
+_WEIGHT_EXTENSIONS = (".safetensors", ".bin", ".onnx", ".onnx_data", ".pt")
+_MAX_EVENTS = 200
+
+
+class ModelUnavailableError(RuntimeError):
+    """Le modèle n'a pas pu être chargé (erreur, ou délai d'attente dépassé)."""
+
+
+def load_model_configs(path, defaults):
+    """Lit le fichier du registre. Renvoie (directions, budget en Mo ou None).
+
+    Format : {"memory_budget_mb": 6000, "directions": {"ar-TD_to_fr": {...}, ...}},
+    chaque direction ayant les clés de MODEL_CONFIGS (+ "backend", "pinned", "default").
+    Sans fichier, les directions par défaut sont utilisées. Un backend inconnu ou dont les
+    dépendances manquent lève ValueError ici, au démarrage, plutôt qu'à la première requête.
+    """
+    if not path or not os.path.exists(path):
+        directions, budget_mb = {key: dict(config) for key, config in defaults.items()}, None
+    else:
+        with open(path, encoding="utf-8") as registry_file:
+            data = json.load(registry_file)
+        directions, budget_mb = data.get("directions") or {}, data.get("memory_budget_mb")
+        for model_key, model_config in directions.items():
+            missing = [key for key in REQUIRED_DIRECTION_KEYS if key not in model_config]
+            if missing:
+                raise ValueError(f"Direction '{model_key}' du registre {path} incomplète : {', '.join(missing)} manquant(s).")
+    for model_key, model_config in directions.items():
+        try:
+            check_backend(model_config.get("backend"))
+        except ValueError as e:
+            raise ValueError(f"Direction '{model_key}' : {e}") from e
+    return directions, budget_mb
+
+
+def checkpoint_size_bytes(model_id):
+    """Taille des fichiers de poids d'un checkpoint local (None si non local)."""
+    if not os.path.isdir(model_id):
+        return None
+    total = 0
+    for root, _, files in os.walk(model_id):
+        for file_name in files:
+            if file_name.endswith(_WEIGHT_EXTENSIONS):
+                total += os.path.getsize(os.path.join(root, file_name))
+    return total or None
+
+
+def estimate_model_bytes(model, model_id=None):
+    """Empreinte mémoire d'un modèle chargé : tenseurs du state_dict (torch, int8),
+    ou à défaut taille des fichiers de poids (ONNX Runtime)."""
+    state_dict = getattr(model, "state_dict", None)
+    if callable(state_dict):
+        try:
+            total = 0
+            seen = set()
+            for tensor in state_dict().values():
+                # Les poids partagés (embeddings liés) ne sont comptés qu'une fois
+                if hasattr(tensor, "element_size") and tensor.data_ptr() not in seen:
+                    seen.add(tensor.data_ptr())
+                    total += tensor.numel() * tensor.element_size()
+            if total:
+                return total
+        except Exception:
+            pass
+    return (checkpoint_size_bytes(model_id) if model_id else None) or 0
+
+
+class _ResidentModel:
+    def __init__(self, tokenizer, model, device, size_bytes, pinned):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.size_bytes = size_bytes
+        self.pinned = pinned
+        self.leases = 0
+
+
+class ModelRegistry:
+    """Modèles résidents (LRU) bornés par un budget mémoire, avec baux d'utilisation."""
+
+    def __init__(self, budget_bytes=0):
+        self.budget_bytes = budget_bytes
+        self._resident = OrderedDict()
+        self._status = {}
+        self._events = deque(maxlen=_MAX_EVENTS)
+        self._load_futures = {}
+        self._lock = threading.RLock()
+        self._executor = None
+
+    def init_app(self, app):
+        budget_mb = app.config.get("MODEL_MEMORY_BUDGET_MB")
+        if budget_mb is not None:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Avec un budget, un seul chargement à la fois : deux chargements
+                # simultanés pourraient dépasser la mémoire avant toute éviction.
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1 if self.budget_bytes else 4, thread_name_prefix="model-loader"
+                )
+            return self._executor
+
+    # --- État et événements ---
+
+    def _set_status(self, key, status, **fields):
+        entry = self._status.setdefault(key, {
+            "status": "not_loaded", "loadSeconds": None, "error": None,
+            "residentBytes": 0, "loads": 0, "evictions": 0, "lastUsed": None,
+        })
+        entry["status"] = status
+        entry.update(fields)
+
+    def _record(self, event, key, **fields):
+        self._events.append({"event": event, "modelId": key[0], "backend": key[1], "at": time.time(), **fields})
+        print(f"Registre des modèles : {event} '{key[0]}' ({key[1]}) {fields if fields else ''}")
+
+    def status(self, key):
+        with self._lock:
+            entry = self._status.get(key)
+            return dict(entry) if entry else None
+
+    def mark_loading(self, key):
+        with self._lock:
+            if key not in self._resident:
+                self._set_status(key, "loading")
+
+    # --- Chargement ---
+
+    def get(self, key):
+        """Modèle résident (tokenizer, modèle, périphérique) sans bail, ou None."""
+        with self._lock:
+            resident = self._resident.get(key)
+            if resident is None:
+                return None
+            self._resident.move_to_end(key)
+            self._status[key]["lastUsed"] = time.time()
+            return resident.tokenizer, resident.model, resident.device
+
+    def load_async(self, key, loader, pinned=False):
+        """Planifie le chargement de `key` par `loader()` -> (tokenizer, modèle, périphérique).
+
+        Renvoie un Future partagé par tous les demandeurs tant que le chargement est en cours.
+        """
+        with self._lock:
+            future = self._load_futures.get(key)
+            if future is None:
+                self._set_status(key, "loading")
+                future = self._get_executor().submit(self._load, key, loader, pinned)
+                self._load_futures[key] = future
+            return future
+
+    def prefetch(self, key, loader, pinned=False):
+        """Relance en arrière-plan le chargement d'un modèle évincé, sans attendre.
+
+        Renvoie True si le modèle est résident ou en cours de (re)chargement, False s'il
+        n'a encore jamais été chargé (ou si son chargement a échoué).
+        """
+        with self._lock:
+            if key in self._resident:
+                return True
+            status = self._status.get(key)
+            if status is None or status["status"] not in ("evicted", "loading"):
+                return False
+            self.load_async(key, loader, pinned)
+            return True
+
+    def load(self, key, loader, pinned=False, timeout=None):
+        resident = self.get(key)
+        if resident is not None:
+            return resident
+        try:
+            return self.load_async(key, loader, pinned).result(timeout=timeout)
+        except FutureTimeoutError:
+            raise ModelUnavailableError(f"Chargement du modèle '{key[0]}' toujours en cours.")
+
+    def _load(self, key, loader, pinned):
+        try:
+            with self._lock:
+                resident = self._resident.get(key)
+                if resident is not None:
+                    return resident.tokenizer, resident.model, resident.device
+                # Place faite à l'avance quand la taille du checkpoint est connue
+                self._evict_over_budget(incoming_bytes=checkpoint_size_bytes(key[0]) or 0)
+                reload = self._status.get(key, {}).get("evictions", 0) > 0
+
+            started = time.perf_counter()
+            try:
+                tokenizer, model, device = loader()
+            except Exception as e:
+                with self._lock:
+                    self._set_status(key, "failed", error=f"{type(e).__name__}: {str(e)}", loadSeconds=None)
+                    self._record("load_failed", key, error=str(e))
+                raise ModelUnavailableError(f"Impossible de charger le modèle '{key[0]}': {e}") from e
+
+            size_bytes = estimate_model_bytes(model, key[0])
+            with self._lock:
+                self._resident[key] = _ResidentModel(tokenizer, model, device, size_bytes, pinned)
+                status = self._status[key]
+                self._set_status(
+                    key, "ready", error=None, residentBytes=size_bytes, lastUsed=time.time(),
+                    loadSeconds=round(time.perf_counter() - started, 3), loads=status["loads"] + 1,
+                )
+                self._record("reload" if reload else "load", key, bytes=size_bytes)
+                self._evict_over_budget(protect=key)
+            return tokenizer, model, device
+        finally:
+            with self._lock:
+                self._load_futures.pop(key, None)
+
+    # --- Baux et éviction ---
+
+    @contextmanager
+    def lease(self, key, loader, pinned=False, timeout=None):
+        """Garde le modèle résident pendant le bloc `with` (jamais évincé entre-temps).
+
+        Un modèle non résident est chargé sur le thread de chargement ; l'attente est
+        bornée par `timeout` (ModelUnavailableError au-delà, le chargement continue).
+        """
+        while True:
+            with self._lock:
+                resident = self._resident.get(key)
+                if resident is not None:
+                    resident.leases += 1
+                    self._resident.move_to_end(key)
+                    self._status[key]["lastUsed"] = time.time()
+                    break
+            # Non résident (jamais chargé ou évincé) : rechargé sur le thread de chargement.
+            # La boucle couvre le cas, rare, d'une éviction entre le chargement et le bail.
+            self.load(key, loader, pinned, timeout)
+        try:
+            yield resident.tokenizer, resident.model, resident.device
+        finally:
+            with self._lock:
+                resident.leases -= 1
+                # Un modèle gardé au-delà du budget par ce bail peut maintenant partir
+                self._evict_over_budget()
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(resident.size_bytes for resident in self._resident.values())
+
+    def _evict_over_budget(self, incoming_bytes=0, protect=None):
+        """Décharge les modèles les moins récemment utilisés (sans bail, non épinglés)."""
+        if not self.budget_bytes:
+            return
+        total = sum(resident.size_bytes for resident in self._resident.values()) + incoming_bytes
+        evicted = False
+        for key in list(self._resident):
+            if total <= self.budget_bytes:
+                break
+            resident = self._resident[key]
+            if key == protect or resident.pinned or resident.leases:
+                continue
+            del self._resident[key]
+            total -= resident.size_bytes
+            self._set_status(key, "evicted", residentBytes=0, evictions=self._status[key]["evictions"] + 1)
+            self._record("evict", key, bytes=resident.size_bytes)
+            evicted = True
+        if total > self.budget_bytes:
+            print(f"Avertissement: budget mémoire des modèles dépassé ({total} > {self.budget_bytes} octets), modèles en cours d'utilisation.")
+        if evicted:
+            gc.collect()
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def stats(self):
+        with self._lock:
+            models = []
+            for key, status in self._status.items():
+                resident = self._resident.get(key)
+                models.append({
+                    "modelId": key[0],
+                    "backend": key[1],
+                    "leases": resident.leases if resident else 0,
+                    "pinned": resident.pinned if resident else False,
+                    **status,
+                })
+            return {
+                "budgetBytes": self.budget_bytes,
+                "residentBytes": sum(resident.size_bytes for resident in self._resident.values()),
+                "models": models,
+                "events": list(self._events),
+            }
+
+
+model_registry = ModelRegistry()
@@ -35,6 +35,11 @@ class Translation(db.Model):
     original_translation_id = db.Column(db.Integer, db.ForeignKey('translation.id'), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Index composite pour l'historique paginé (filtre user_id, tri/curseur sur timestamp)
+    __table_args__ = (
+        db.Index('ix_translation_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+
     # Added backref for the relationship with User model (optional if you're using 'author' backref already)
     # user = db.relationship('User', backref=db.backref('translations', lazy=True))
     # Self-referencing relationship for corrections
@@ -1,188 +1,614 @@
 # backend/routes/translation.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, decode_token
-from models import Translation, User, db
+from models import Translation, db
 from datetime import datetime
+import base64
+import hashlib
 import json
-# IMPORTS NÉCESSAIRES POUR L'INFÉRENCE LOCALE
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import os
-import torch
+import time
+from contextlib import closing
+# L'inférence (torch / transformers) est isolée dans inference.py et importée à la demande
+from inference import (
+    MODEL_CONFIGS,
+    load_direction_model,
+    direction_model_lease,
+    prefetch_direction_model,
+    perform_batch_translation,
+    stream_translation,
+    get_models_readiness,
+    resolve_model_key,
+)
+from admission import DeadlineUnreachableError, OverloadedError, admission_controller
+from batching import get_batcher
+from decoding_profiles import resolve_profile
+from worker_pool import inference_worker_pool
+from model_registry import ModelUnavailableError, model_registry
+from history_writer import history_writer
+from metrics import stage, record_lookup
+from translation_cache import translation_cache
+from translation_memory import translation_memory
+from segmentation import split_into_segments, join_segments, TooManySegmentsError
+from jobs import job_manager, JOB_COMPLETED, JOB_FAILED
 
 translation_bp = Blueprint('translation', __name__)
 
-# --- Configuration des Modèles Hugging Face locaux ---
-# Ajout des codes de langue NLLB (utilisés pour tokenizer.src_lang et forced_bos_token_id)
-MODEL_CONFIGS = {
-    "ar-TD_to_fr": {
-        "id": "Koubra-Gaby/facebook-NLLB-arb-fr", # Ou "Koubra-Gaby/facebook-NLLB-arb-fr" si c'est le même modèle renommé
-        "source_lang_app": "ar-TD", # Langue utilisée par l'application frontend
-        "target_lang_app": "fr",    # Langue utilisée par l'application frontend
-        "source_lang_nllb": "acm_Latn", # Code NLLB réel pour l'arabe tchadien (latin)
-        "target_lang_nllb": "fra_Latn"  # Code NLLB réel pour le français
-    },
-    "fr_to_ar-TD": {
-        "id": "Koubra-Gaby/facebook-NLLB-fr-arb", # Ou "/content/sample_data/Modele_facebook/checkpoint-19000" si c'est un chemin local spécifique
-        "source_lang_app": "fr",
-        "target_lang_app": "ar-TD",
-        "source_lang_nllb": "fra_Latn",
-        "target_lang_nllb": "arb_Latn" # Code NLLB réel pour l'arabe standard (latin) ou acm_Latn si c'est Tchadien
-    }
-}
 
-loaded_models = {}
-global_device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Périphérique global pour les modèles : {global_device.upper()}")
+def direction_available(model_key):
+    """Vérifie que la direction peut traduire (modèle chargé dans ce processus, ou pool de workers)."""
+    if inference_worker_pool.enabled:
+        # Les workers chargent leurs propres modèles : rien à charger côté serveur web
+        return True
+    # Modèle évincé par le budget mémoire : rechargé en arrière-plan, la requête
+    # l'attend dans son batch (au plus jusqu'à son échéance)
+    if prefetch_direction_model(model_key):
+        return True
+    tokenizer, model, device = load_direction_model(model_key)
+    return bool(model and tokenizer)
+
+
+def get_direction_batcher(model_key, profile=None):
+    """Renvoie le micro-batcher de la direction `model_key` (clé de MODEL_CONFIGS) pour un profil de décodage.
+
+    Un batch partage un seul appel à generate : chaque profil (nombre de faisceaux...) a sa file.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    profile = resolve_profile(profile)
+
+    def translate_batch(texts, deadline):
+        if inference_worker_pool.enabled:
+            return inference_worker_pool.translate_batch(model_key, texts, profile=profile, deadline=deadline)
+        # Bail : le modèle ne peut pas être évincé (budget mémoire) pendant la génération.
+        # Un rechargement après éviction n'est attendu que jusqu'à l'échéance du batch.
+        load_timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else admission_controller.queue_timeout
+        with direction_model_lease(model_key, load_timeout) as (tokenizer, model, device):
+            return perform_batch_translation(
+                texts,
+                tokenizer,
+                model,
+                device,
+                model_config["source_lang_nllb"],
+                model_config["target_lang_nllb"],
+                direction=model_key,
+                profile=profile,
+                deadline=deadline
+            )
+
+    return get_batcher(
+        f"{model_key}:{profile}",
+        translate_batch,
+        max_batch_size=current_app.config.get("TRANSLATION_BATCH_MAX_SIZE", 16),
+        max_wait_ms=current_app.config.get("TRANSLATION_BATCH_MAX_WAIT_MS", 10),
+        # Avec le pool, un batch peut être en cours sur chaque worker
+        concurrency=max(1, inference_worker_pool.num_workers),
+        # File bornée et places d'exécution partagées par tous les profils de la direction
+        gate=admission_controller.gate(model_key)
+    )
 
-def load_model_and_tokenizer(model_id):
-    # La logique de chargement reste la même. Les NLLB codes sont gérés plus tard.
-    cache_key = model_id
-    if cache_key in loaded_models:
-        print(f"Modèle '{model_id}' déjà en cache. Utilisation de la version chargée.")
-        return loaded_models[cache_key]["tokenizer"], loaded_models[cache_key]["model"], loaded_models[cache_key]["device"]
 
-    try:
-        print(f"Chargement du tokenizer '{model_id}'...")
-        tokenizer = AutoTokenizer.from_pretrained(model_id)
-        print(f"Chargement du modèle '{model_id}'...")
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_id)
-        model.to(global_device)
-
-        loaded_models[cache_key] = {
-            "tokenizer": tokenizer,
-            "model": model,
-            "device": global_device
+def translate_segmented(model_key, text, profile=None, deadline=None):
+    """Traduit un texte éventuellement long, segment par segment, en un seul batch.
+
+    Les segments sont soumis ensemble au micro-batcher de la direction puis
+    réassemblés dans l'ordre d'origine : rien n'est plus tronqué silencieusement.
+    """
+    segments = split_into_segments(text, current_app.config.get("TRANSLATION_MAX_SEGMENT_CHARS", 200))
+    max_segments = current_app.config.get("TRANSLATION_MAX_SEGMENTS", 64)
+    if len(segments) > max_segments:
+        raise TooManySegmentsError(
+            f"Le texte contient {len(segments)} segments, le maximum autorisé est {max_segments}."
+        )
+    if len(segments) == 1:
+        return get_direction_batcher(model_key, profile).translate(segments[0].text, deadline=deadline)
+
+    futures = get_direction_batcher(model_key, profile).submit_many([segment.text for segment in segments], deadline)
+    return join_segments(segments, [future.result() for future in futures])
+
+
+def translate_many(model_key, texts, profile=None, deadline=None):
+    """Traduit une liste de textes d'une même direction et renvoie les traductions dans l'ordre.
+
+    Les hits du cache sont servis directement (profil par défaut) ; les segments de tous
+    les autres textes sont soumis ensemble au micro-batcher de la direction.
+    """
+    model_config = MODEL_CONFIGS[model_key]
+    from_lang, to_lang = model_config["source_lang_app"], model_config["target_lang_app"]
+    max_segment_chars = current_app.config.get("TRANSLATION_MAX_SEGMENT_CHARS", 200)
+    max_segments = current_app.config.get("TRANSLATION_MAX_SEGMENTS", 64)
+    use_cache = _reuses_model_outputs(profile)
+
+    translations = [translation_cache.get(from_lang, to_lang, text) if use_cache else None for text in texts]
+    pending = []
+    for index, text in enumerate(texts):
+        if translations[index] is not None:
+            continue
+        segments = split_into_segments(text, max_segment_chars)
+        if len(segments) > max_segments:
+            raise TooManySegmentsError(
+                f"Le texte n°{index} contient {len(segments)} segments, le maximum autorisé est {max_segments}."
+            )
+        pending.append((index, segments))
+
+    if pending:
+        futures = get_direction_batcher(model_key, profile).submit_many(
+            [segment.text for _, segments in pending for segment in segments], deadline
+        )
+        position = 0
+        for index, segments in pending:
+            results = [future.result() for future in futures[position:position + len(segments)]]
+            position += len(segments)
+            translations[index] = join_segments(segments, results)
+            if use_cache and deadline is None:
+                translation_cache.put(from_lang, to_lang, texts[index], translations[index])
+
+    return translations
+
+
+def save_translation_history(user_id, source_text, translation_clean, from_lang, to_lang):
+    """Enregistre la traduction dans l'historique de l'utilisateur (si connecté).
+
+    L'insertion peut être groupée avec celles d'autres requêtes (history_writer) ; l'id
+    renvoyé est celui de la ligne enregistrée, ou None si l'écriture a échoué.
+    Renvoie toujours l'objet JSON de la traduction, au format de Translation.to_dict().
+    """
+    translation_entry = None
+    if user_id:
+        try:
+            with stage("user_lookup", f"{from_lang}_to_{to_lang}"):
+                user_exists = history_writer.user_exists(user_id)
+            if user_exists:
+                translation_entry = history_writer.enqueue(
+                    user_id=int(user_id),
+                    source_text=source_text,
+                    translated_text=translation_clean,
+                    from_lang=from_lang,
+                    to_lang=to_lang,
+                    is_correction=False,
+                    timestamp=datetime.utcnow()
+                )
+            else:
+                print(f"Avertissement: Utilisateur avec l'ID {user_id} introuvable pour la sauvegarde de la traduction. Traduction non enregistrée dans l'historique.")
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde de la traduction pour l'utilisateur {user_id} dans la BDD: {e}")
+
+    if translation_entry:
+        return translation_entry.to_dict()
+    else:
+        return {
+            'id': None,
+            'sourceText': source_text,
+            'translatedText': translation_clean,
+            'fromLang': from_lang,
+            'toLang': to_lang,
+            'isCorrection': False,
+            'originalTranslationId': None,
+            'timestamp': datetime.utcnow().isoformat()
         }
-        print(f"Modèle '{model_id}' chargé localement et mis en cache sur {global_device.upper()}.")
-        return tokenizer, model, global_device
 
+
+def save_translations_history_bulk(user_id, pairs, from_lang, to_lang):
+    """Enregistre plusieurs traductions (source, traduction) en un seul lot (history_writer).
+
+    Renvoie la liste des objets JSON au format de Translation.to_dict(), dans l'ordre.
+    Les lignes vides sont renvoyées mais pas enregistrées dans l'historique.
+    """
+    timestamp = datetime.utcnow()
+    items = [
+        {
+            'id': None,
+            'sourceText': source_text,
+            'translatedText': translated_text,
+            'fromLang': from_lang,
+            'toLang': to_lang,
+            'isCorrection': False,
+            'originalTranslationId': None,
+            'timestamp': timestamp.isoformat()
+        }
+        for source_text, translated_text in pairs
+    ]
+    if not user_id:
+        return items
+
+    try:
+        with stage("user_lookup", f"{from_lang}_to_{to_lang}"):
+            user_exists = history_writer.user_exists(user_id)
+        if not user_exists:
+            print(f"Avertissement: Utilisateur avec l'ID {user_id} introuvable. Traductions non enregistrées dans l'historique.")
+            return items
+
+        indexes = [index for index, (source_text, _) in enumerate(pairs) if source_text.strip()]
+        entries = history_writer.enqueue_many(
+            {
+                'user_id': int(user_id),
+                'source_text': pairs[index][0],
+                'translated_text': pairs[index][1],
+                'from_lang': from_lang,
+                'to_lang': to_lang,
+                'is_correction': False,
+                'timestamp': timestamp,
+            }
+            for index in indexes
+        )
+        for index, entry in zip(indexes, entries):
+            items[index] = entry.to_dict()
+            translation_memory.add(from_lang, to_lang, entry.source_text, entry.translated_text)
     except Exception as e:
-        print(f"ERREUR: Impossible de charger le modèle '{model_id}'.")
-        print(f"Détails de l'erreur: {e}")
-        return None, None, None
-
-
-# MODIFICATION ICI : perform_translation doit maintenant accepter les codes de langue NLLB
-def perform_translation(text, tokenizer, model, device, source_lang_nllb, target_lang_nllb):
-    if not model or not tokenizer:
-        raise RuntimeError("Le modèle de traduction ou le tokenizer n'a pas pu être chargé.")
-
-    # 1. Configurer le tokenizer pour la langue source NLLB
-    tokenizer.src_lang = source_lang_nllb
-
-    # 2. Tokeniser l'entrée (le tokenizer ajoute automatiquement le token de langue source)
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-
-    # 3. Obtenir l'ID du token de langue cible NLLB
-    # On préfixe et on suffixe avec "__" pour qu'il corresponde à la forme des tokens de langue NLLB
-    target_lang_token_id = tokenizer.convert_tokens_to_ids(f"__{target_lang_nllb}__")
-    
-    if target_lang_token_id is None:
-        raise ValueError(f"Impossible de trouver l'ID du token pour la langue cible NLLB: {target_lang_nllb}")
-
-    # 4. Générer la traduction
-    outputs = model.generate(
-        **inputs,
-        forced_bos_token_id=target_lang_token_id, # Utilisation de l'ID corrigé
-        max_new_tokens=200,
-        do_sample=False
-    )
+        print(f"Erreur lors de la sauvegarde groupée des traductions pour l'utilisateur {user_id}: {e}")
+
+    return items
+
+
+def _parse_bulk_payload(payload, max_texts):
+    """Valide une requête groupée. Renvoie (textes, model_key, erreur)."""
+    texts = payload.get("texts")
+    if texts is None and isinstance(payload.get("document"), str):
+        # Un document est traduit ligne par ligne ; les lignes vides sont conservées.
+        texts = payload["document"].splitlines()
+    if not isinstance(texts, list) or not texts:
+        return None, None, "Le champ 'texts' doit être une liste non vide."
+    if not all(isinstance(text, str) for text in texts):
+        return None, None, "Tous les éléments de 'texts' doivent être des chaînes."
+    if len(texts) > max_texts:
+        return None, None, f"Trop de textes : {len(texts)} (maximum {max_texts})."
+
+    from_lang = (payload.get("from_lang") or "").strip()
+    to_lang = (payload.get("to_lang") or "").strip()
+    if not from_lang or not to_lang:
+        return None, None, "Les langues source et cible sont requises."
+    model_key = resolve_model_key(from_lang, to_lang)
+    if model_key is None:
+        return None, None, "Combinaison de langues non supportée pour la traduction."
+    return texts, model_key, None
 
-    # 5. Décoder la traduction
-    translation_result = tokenizer.batch_decode(outputs, skip_special_tokens=True)
-    translated_text = translation_result[0]
 
-    return translated_text
+def _parse_decoding_options(payload, allow_deadline=True):
+    """Lit "profile" et "deadline_ms" d'une requête. Renvoie (profil, échéance, erreur).
+
+    L'échéance est comptée depuis la réception de la requête, en time.monotonic().
+    """
+    profile = payload.get("profile")
+    if profile is not None and not isinstance(profile, str):
+        return None, None, "Le champ 'profile' doit être une chaîne."
+    try:
+        profile = resolve_profile(profile)
+    except ValueError as e:
+        return None, None, str(e)
+
+    deadline_ms = payload.get("deadline_ms")
+    if deadline_ms is None:
+        return profile, None, None
+    if not allow_deadline:
+        return None, None, "Le champ 'deadline_ms' n'est pas accepté pour cette route."
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+        return None, None, "Le champ 'deadline_ms' doit être un nombre positif de millisecondes."
+    return profile, time.monotonic() + deadline_ms / 1000.0, None
+
+
+def _overloaded_response(error):
+    """Réponse 429 / 503 d'une requête refusée par le contrôle d'admission, avec Retry-After."""
+    response = jsonify({"error": str(error), "retryAfter": error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status_code
+
+
+def _reuses_model_outputs(profile):
+    """Le cache et les sorties du modèle gardées en mémoire de traduction viennent du
+    profil par défaut : un autre profil les ignore (les corrections restent prioritaires)."""
+    return profile is None or profile == resolve_profile()
+
+
+def _translate_keeping_blanks(model_key, texts, profile=None, deadline=None):
+    """Traduit les textes non vides ; les textes vides restent vides à la même position."""
+    indexes = [i for i, text in enumerate(texts) if text.strip()]
+    results = [""] * len(texts)
+    for i, translated in zip(indexes, translate_many(model_key, [texts[i].strip() for i in indexes], profile, deadline)):
+        results[i] = translated
+    return results
+
 
 @translation_bp.route('/translate', methods=['POST'])
 # @jwt_required() # <--- Décommentez ceci si vous voulez que la traduction nécessite une authentification
 def translate():
-    payload = request.get_json() or {}
+    with stage("parse_json"):
+        payload = request.get_json() or {}
     source_text = payload.get("source_text", "").strip()
     from_lang = payload.get("from_lang", "").strip()
     to_lang = payload.get("to_lang", "").strip()
     user_id = payload.get('user_id', None)
+    profile, deadline, error = _parse_decoding_options(payload)
 
     if not source_text:
         return jsonify({"error": "Le champ 'source_text' est vide."}), 400
     if not from_lang or not to_lang:
         return jsonify({"error": "Les langues source et cible sont requises."}), 400
+    if error:
+        return jsonify({"error": error}), 400
 
-    model_config = None
-    if from_lang == MODEL_CONFIGS["ar-TD_to_fr"]["source_lang_app"] and to_lang == MODEL_CONFIGS["ar-TD_to_fr"]["target_lang_app"]:
-        model_config = MODEL_CONFIGS["ar-TD_to_fr"]
-    elif from_lang == MODEL_CONFIGS["fr_to_ar-TD"]["source_lang_app"] and to_lang == MODEL_CONFIGS["fr_to_ar-TD"]["target_lang_app"]:
-        model_config = MODEL_CONFIGS["fr_to_ar-TD"]
-    else:
+    model_key = resolve_model_key(from_lang, to_lang)
+    if model_key is None:
         return jsonify({"error": "Combinaison de langues non supportée pour la traduction."}), 400
 
+    model_config = MODEL_CONFIGS.get(model_key)
     if not model_config:
         return jsonify({"error": "Configuration de modèle introuvable pour la paire de langues spécifiée."}), 400
 
+    # Une correspondance dans la mémoire de traduction (corrections) ou dans le cache
+    # évite complètement le chargement du modèle et model.generate
+    reuse_outputs = _reuses_model_outputs(profile)
+    with stage("memory_lookup", model_key):
+        tm_match = translation_memory.lookup(from_lang, to_lang, source_text)
+    if tm_match and not (reuse_outputs or tm_match["isCorrection"]):
+        tm_match = None
+    record_lookup("memory", model_key, tm_match is not None)
+    translation_clean = None
+    if tm_match:
+        translation_clean = tm_match["translatedText"]
+    elif reuse_outputs:
+        with stage("cache_lookup", model_key):
+            translation_clean = translation_cache.get(from_lang, to_lang, source_text)
+        record_lookup("cache", model_key, translation_clean is not None)
+
+    if translation_clean is None:
+        if not direction_available(model_key):
+            return jsonify({"error": f"Le service de traduction pour la paire {from_lang}-{to_lang} n'est pas disponible (modèle non chargé)."}), 503
 
-    tokenizer, model, device = load_model_and_tokenizer(model_config["id"])
+        try:
+            # La requête (découpée en segments si elle est longue) rejoint le micro-batch
+            # de sa direction : un seul model.generate pour toutes les requêtes de la fenêtre.
+            with stage("translate", model_key):
+                translation_clean = translate_segmented(model_key, source_text, profile, deadline)
+
+            if not translation_clean.strip():
+                raise ValueError("Le texte traduit est vide après le traitement.")
+
+        except TooManySegmentsError as e:
+            return jsonify({"error": str(e)}), 413
+        except OverloadedError as e:
+            return _overloaded_response(e)
+        except ModelUnavailableError as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                return jsonify({"error": "L'échéance de la requête (deadline_ms) a expiré avant la fin de la traduction."}), 504
+            print(f"Erreur lors de la traduction locale pour {from_lang} vers {to_lang}: {e}")
+            return jsonify({'error': f"Échec de la traduction locale: {type(e).__name__}: {str(e)}"}), 500
+
+        # Une traduction coupée par l'échéance peut être incomplète : elle n'est pas réutilisée
+        if reuse_outputs and deadline is None:
+            translation_cache.put(from_lang, to_lang, source_text, translation_clean)
+
+    with stage("save_history", model_key):
+        result = save_translation_history(user_id, source_text, translation_clean, from_lang, to_lang)
+    if tm_match:
+        result['tmMatch'] = {key: tm_match[key] for key in ("score", "matchedSource", "isCorrection")}
+    elif result['id'] and reuse_outputs and deadline is None:
+        # Seules les sorties du modèle enregistrées entrent dans la mémoire (pas les
+        # correspondances floues, qui dériveraient d'une phrase à l'autre) ; elles ne
+        # serviront qu'aux requêtes de même source exacte
+        translation_memory.add(from_lang, to_lang, source_text, translation_clean)
+    return jsonify(result), 200
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@translation_bp.route('/translate/stream', methods=['POST'])
+def translate_stream():
+    """Variante Server-Sent Events de /translate.
+
+    Événements émis : `token` (morceau de texte décodé, texte d'un seul segment),
+    `segment` (segment terminé, textes multi-phrases), `error`, puis `done` avec
+    le même objet que la réponse de /translate (Translation.to_dict()).
+    """
+    payload = request.get_json() or {}
+    source_text = payload.get("source_text", "").strip()
+    from_lang = payload.get("from_lang", "").strip()
+    to_lang = payload.get("to_lang", "").strip()
+    user_id = payload.get('user_id', None)
+    profile, deadline, error = _parse_decoding_options(payload)
 
-    if not model or not tokenizer:
-        return jsonify({"error": f"Le service de traduction pour la paire {from_lang}-{to_lang} n'est pas disponible (modèle non chargé)."}), 503
+    if not source_text:
+        return jsonify({"error": "Le champ 'source_text' est vide."}), 400
+    if not from_lang or not to_lang:
+        return jsonify({"error": "Les langues source et cible sont requises."}), 400
+    if error:
+        return jsonify({"error": error}), 400
 
+    model_key = resolve_model_key(from_lang, to_lang)
+    if model_key is None:
+        return jsonify({"error": "Combinaison de langues non supportée pour la traduction."}), 400
+    model_config = MODEL_CONFIGS[model_key]
+
+    reuse_outputs = _reuses_model_outputs(profile)
+    tm_match = translation_memory.lookup(from_lang, to_lang, source_text)
+    if tm_match and not (reuse_outputs or tm_match["isCorrection"]):
+        tm_match = None
+    record_lookup("memory", model_key, tm_match is not None)
+    cached = None
+    if tm_match:
+        cached = tm_match["translatedText"]
+    elif reuse_outputs:
+        cached = translation_cache.get(from_lang, to_lang, source_text)
+        record_lookup("cache", model_key, cached is not None)
+    segments = split_into_segments(source_text, current_app.config.get("TRANSLATION_MAX_SEGMENT_CHARS", 200))
+    max_segments = current_app.config.get("TRANSLATION_MAX_SEGMENTS", 64)
+    if cached is None and len(segments) > max_segments:
+        return jsonify({"error": f"Le texte contient {len(segments)} segments, le maximum autorisé est {max_segments}."}), 413
+
+    # Le streaming token par token se fait dans ce processus ; avec le pool de workers,
+    # le texte est envoyé segment par segment.
+    stream_tokens = cached is None and len(segments) == 1 and not inference_worker_pool.enabled
+    if stream_tokens:
+        if not direction_available(model_key):
+            return jsonify({"error": f"Le service de traduction pour la paire {from_lang}-{to_lang} n'est pas disponible (modèle non chargé)."}), 503
+
+    # Admission avant l'envoi des en-têtes, pour pouvoir encore répondre 429 / 503
+    gate = admission_controller.gate(model_key)
+    expires_at = gate.expires_at(deadline)
+    futures = None
     try:
-        # APPEL À perform_translation AVEC LES CODES NLLB
-        translation_clean = perform_translation(
-            source_text,
-            tokenizer,
-            model,
-            device,
-            model_config["source_lang_nllb"], # Passer le code NLLB source
-            model_config["target_lang_nllb"]  # Passer le code NLLB cible
-        )
+        if stream_tokens:
+            gate.admit(1, expires_at)
+        elif cached is None:
+            # Plusieurs segments : ils passent par le micro-batcher et sont envoyés
+            # dans l'ordre, dès que chacun est prêt.
+            futures = get_direction_batcher(model_key, profile).submit_many(
+                [segment.text for segment in segments], deadline
+            )
+    except OverloadedError as e:
+        return _overloaded_response(e)
+
+    def generate_events():
+        translation_clean = cached
+        try:
+            if translation_clean is not None:
+                yield _sse_event("segment", {"index": 0, "text": translation_clean})
+            elif stream_tokens:
+                # Un seul segment : les tokens sont envoyés au fil de la génération.
+                pieces = []
+                with gate.slot(expires_at):
+                    if gate.should_drop(expires_at):
+                        gate.drop()
+                        raise DeadlineUnreachableError("Échéance dépassée avant le début de la génération.")
+                    started = time.perf_counter()
+                    # closing() : si le client se déconnecte, la génération est arrêtée
+                    # avant que la place d'inférence et le bail du modèle soient rendus
+                    load_timeout = max(0.0, expires_at - time.monotonic())
+                    with direction_model_lease(model_key, load_timeout) as (tokenizer, model, device), closing(stream_translation(
+                        segments[0].text, tokenizer, model, device,
+                        model_config["source_lang_nllb"], model_config["target_lang_nllb"],
+                        profile=profile, deadline=deadline
+                    )) as stream:
+                        for piece in stream:
+                            pieces.append(piece)
+                            yield _sse_event("token", {"text": piece})
+                    gate.observe(time.perf_counter() - started, 1)
+                translation_clean = "".join(pieces).strip()
+            else:
+                translations = []
+                for index, future in enumerate(futures):
+                    translations.append(future.result())
+                    yield _sse_event("segment", {"index": index, "text": translations[-1]})
+                translation_clean = join_segments(segments, translations)
+
+            if not translation_clean.strip():
+                raise ValueError("Le texte traduit est vide après le traitement.")
+        except Exception as e:
+            print(f"Erreur lors de la traduction en streaming pour {from_lang} vers {to_lang}: {e}")
+            yield _sse_event("error", {"error": f"Échec de la traduction locale: {type(e).__name__}: {str(e)}"})
+            return
+
+        if cached is None and reuse_outputs and deadline is None:
+            translation_cache.put(from_lang, to_lang, source_text, translation_clean)
+        yield _sse_event("done", save_translation_history(user_id, source_text, translation_clean, from_lang, to_lang))
+
+    response = Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    if stream_tokens:
+        # Place libérée à la fermeture de la réponse, même si le client part avant la fin
+        response.call_on_close(lambda: gate.release(1))
+    return response
 
-        if not translation_clean.strip():
-            raise ValueError("Le texte traduit est vide après le traitement.")
 
+@translation_bp.route('/translate/batch', methods=['POST'])
+def translate_batch():
+    """Traduit une liste de textes d'une même direction ; les résultats sont dans l'ordre."""
+    payload = request.get_json() or {}
+    texts, model_key, error = _parse_bulk_payload(payload, current_app.config.get("TRANSLATION_BATCH_MAX_TEXTS", 256))
+    if error:
+        return jsonify({"error": error}), 400
+    profile, deadline, error = _parse_decoding_options(payload)
+    if error:
+        return jsonify({"error": error}), 400
+
+    model_config = MODEL_CONFIGS[model_key]
+    if not direction_available(model_key):
+        return jsonify({"error": "Le service de traduction pour cette paire n'est pas disponible (modèle non chargé)."}), 503
+
+    try:
+        translations = _translate_keeping_blanks(model_key, texts, profile, deadline)
+    except TooManySegmentsError as e:
+        return jsonify({"error": str(e)}), 413
+    except OverloadedError as e:
+        return _overloaded_response(e)
     except Exception as e:
-        print(f"Erreur lors de la traduction locale pour {from_lang} vers {to_lang}: {e}")
+        print(f"Erreur lors de la traduction groupée ({model_key}): {e}")
         return jsonify({'error': f"Échec de la traduction locale: {type(e).__name__}: {str(e)}"}), 500
 
-    # Logic for saving to database
-    translation_entry = None
-    if user_id:
-        try:
-            user_exists = User.query.get(user_id)
-            if user_exists:
-                new_translation = Translation(
-                    user_id=user_exists.id,
-                    source_text=source_text,
-                    translated_text=translation_clean,
-                    from_lang=from_lang,
-                    to_lang=to_lang,
-                    is_correction=False,
-                    timestamp=datetime.utcnow()
-                )
-                db.session.add(new_translation)
-                db.session.commit()
-                translation_entry = new_translation
-                print(f"DEBUG Backend: Nouvelle traduction enregistrée avec ID: {translation_entry.id}")
-            else:
-                print(f"Avertissement: Utilisateur avec l'ID {user_id} introuvable pour la sauvegarde de la traduction. Traduction non enregistrée dans l'historique.")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Erreur lors de la sauvegarde de la traduction pour l'utilisateur {user_id} dans la BDD: {e}")
-            pass
+    items = save_translations_history_bulk(
+        payload.get("user_id"), list(zip(texts, translations)),
+        model_config["source_lang_app"], model_config["target_lang_app"]
+    )
+    return jsonify({"translations": items}), 200
 
-    if translation_entry:
-        return jsonify(translation_entry.to_dict()), 200
-    else:
-        return jsonify({
-            'id': None,
-            'sourceText': source_text,
-            'translatedText': translation_clean,
-            'fromLang': from_lang,
-            'toLang': to_lang,
-            'isCorrection': False,
-            'originalTranslationId': None,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+
+@translation_bp.route('/jobs', methods=['POST'])
+def create_translation_job():
+    """Soumet un document (ou une longue liste de textes) à traduire en arrière-plan."""
+    payload = request.get_json() or {}
+    texts, model_key, error = _parse_bulk_payload(payload, current_app.config.get("TRANSLATION_JOB_MAX_TEXTS", 20000))
+    if error:
+        return jsonify({"error": error}), 400
+    # Une tâche en arrière-plan n'a pas d'échéance : seul le profil est accepté
+    profile, _, error = _parse_decoding_options(payload, allow_deadline=False)
+    if error:
+        return jsonify({"error": error}), 400
+
+    model_config = MODEL_CONFIGS[model_key]
+    user_id = payload.get("user_id")
+    chunk_size = current_app.config.get("TRANSLATION_JOB_CHUNK_SIZE", 32)
+    app = current_app._get_current_object()
+
+    def run_job(job):
+        with app.app_context():
+            translations = []
+            for start in range(0, len(texts), chunk_size):
+                chunk = texts[start:start + chunk_size]
+                while True:
+                    try:
+                        translations.extend(_translate_keeping_blanks(model_key, chunk, profile))
+                        break
+                    except OverloadedError as e:
+                        # Une tâche en arrière-plan attend que la file se libère au lieu d'échouer
+                        time.sleep(e.retry_after)
+                job.advance(len(chunk))
+            return save_translations_history_bulk(
+                user_id, list(zip(texts, translations)),
+                model_config["source_lang_app"], model_config["target_lang_app"]
+            )
+
+    job = job_manager.submit(
+        run_job,
+        len(texts),
+        fromLang=model_config["source_lang_app"],
+        toLang=model_config["target_lang_app"],
+        profile=profile
+    )
+    return jsonify(job.to_dict()), 202
+
+
+@translation_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_translation_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Tâche de traduction introuvable."}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@translation_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_translation_job_result(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Tâche de traduction introuvable."}), 404
+    if job.status == JOB_FAILED:
+        return jsonify({"error": job.error, **job.to_dict()}), 500
+    if job.status != JOB_COMPLETED:
+        return jsonify({"error": "La tâche n'est pas encore terminée.", **job.to_dict()}), 409
+    return jsonify({**job.to_dict(), "translations": job.results}), 200
 
 @translation_bp.route('/save_correction', methods=['POST'])
 @jwt_required()
@@ -209,8 +635,9 @@ def save_correction():
         if not original_entry_exists:
             return jsonify({"error": "Traduction originale introuvable ou non autorisée pour la correction."}), 404
 
-        new_correction = Translation(
-            user_id=current_user_id,
+        # La réponse renvoie la correction enregistrée (id attribué par la base)
+        new_correction = history_writer.enqueue(
+            user_id=int(current_user_id),
             source_text=source_text,
             translated_text=corrected_text_from_frontend,
             from_lang=from_lang,
@@ -219,8 +646,11 @@ def save_correction():
             original_translation_id=original_translation_id,
             timestamp=datetime.utcnow()
         )
-        db.session.add(new_correction)
-        db.session.commit()
+
+        # La correction remplace la sortie du modèle en cache pour cette source et
+        # entre dans la mémoire de traduction (mise à jour incrémentale de l'index)
+        translation_cache.put_correction(from_lang, to_lang, source_text, corrected_text_from_frontend)
+        translation_memory.add_correction(from_lang, to_lang, source_text, corrected_text_from_frontend)
 
         print(f"DEBUG Backend: Correction enregistrée avec ID: {new_correction.id} pour l'original ID: {original_translation_id}")
         return jsonify(new_correction.to_dict()), 201
@@ -231,9 +661,42 @@ def save_correction():
         return jsonify({"error": f"Erreur lors de la sauvegarde de la correction: {str(e)}"}), 500
 
 
+def _parse_bool_arg(name):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Le paramètre '{name}' doit valoir true ou false.")
+
+
+def encode_history_cursor(entry):
+    """Curseur opaque (timestamp, id) de la dernière entrée d'une page."""
+    raw = f"{entry.timestamp.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_history_cursor(cursor):
+    try:
+        timestamp, entry_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(entry_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("Curseur de pagination invalide.")
+
+
 @translation_bp.route('/get_translations', methods=['GET'])
 @jwt_required()
 def get_translations_api():
+    """Historique de l'utilisateur, paginé par curseur (keyset) sur (timestamp, id).
+
+    Paramètres : limit, cursor (en-tête X-Next-Cursor de la page précédente),
+    from_lang, to_lang, is_correction, include_corrections (défaut true).
+    Le corps reste la liste des entrées ; chaque original porte ses corrections
+    ("corrections"), chargées en une seule requête. Un ETag calculé sans charger
+    les lignes permet de répondre 304 si l'historique n'a pas changé.
+    """
     auth_header = request.headers.get('Authorization')
     if auth_header and auth_header.startswith('Bearer '):
         token = auth_header.split(" ")[1]
@@ -243,12 +706,66 @@ def get_translations_api():
                 print("Avertissement: get_jwt_identity() a retourné None. Utilisateur non authentifié ou token invalide.")
                 return jsonify({'error': 'Authentification requise.'}), 401
 
-            user_entries = Translation.query.filter_by(user_id=current_user_id).order_by(Translation.timestamp.desc()).all()
-            
-            translations_data = [entry.to_dict() for entry in user_entries]
-            
-            print("Données d'historique récupérées avec succès (via to_dict()):", translations_data)
-            return jsonify(translations_data), 200
+            try:
+                limit = int(request.args.get('limit', current_app.config.get("HISTORY_PAGE_SIZE", 50)))
+                limit = max(1, min(limit, current_app.config.get("HISTORY_MAX_PAGE_SIZE", 200)))
+                is_correction = _parse_bool_arg('is_correction')
+                include_corrections = _parse_bool_arg('include_corrections') is not False
+                cursor = request.args.get('cursor')
+                after = decode_history_cursor(cursor) if cursor else None
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            query = Translation.query.filter(Translation.user_id == current_user_id)
+            from_lang = request.args.get('from_lang')
+            to_lang = request.args.get('to_lang')
+            if from_lang:
+                query = query.filter(Translation.from_lang == from_lang)
+            if to_lang:
+                query = query.filter(Translation.to_lang == to_lang)
+            if is_correction is not None:
+                query = query.filter(Translation.is_correction == is_correction)
+
+            # L'historique n'est qu'ajouté (jamais modifié) : (nombre, id max) de l'utilisateur
+            # suffit à savoir s'il a changé, via l'index (user_id, timestamp).
+            count, max_id = db.session.query(db.func.count(Translation.id), db.func.max(Translation.id)) \
+                .filter(Translation.user_id == current_user_id).one()
+            etag = hashlib.sha1(f"{current_user_id}|{count}|{max_id}|{request.query_string.decode()}".encode()).hexdigest()
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            if after:
+                after_timestamp, after_id = after
+                query = query.filter(db.or_(
+                    Translation.timestamp < after_timestamp,
+                    db.and_(Translation.timestamp == after_timestamp, Translation.id < after_id),
+                ))
+            # Une ligne de plus pour savoir s'il existe une page suivante
+            entries = query.order_by(Translation.timestamp.desc(), Translation.id.desc()).limit(limit + 1).all()
+            has_more = len(entries) > limit
+            entries = entries[:limit]
+
+            translations_data = [entry.to_dict() for entry in entries]
+            if include_corrections:
+                original_ids = [entry.id for entry in entries if not entry.is_correction]
+                corrections_by_original = {original_id: [] for original_id in original_ids}
+                if original_ids:
+                    corrections = Translation.query \
+                        .filter(Translation.original_translation_id.in_(original_ids)) \
+                        .order_by(Translation.timestamp.asc(), Translation.id.asc()).all()
+                    for correction in corrections:
+                        corrections_by_original[correction.original_translation_id].append(correction.to_dict())
+                for item in translations_data:
+                    if not item['isCorrection']:
+                        item['corrections'] = corrections_by_original[item['id']]
+
+            response = jsonify(translations_data)
+            response.set_etag(etag)
+            if has_more and entries:
+                response.headers['X-Next-Cursor'] = encode_history_cursor(entries[-1])
+            return response, 200
 
         except Exception as e:
             print(f"--- Erreur inattendue dans get_translations_api: {e} ---")
@@ -256,4 +773,62 @@ def get_translations_api():
 
     else:
         print("Aucun header Authorization 'Bearer' valide trouvé pour /get_translations. Accès non autorisé.")
-        return jsonify({"msg": "Authentification requise"}), 401
\ No newline at end of file
+        return jsonify({"msg": "Authentification requise"}), 401
+
+
+@translation_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Compteurs hits/misses du cache de traduction, pour le dimensionner."""
+    return jsonify(translation_cache.stats()), 200
+
+
+@translation_bp.route('/translation_memory/stats', methods=['GET'])
+def get_translation_memory_stats():
+    """Taille de la mémoire de traduction par direction et taux de correspondance."""
+    return jsonify(translation_memory.stats()), 200
+
+
+@translation_bp.route('/models', methods=['GET'])
+def get_models():
+    """Registre des modèles : budget, mémoire résidente par modèle, chargements et évictions."""
+    stats = model_registry.stats()
+    stats["directions"] = {
+        model_key: {
+            "modelId": model_config["id"],
+            "backend": model_config.get("backend", "torch"),
+            "sourceLang": model_config["source_lang_app"],
+            "targetLang": model_config["target_lang_app"],
+            "default": model_key == resolve_model_key(model_config["source_lang_app"], model_config["target_lang_app"]),
+        }
+        for model_key, model_config in MODEL_CONFIGS.items()
+    }
+    return jsonify(stats), 200
+
+
+@translation_bp.route('/health', methods=['GET'])
+def health():
+    """Sonde de vie : le processus répond, même si les modèles sont encore en chargement."""
+    return jsonify({"status": "ok"}), 200
+
+
+@translation_bp.route('/ready', methods=['GET'])
+def ready():
+    """Sonde de disponibilité pour le load balancer : 200 seulement si les modèles sont prêts.
+
+    Sans préchargement (PRELOAD_MODELS désactivé), les modèles non encore chargés
+    ne bloquent pas la disponibilité : ils seront chargés à la première requête.
+    """
+    preload = current_app.config.get("PRELOAD_MODELS", False)
+    if inference_worker_pool.enabled:
+        # Les modèles vivent dans les workers : prêts quand chaque worker a signalé son démarrage
+        pool_stats = inference_worker_pool.stats()
+        if preload:
+            is_ready = pool_stats["readyWorkers"] == pool_stats["workers"]
+        else:
+            is_ready = not pool_stats["started"] or pool_stats["alive"] == pool_stats["workers"]
+        return jsonify({"ready": is_ready, "workerPool": pool_stats,
+                        "admission": admission_controller.stats()}), 200 if is_ready else 503
+
+    is_ready, directions = get_models_readiness(require_all=preload)
+    return jsonify({"ready": is_ready, "models": directions,
+                    "admission": admission_controller.stats()}), 200 if is_ready else 503
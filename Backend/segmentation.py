@@ -0,0 +1,67 @@
+# backend/segmentation.py
+# Découpage des textes longs en phrases / propositions avant la traduction.
+# NLLB traduit mal (et lentement : coût quadratique) les séquences très longues,
+# et la troncature du tokenizer faisait disparaître silencieusement la fin du texte.
+# Les frontières sont celles déjà utilisées pour nettoyer le corpus
+# (voir traitement_données.ipynb) : '.', ':', '!' (et '?', ';'), puis ',' pour
+# les phrases encore trop longues.
+import re
+from collections import namedtuple
+
+Segment = namedtuple("Segment", ["text", "separator"])
+
+# Ponctuation de fin de phrase, sauf dans un nombre ("3.5", "12:30").
+# Le corpus contient des phrases collées sans espace ("faadiye.Hi"), on ne
+# l'exige donc pas après la ponctuation.
+_SENTENCE_END_RE = re.compile(r"(?<!\d)[.!?:;]+(?!\d)|[.!?:;]+(?=\s|$)")
+_CLAUSE_END_RE = re.compile(r",(?!\d)")
+_LEADING_SPACE_RE = re.compile(r"\s*")
+
+
+class TooManySegmentsError(ValueError):
+    """Le texte dépasse le nombre maximal de segments autorisé par requête."""
+
+
+def _split(text, boundary_re):
+    """Découpe `text` après chaque frontière et renvoie des Segment(texte, séparateur)."""
+    segments = []
+    start = 0
+    for match in boundary_re.finditer(text):
+        end = match.end()
+        spaces = _LEADING_SPACE_RE.match(text, end).end()
+        chunk = text[start:end].strip()
+        if chunk:
+            segments.append(Segment(chunk, text[end:spaces]))
+        start = spaces
+    tail = text[start:].strip()
+    if tail:
+        segments.append(Segment(tail, ""))
+    return segments
+
+
+def split_into_segments(text, max_segment_chars=200):
+    """Découpe un texte en phrases, puis en propositions si une phrase reste trop longue."""
+    segments = []
+    for sentence in _split(text, _SENTENCE_END_RE):
+        if len(sentence.text) <= max_segment_chars:
+            segments.append(sentence)
+            continue
+        clauses = _split(sentence.text, _CLAUSE_END_RE)
+        if clauses:
+            clauses[-1] = Segment(clauses[-1].text, sentence.separator)
+        segments.extend(clauses)
+    return segments
+
+
+def join_segments(segments, translations):
+    """Réassemble les traductions dans l'ordre d'origine.
+
+    Les retours à la ligne du texte source sont conservés ; tout autre séparateur
+    (y compris l'absence d'espace, fréquente dans le corpus) devient une espace.
+    """
+    parts = []
+    for index, (segment, translation) in enumerate(zip(segments, translations)):
+        parts.append(translation.strip())
+        if index < len(segments) - 1:
+            parts.append("\n" * segment.separator.count("\n") if "\n" in segment.separator else " ")
+    return "".join(parts)
@@ -0,0 +1,83 @@
+# backend/tests/conftest.py
+# Configuration commune des tests : base SQLite temporaire et aucun modèle Hugging Face
+# téléchargé. Les tests qui ont besoin d'un vrai modèle utilisent `tiny_model_dir`
+# (benchmarks/tiny_model.py), ignorés si torch / transformers / sentencepiece manquent.
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+# Config lit l'environnement à l'import : tout est fixé avant le premier import du backend
+_TMP_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["JWT_SECRET_KEY"] = "cle-de-test-suffisamment-longue-pour-hs256"
+os.environ["SECRET_KEY"] = "tests"
+os.environ["MODEL_REGISTRY_FILE"] = os.path.join(_TMP_DIR, "absent_registry.json")
+os.environ["PRELOAD_MODELS"] = "false"
+os.environ["INFERENCE_WORKERS"] = "0"
+os.environ["TRANSLATION_CACHE_WARMUP_SIZE"] = "0"
+
+TINY_LANGUAGES = ["acm_Latn", "fra_Latn", "arb_Latn"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+
+    return create_app(preload_models=False)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def clean_db(app):
+    """Vide les tables avant le test."""
+    from models import Translation, User, db
+
+    with app.app_context():
+        Translation.query.delete()
+        User.query.delete()
+        db.session.commit()
+    yield
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    pytest.importorskip("sentencepiece")
+    from benchmarks.tiny_model import build_tiny_model
+
+    return build_tiny_model(str(tmp_path_factory.mktemp("tiny_model")), TINY_LANGUAGES)
+
+
+@pytest.fixture(scope="session")
+def tiny_model_config(tiny_model_dir):
+    return {
+        "id": tiny_model_dir,
+        "source_lang_app": "fr",
+        "target_lang_app": "ar-TD",
+        "source_lang_nllb": "fra_Latn",
+        "target_lang_nllb": "arb_Latn",
+        "backend": "torch",
+    }
+
+
+@pytest.fixture
+def tiny_direction(app, tiny_model_config, monkeypatch):
+    """Direction fr_to_ar-TD servie par le modèle miniature ; renvoie sa porte d'admission."""
+    from admission import admission_controller
+    from inference import MODEL_CONFIGS
+
+    monkeypatch.setitem(MODEL_CONFIGS, "fr_to_ar-TD", tiny_model_config)
+    gate = admission_controller.gate("fr_to_ar-TD")
+    yield gate
+    gate.release(gate.pending)
+    gate.item_seconds = None
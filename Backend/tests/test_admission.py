@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from admission import DeadlineUnreachableError, DirectionGate, QueueFullError
+from batching import MicroBatcher
+
+
+def test_full_queue_is_refused_with_429():
+    gate = DirectionGate("test", max_pending=4)
+    gate.admit(4)
+
+    with pytest.raises(QueueFullError) as refused:
+        gate.admit(1)
+    assert refused.value.status_code == 429
+    assert refused.value.retry_after >= 1
+
+    gate.release(4)
+    gate.admit(1)
+
+
+def test_oversized_request_is_admitted_on_an_idle_direction():
+    gate = DirectionGate("test", max_pending=4)
+
+    gate.admit(10)
+    assert gate.stats()["pending"] == 10
+
+
+def test_unreachable_deadline_is_refused_with_503():
+    gate = DirectionGate("test", max_pending=100)
+    gate.observe(seconds=4.0, items=2)  # 2 s par segment
+    gate.admit(3)
+
+    with pytest.raises(DeadlineUnreachableError) as refused:
+        gate.admit(1, expires_at=time.monotonic() + 1.0)
+    assert refused.value.status_code == 503
+    assert refused.value.retry_after == 6
+    gate.admit(1, expires_at=time.monotonic() + 30.0)
+
+
+def test_expired_item_is_dropped_before_the_model():
+    calls = []
+    gate = DirectionGate("test-drop", max_pending=10, min_generate_seconds=0.05)
+    batcher = MicroBatcher("test-drop", lambda texts, deadline: calls.append(texts) or texts,
+                           max_batch_size=4, max_wait_ms=5, gate=gate)
+
+    with gate.slot():
+        # Place d'exécution occupée plus longtemps que l'échéance de la requête
+        future = batcher.submit("trop tard", deadline=time.monotonic() + 0.1)
+        time.sleep(0.2)
+
+    with pytest.raises(DeadlineUnreachableError):
+        future.result(timeout=5)
+    assert calls == []
+    assert gate.stats()["pending"] == 0
+    assert batcher.translate("à temps", timeout=5) == "à temps"
+
+
+def _translate(client, **extra):
+    return client.post("/api/translate", json={
+        "source_text": f"Bonjour {time.monotonic()}.", "from_lang": "fr", "to_lang": "ar-TD", **extra
+    })
+
+
+def test_translate_returns_429_with_retry_after_when_the_queue_is_full(client, tiny_direction):
+    tiny_direction.admit(tiny_direction.max_pending)
+
+    response = _translate(client)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retryAfter"] == int(response.headers["Retry-After"])
+
+
+def test_translate_returns_503_when_the_deadline_cannot_be_met(client, tiny_direction):
+    tiny_direction.observe(seconds=5.0, items=1)
+    tiny_direction.admit(1)
+
+    response = _translate(client, deadline_ms=200)
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) == 5
+
+
+def test_translate_succeeds_once_capacity_is_back(client, tiny_direction):
+    tiny_direction.admit(tiny_direction.max_pending)
+    assert _translate(client).status_code == 429
+    tiny_direction.release(tiny_direction.max_pending)
+
+    response = _translate(client)
+
+    assert response.status_code == 200
+    assert response.get_json()["translatedText"]
+    assert tiny_direction.stats()["pending"] == 0
+
+
+def test_stream_disconnect_stops_generation_before_freeing_capacity(client, tiny_direction):
+    from inference import load_direction_model
+
+    _, model, _ = load_direction_model("fr_to_ar-TD")
+    steps = []
+    hook = model.get_decoder().register_forward_hook(lambda *args: steps.append(time.sleep(0.05)))
+    try:
+        response = client.post("/api/translate/stream", json={
+            "source_text": "Bonjour tout le monde, comment allez-vous ?", "from_lang": "fr", "to_lang": "ar-TD",
+            "profile": "quality",
+        }, buffered=False)
+        assert next(iter(response.response)).startswith(b"event: token")
+        response.close()
+
+        assert tiny_direction.stats()["pending"] == 0
+        assert tiny_direction.stats()["running"] == 0
+        closed_steps = len(steps)
+        time.sleep(0.3)
+        assert len(steps) == closed_steps
+    finally:
+        hook.remove()
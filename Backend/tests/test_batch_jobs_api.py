@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+TEXTS = ["Bonjour tout le monde.", "", "Merci beaucoup.", "Bonjour tout le monde."]
+
+
+def _payload(**extra):
+    return {"texts": TEXTS, "from_lang": "fr", "to_lang": "ar-TD", **extra}
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"from_lang": "fr", "to_lang": "ar-TD"}, "liste non vide"),
+    (_payload(texts="Bonjour"), "liste non vide"),
+    (_payload(texts=["Bonjour", 3]), "doivent être des chaînes"),
+    (_payload(to_lang=""), "sont requises"),
+    (_payload(to_lang="de"), "non supportée"),
+    (_payload(profile="turbo"), "Profil de décodage inconnu"),
+    (_payload(deadline_ms=-5), "nombre positif"),
+])
+def test_invalid_batch_is_rejected_with_400(client, payload, message):
+    response = client.post("/api/translate/batch", json=payload)
+
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_batch_size_limit(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "TRANSLATION_BATCH_MAX_TEXTS", 3)
+
+    response = client.post("/api/translate/batch", json=_payload())
+
+    assert response.status_code == 400
+    assert "maximum 3" in response.get_json()["error"]
+
+
+def test_jobs_do_not_accept_a_deadline(client):
+    response = client.post("/api/jobs", json=_payload(deadline_ms=1000))
+
+    assert response.status_code == 400
+    assert "deadline_ms" in response.get_json()["error"]
+
+
+def test_batch_results_follow_the_input_order(client, tiny_direction):
+    response = client.post("/api/translate/batch", json=_payload())
+
+    assert response.status_code == 200
+    items = response.get_json()["translations"]
+    assert [item["sourceText"] for item in items] == TEXTS
+    assert items[1]["translatedText"] == ""
+    assert items[0]["translatedText"] and items[2]["translatedText"]
+    assert items[0]["translatedText"] == items[3]["translatedText"]
+
+
+def test_job_lifecycle(client, tiny_direction):
+    # Textes absents du cache, pour que la tâche passe par le modèle
+    lines = ["Le document commence ici.", "", "Il se termine là."]
+    # Place d'inférence occupée : la tâche ne peut pas se terminer tant qu'elle est tenue
+    with tiny_direction.slot():
+        created = client.post("/api/jobs", json={"document": "\n".join(lines), "from_lang": "fr", "to_lang": "ar-TD"})
+        assert created.status_code == 202
+        job = created.get_json()
+        assert job["status"] in ("pending", "running")
+        assert job["total"] == len(lines)
+
+        status = client.get(f"/api/jobs/{job['jobId']}").get_json()
+        assert status["status"] in ("pending", "running")
+        assert status["done"] == 0
+        assert client.get(f"/api/jobs/{job['jobId']}/result").status_code == 409
+
+    for _ in range(300):
+        status = client.get(f"/api/jobs/{job['jobId']}").get_json()
+        if status["status"] not in ("pending", "running"):
+            break
+        time.sleep(0.1)
+    assert status["status"] == "completed"
+    assert status["done"] == len(lines) and status["progress"] == 1.0
+
+    result = client.get(f"/api/jobs/{job['jobId']}/result")
+    assert result.status_code == 200
+    translations = result.get_json()["translations"]
+    assert [item["sourceText"] for item in translations] == lines
+    assert translations[1]["translatedText"] == "" and translations[2]["translatedText"]
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/api/jobs/inconnue").status_code == 404
+    assert client.get("/api/jobs/inconnue/result").status_code == 404
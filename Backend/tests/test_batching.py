@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def _upper_batch(calls):
+    def batch_fn(texts, deadline):
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+    return batch_fn
+
+
+def test_results_follow_submission_order_across_batches():
+    calls = []
+    batcher = MicroBatcher("test-order", _upper_batch(calls), max_batch_size=3, max_wait_ms=20)
+    texts = [f"texte {i}" for i in range(10)]
+
+    futures = batcher.submit_many(texts)
+
+    assert [future.result(timeout=5) for future in futures] == [text.upper() for text in texts]
+    assert all(len(call) <= 3 for call in calls)
+    assert sum(len(call) for call in calls) == len(texts)
+
+
+def test_concurrent_submitters_are_grouped_into_one_batch():
+    calls = []
+    batcher = MicroBatcher("test-group", _upper_batch(calls), max_batch_size=8, max_wait_ms=200)
+    barrier = threading.Barrier(4)
+    results = {}
+
+    def submit(index):
+        barrier.wait()
+        results[index] = batcher.translate(f"requête {index}", timeout=5)
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {index: f"REQUÊTE {index}" for index in range(4)}
+    assert len(calls) == 1
+
+
+def test_batch_failure_is_raised_to_every_caller():
+    def failing(texts, deadline):
+        raise RuntimeError("generate a échoué")
+
+    batcher = MicroBatcher("test-failure", failing, max_batch_size=4, max_wait_ms=20)
+    futures = batcher.submit_many(["a", "b", "c"])
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="generate a échoué"):
+            future.result(timeout=5)
+
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher("test-count", lambda texts, deadline: texts[:1], max_batch_size=4, max_wait_ms=20)
+    futures = batcher.submit_many(["a", "b"])
+
+    with pytest.raises(RuntimeError, match="1 résultats pour 2 textes"):
+        futures[1].result(timeout=5)
+
+
+def test_batcher_keeps_running_after_a_failure():
+    calls = []
+
+    def flaky(texts, deadline):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise ValueError("premier lot en échec")
+        return texts
+
+    batcher = MicroBatcher("test-recover", flaky, max_batch_size=4, max_wait_ms=5)
+    with pytest.raises(ValueError):
+        batcher.translate("a", timeout=5)
+    assert batcher.translate("b", timeout=5) == "b"
+
+
+def _recording_batch(calls):
+    def batch_fn(texts, deadline):
+        calls.append((list(texts), deadline))
+        return list(texts)
+    return batch_fn
+
+
+def test_requests_without_deadline_are_never_cut_by_a_neighbour():
+    calls = []
+    batcher = MicroBatcher("test-deadline", _recording_batch(calls), max_batch_size=8, max_wait_ms=100)
+    deadline = time.monotonic() + 5
+
+    futures = batcher.submit_many(["sans échéance"]) + batcher.submit_many(["pressé"], deadline)
+
+    assert [future.result(timeout=5) for future in futures] == ["sans échéance", "pressé"]
+    assert sorted(calls, key=lambda call: call[1] is None) == [(["pressé"], deadline), (["sans échéance"], None)]
+
+
+def test_distant_deadlines_are_batched_separately():
+    calls = []
+    batcher = MicroBatcher("test-deadline-groups", _recording_batch(calls), max_batch_size=8, max_wait_ms=100)
+    now = time.monotonic()
+
+    futures = (
+        batcher.submit_many(["a"], now + 10) + batcher.submit_many(["b"], now + 1)
+        + batcher.submit_many(["c"], now + 1.5)
+    )
+
+    assert [future.result(timeout=5) for future in futures] == ["a", "b", "c"]
+    # Les plus urgents d'abord ; "a" n'hérite pas de l'échéance de "b"
+    assert calls == [(["b", "c"], now + 1), (["a"], now + 10)]
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from bulk_translation import translate_file
+
+LINES = [f"Phrase numéro {index} à traduire." if index % 4 else "" for index in range(11)]
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _stop_after(chunks):
+    written = []
+
+    def progress(stats):
+        written.append(stats)
+        if len(written) == chunks:
+            raise _Interrupted()
+    return progress
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as output_file:
+        return output_file.read().split("\n")[:-1]
+
+
+def test_interrupted_run_resumes_without_duplicated_or_missing_lines(tmp_path, tiny_model_config):
+    input_path = tmp_path / "entree.txt"
+    input_path.write_text("".join(f"{line}\n" for line in LINES), encoding="utf-8")
+    options = {"chunk_size": 2, "batch_size": 4}
+
+    reference_path = str(tmp_path / "reference.txt")
+    translate_file(str(input_path), reference_path, tiny_model_config, **options)
+    reference = _read_lines(reference_path)
+    assert len(reference) == len(LINES)
+    assert [index for index, line in enumerate(reference) if not line] == [0, 4, 8]
+
+    output_path = str(tmp_path / "sortie.txt")
+    with pytest.raises(_Interrupted):
+        translate_file(str(input_path), output_path, tiny_model_config, progress=_stop_after(2), **options)
+    assert os.path.exists(f"{output_path}.checkpoint.json")
+    # Bloc écrit mais interrompu avant son point de reprise : il est réécrit à la reprise
+    with open(output_path, "a", encoding="utf-8") as output_file:
+        output_file.write("ligne partielle\n")
+
+    stats = translate_file(str(input_path), output_path, tiny_model_config, **options)
+
+    assert stats["resumedFromLine"] == 4
+    assert stats["linesThisRun"] == len(LINES) - 4
+    assert _read_lines(output_path) == reference
+    assert not os.path.exists(f"{output_path}.checkpoint.json")
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+import pytest
+
+from corpus_preprocessing import PreprocessedCorpus, preprocess_corpus, validate_corpus
+
+# (source, cible) ; la dernière source n'a pas de cible (fichiers décalés)
+PAIRS = [
+    ("Bonjour.", "Salam."),
+    ("  bonjour.  ", "SALAM."),                                  # doublon (casse, espaces)
+    ("Merci beaucoup.", "Shukran katir."),
+    ("", "Phrase sans source."),                                 # vide
+    ("Oui.", "Na'am, ceci est une phrase beaucoup trop longue."),  # rapport de longueurs
+    ("Une phrase " * 10, "Jumla " * 10),                          # trop longue
+    ("Au revoir.", "Ma'a salama."),
+]
+EXTRA_SOURCE = "Ligne sans traduction."
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory, tiny_model_dir):
+    data_dir = tmp_path_factory.mktemp("corpus")
+    source_path, target_path = data_dir / "source.txt", data_dir / "target.txt"
+    source_path.write_text("".join(f"{source}\n" for source, _ in PAIRS) + f"{EXTRA_SOURCE}\n", encoding="utf-8")
+    target_path.write_text("".join(f"{target}\n" for _, target in PAIRS), encoding="utf-8")
+    output_dir = str(data_dir / "pretraite")
+    manifest = preprocess_corpus(
+        str(source_path), str(target_path), output_dir, tiny_model_dir, "fra_Latn", "arb_Latn",
+        workers=1, chunk_size=3, shard_size=2, max_chars=60,
+    )
+    return output_dir, manifest
+
+
+def test_pairs_are_deduplicated_and_filtered(corpus):
+    _, manifest = corpus
+
+    expected = {"pairsRead": 8, "pairsKept": 3, "duplicates": 1, "empty": 1, "ratio": 1, "tooLong": 1, "misaligned": 1}
+    assert {key: manifest["stats"][key] for key in expected} == expected
+    assert list(PreprocessedCorpus(corpus[0]).texts()) == [
+        ("Bonjour.", "Salam."), ("Merci beaucoup.", "Shukran katir."), ("Au revoir.", "Ma'a salama."),
+    ]
+
+
+def test_shards_and_manifest_layout(corpus):
+    output_dir, manifest = corpus
+
+    assert [(shard["name"], shard["pairs"]) for shard in manifest["shards"]] == [("shard-00000", 2), ("shard-00001", 1)]
+    for shard in manifest["shards"]:
+        assert sorted(os.listdir(os.path.join(output_dir, shard["name"]))) == sorted(shard["files"]) == [
+            "source.txt", "source_ids.npy", "source_offsets.npy", "target.txt", "target_ids.npy", "target_offsets.npy",
+        ]
+    assert os.path.exists(os.path.join(output_dir, "manifest.json"))
+    assert validate_corpus(output_dir) == []
+
+
+def test_corpus_items_are_the_tokenized_pairs(corpus, tiny_model_dir):
+    from vocab_pruning import load_tokenizer
+
+    tokenizer = load_tokenizer(tiny_model_dir)
+    tokenizer.src_lang, tokenizer.tgt_lang = "fra_Latn", "arb_Latn"
+    dataset = PreprocessedCorpus(corpus[0])
+
+    assert len(dataset) == 3
+    # Dernière paire : premier élément du second shard
+    assert dataset[2] == dataset[-1] == {
+        "input_ids": tokenizer("Au revoir.")["input_ids"],
+        "labels": tokenizer(text_target="Ma'a salama.")["input_ids"],
+    }
+    with pytest.raises(IndexError):
+        dataset[3]
+
+
+def test_corrupted_shard_is_reported(corpus, tmp_path):
+    output_dir = str(tmp_path / "copie")
+    shutil.copytree(corpus[0], output_dir)
+    with open(os.path.join(output_dir, "shard-00001", "source.txt"), "a", encoding="utf-8") as source_file:
+        source_file.write("ligne en trop\n")
+
+    problems = validate_corpus(output_dir)
+    assert "shard-00001/source.txt: empreinte sha256 différente du manifeste." in problems
+    assert "shard-00001/source.txt: 2 lignes pour 1 paires." in problems
+    assert validate_corpus(output_dir, check_hashes=False) == ["shard-00001/source.txt: 2 lignes pour 1 paires."]
@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+from decoding_profiles import generation_kwargs, resolve_profile
+
+
+def test_default_profile_keeps_the_original_decoding():
+    assert resolve_profile() == "standard"
+    assert generation_kwargs(None, source_length=12) == {"num_beams": 1, "max_new_tokens": 200, "do_sample": False}
+
+
+def test_profiles_cap_tokens_relative_to_the_source():
+    assert generation_kwargs("fast", source_length=10)["max_new_tokens"] == 23
+    quality = generation_kwargs("quality", source_length=10)
+    assert quality["num_beams"] == 4 and quality["early_stopping"]
+    assert quality["no_repeat_ngram_size"] == 4
+    # Pas de faisceau en streaming
+    assert generation_kwargs("quality", source_length=10, streaming=True)["num_beams"] == 1
+
+
+def test_deadline_becomes_max_time():
+    kwargs = generation_kwargs(None, source_length=5, deadline=time.monotonic() + 2)
+    assert 0 < kwargs["max_time"] <= 2
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="Profil de décodage inconnu"):
+        resolve_profile("turbo")
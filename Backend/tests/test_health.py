@@ -0,0 +1,50 @@
+import shutil
+import threading
+import time
+
+
+def test_ready_waits_for_warm_up_while_health_stays_up(app, client, tiny_model_config, tmp_path, monkeypatch):
+    import inference
+
+    # Copie du modèle miniature : un identifiant que le registre n'a encore jamais chargé
+    model_dir = str(tmp_path / "modele")
+    shutil.copytree(tiny_model_config["id"], model_dir)
+    for model_key in list(inference.MODEL_CONFIGS):
+        monkeypatch.delitem(inference.MODEL_CONFIGS, model_key)
+    monkeypatch.setitem(inference.MODEL_CONFIGS, "fr_to_ar-TD", {**tiny_model_config, "id": model_dir})
+    monkeypatch.setitem(app.config, "PRELOAD_MODELS", True)
+
+    # Chargement puis préchauffage retenus jusqu'à leur set() : chaque état est observable
+    loaded, warmed = threading.Event(), threading.Event()
+    load_from_disk, translate = inference._load_from_disk, inference.perform_batch_translation
+    monkeypatch.setattr(inference, "_load_from_disk", lambda *args: loaded.wait(30) and load_from_disk(*args))
+    monkeypatch.setattr(inference, "perform_batch_translation",
+                        lambda *args, **kwargs: warmed.wait(30) and translate(*args, **kwargs))
+
+    inference.preload_all_models(wait=False)
+    try:
+        for event, state in ((loaded, "loading"), (warmed, "warming_up")):
+            for _ in range(300):
+                response = client.get("/api/ready")
+                if response.get_json()["models"]["fr_to_ar-TD"]["status"] == state:
+                    break
+                time.sleep(0.05)
+            assert response.get_json()["models"]["fr_to_ar-TD"]["status"] == state
+            assert response.status_code == 503
+            assert client.get("/api/health").status_code == 200
+            event.set()
+    finally:
+        loaded.set()
+        warmed.set()
+
+    for _ in range(300):
+        response = client.get("/api/ready")
+        if response.status_code == 200:
+            break
+        assert client.get("/api/health").status_code == 200
+        time.sleep(0.1)
+    assert response.status_code == 200
+    direction = response.get_json()["models"]["fr_to_ar-TD"]
+    assert direction["status"] == "ready"
+    assert direction["warmupSeconds"] is not None
+    assert client.get("/api/health").status_code == 200
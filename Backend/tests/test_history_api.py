@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from models import Translation, User, db
+
+
+@pytest.fixture
+def history(app, clean_db):
+    """Un utilisateur avec 7 traductions, dont deux au même instant (départage par id)."""
+    with app.app_context():
+        user = User(email="historique@example.com")
+        user.set_password("secret")
+        db.session.add(user)
+        db.session.flush()
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for index in range(7):
+            db.session.add(Translation(
+                user_id=user.id, source_text=f"source {index}", translated_text=f"traduction {index}",
+                from_lang="fr", to_lang="ar-TD", timestamp=base + timedelta(minutes=min(index, 5)),
+            ))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_cursor_walks_every_entry_once_newest_first(client, history):
+    seen = []
+    cursor = None
+    while True:
+        query = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/get_translations", query_string=query, headers=history)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 3
+        seen.extend(item["sourceText"] for item in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == [f"source {index}" for index in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_invalid_cursor_is_rejected(client, history):
+    response = client.get("/api/get_translations", query_string={"cursor": "pas-un-curseur"}, headers=history)
+
+    assert response.status_code == 400
+
+
+def test_unchanged_history_returns_304(app, client, history):
+    first = client.get("/api/get_translations", headers=history)
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/get_translations", headers={**history, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    with app.app_context():
+        user_id = User.query.filter_by(email="historique@example.com").one().id
+        db.session.add(Translation(
+            user_id=user_id, source_text="nouvelle", translated_text="jdiid", from_lang="fr", to_lang="ar-TD"
+        ))
+        db.session.commit()
+    changed = client.get("/api/get_translations", headers={**history, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()[0]["sourceText"] == "nouvelle"
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from history_writer import HistoryWriter, _PendingRow
+from models import Translation
+
+
+def _writer(app, enabled, **options):
+    writer = HistoryWriter(**options)
+    writer.init_app(app)
+    writer.enabled = enabled
+    return writer
+
+
+def _row(index, **extra):
+    return {"source_text": f"source {index}", "translated_text": f"traduction {index}",
+            "from_lang": "fr", "to_lang": "ar-TD", **extra}
+
+
+def test_group_commit_is_on_by_default(app):
+    assert app.config["HISTORY_GROUP_COMMIT"] is True
+
+
+def test_lone_request_is_committed_without_waiting(app, clean_db):
+    from metrics import STAGE_SECONDS
+
+    writer = _writer(app, enabled=True)
+    entry = writer.enqueue(**_row(0))
+
+    assert entry.id is not None
+    assert writer.stats()["flushes"] == 1
+    assert writer.stats()["pendingRows"] == 0
+    # Durée du commit par direction, comme les autres étapes
+    assert 'stage="db_commit",direction="fr_to_ar-TD"' in "\n".join(STAGE_SECONDS.render())
+
+
+def test_two_writers_get_distinct_database_ids(app, clean_db):
+    # Deux écrivains indépendants (deux processus web, ou un second create_app)
+    first, second = _writer(app, enabled=True), _writer(app, enabled=False)
+    entries = []
+    for index in range(5):
+        entries.append(first.enqueue(**_row(index)))
+        entries.append(second.enqueue(**_row(100 + index)))
+
+    ids = [entry.id for entry in entries]
+    assert len(set(ids)) == len(ids)
+    with app.app_context():
+        stored = {row.id: row.source_text for row in Translation.query.all()}
+    assert {entry.id: entry.source_text for entry in entries} == stored
+
+
+def _hold_commits(writer):
+    """Bloque les commits de `writer` jusqu'à `release.set()` ; `started` marque le premier."""
+    started, release = threading.Event(), threading.Event()
+    write = writer._write
+
+    def slow_write(batch):
+        started.set()
+        release.wait(5)
+        write(batch)
+
+    writer._write = slow_write
+    return started, release
+
+
+def test_rows_arriving_during_a_commit_share_the_next_one(app, clean_db):
+    writer = _writer(app, enabled=True)
+    started, release = _hold_commits(writer)
+    results = {}
+
+    def save(index):
+        results[index] = writer.enqueue(**_row(index))
+
+    first = threading.Thread(target=save, args=(0,))
+    first.start()
+    assert started.wait(5)
+    threads = [threading.Thread(target=save, args=(index,)) for index in range(1, 8)]
+    for thread in threads:
+        thread.start()
+    while writer.stats()["pendingRows"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in [first] + threads:
+        thread.join()
+
+    # Un commit pour la première requête, un seul pour les 7 arrivées pendant celui-ci
+    assert writer.stats()["flushes"] == 2
+    assert all(results[index].source_text == f"source {index}" for index in range(8))
+    with app.app_context():
+        assert Translation.query.count() == 8
+
+
+def test_failed_write_is_raised_to_its_caller_only(app, clean_db):
+    writer = _writer(app, enabled=False)
+
+    with pytest.raises(IntegrityError):
+        writer.enqueue(**_row(0, translated_text=None))
+
+    # Dans un lot, seule la ligne invalide échoue : les autres sont réessayées une par une
+    writer.enabled = True
+    bad = _PendingRow({**_row(1), "source_text": None})
+    writer._pending.append(bad)
+    good = writer.enqueue_many([_row(2), _row(3)])
+
+    with pytest.raises(IntegrityError):
+        bad.future.result()
+
+    assert [entry.source_text for entry in good] == ["source 2", "source 3"]
+    assert writer.stats()["failedRows"] == 2
+    with app.app_context():
+        assert sorted(row.source_text for row in Translation.query.all()) == ["source 2", "source 3"]
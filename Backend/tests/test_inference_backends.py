@@ -0,0 +1,69 @@
+import importlib.util
+import json
+
+import pytest
+
+from inference_backends import check_backend, load_backend_model
+from model_registry import load_model_configs
+
+
+def _translate(model_dir, model, device):
+    from inference import perform_batch_translation
+    from vocab_pruning import load_tokenizer
+
+    return perform_batch_translation(["Bonjour tout le monde."], load_tokenizer(model_dir), model, device,
+                                     "fra_Latn", "arb_Latn")
+
+
+def test_torch_backend_is_the_default(tiny_model_dir):
+    model, device = load_backend_model(tiny_model_dir, None, "cpu")
+
+    assert device == "cpu"
+    assert type(model).__name__ == "M2M100ForConditionalGeneration"
+    assert len(_translate(tiny_model_dir, model, device)) == 1
+
+
+def test_torch_int8_backend_quantizes_linear_layers(tiny_model_dir):
+    import torch
+
+    model, device = load_backend_model(tiny_model_dir, "torch-int8", "cpu")
+
+    assert device == "cpu"
+    quantized = [module for module in model.modules() if isinstance(module, torch.ao.nn.quantized.dynamic.Linear)]
+    assert quantized
+    assert not any(type(module) is torch.nn.Linear for module in model.model.modules())
+    assert len(_translate(tiny_model_dir, model, device)) == 1
+
+
+def test_onnx_backend(tiny_model_dir, tmp_path):
+    pytest.importorskip("optimum.onnxruntime")
+    from inference_backends import export_onnx_model
+
+    export_dir = export_onnx_model(tiny_model_dir, str(tmp_path / "onnx"), quantize=False)
+    model, device = load_backend_model(export_dir, "onnx", "cpu")
+
+    assert device == "cpu"
+    assert len(_translate(export_dir, model, device)) == 1
+
+
+def test_unknown_backend_is_rejected_when_the_configuration_is_read(tmp_path):
+    with pytest.raises(ValueError, match="Backend d'inférence inconnu : 'tensorrt'"):
+        check_backend("tensorrt")
+
+    registry_path = tmp_path / "registry.json"
+    registry_path.write_text(json.dumps({"directions": {"fr_to_ar-TD": {
+        "id": "modele", "source_lang_app": "fr", "target_lang_app": "ar-TD",
+        "source_lang_nllb": "fra_Latn", "target_lang_nllb": "arb_Latn", "backend": "tensorrt",
+    }}}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Direction 'fr_to_ar-TD' : Backend d'inférence inconnu"):
+        load_model_configs(str(registry_path), {})
+
+
+def test_onnx_without_optimum_is_rejected_when_the_configuration_is_read(monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: None if name == "optimum" else find_spec(name, *args))
+
+    with pytest.raises(ValueError, match="nécessite optimum"):
+        check_backend("onnx")
+    with pytest.raises(ValueError, match="Direction 'fr_to_ar-TD'"):
+        load_model_configs(None, {"fr_to_ar-TD": {"id": "modele", "backend": "onnx"}})
@@ -0,0 +1,33 @@
+from metrics import MetricsRegistry, registry
+
+
+def test_create_app_twice_does_not_duplicate_gauges(app):
+    from app import create_app
+
+    create_app(preload_models=False)
+    lines = registry.render().splitlines()
+
+    assert len(lines) == len(set(lines))
+    assert lines.count("# TYPE translation_cache_entries gauge") == 1
+
+
+def test_worker_metrics_are_merged_into_the_parent():
+    worker, parent = MetricsRegistry(), MetricsRegistry()
+    for metrics in (worker, parent):
+        metrics.counter("tokens_total", "Tokens.", ("direction",))
+        metrics.histogram("stage_seconds", "Étapes.", ("stage",), buckets=(0.1, 1.0))
+    worker_tokens, worker_stages = worker._metrics
+
+    worker_tokens.inc(7, direction="fr_to_ar-TD")
+    worker_stages.observe(0.05, stage="generate")
+    worker_stages.observe(0.5, stage="generate")
+    parent._metrics[0].inc(3, direction="fr_to_ar-TD")
+    parent.merge(worker.drain())
+    # Déjà vidées : une seconde fusion n'ajoute rien
+    parent.merge(worker.drain())
+
+    rendered = parent.render()
+    assert 'tokens_total{direction="fr_to_ar-TD"} 10' in rendered
+    assert 'stage_seconds_bucket{stage="generate",le="0.1"} 1' in rendered
+    assert 'stage_seconds_bucket{stage="generate",le="1.0"} 2' in rendered
+    assert 'stage_seconds_count{stage="generate"} 2' in rendered
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelRegistry, ModelUnavailableError
+
+MB = 1024 * 1024
+
+
+class _FakeTensor:
+    def __init__(self, size_bytes, pointer):
+        self.size_bytes = size_bytes
+        self.pointer = pointer
+
+    def numel(self):
+        return self.size_bytes
+
+    def element_size(self):
+        return 1
+
+    def data_ptr(self):
+        return self.pointer
+
+
+class _FakeModel:
+    def __init__(self, size_bytes):
+        self.tensor = _FakeTensor(size_bytes, id(self))
+
+    def state_dict(self):
+        return {"weight": self.tensor}
+
+
+def _loader(size_bytes, loads, delay=0.0):
+    def load():
+        time.sleep(delay)
+        loads.append(size_bytes)
+        return "tokenizer", _FakeModel(size_bytes), "cpu"
+    return load
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    registry = ModelRegistry(budget_bytes=2 * MB)
+    loads = []
+    registry.load(("a", "torch"), _loader(MB, loads))
+    registry.load(("b", "torch"), _loader(MB, loads))
+    registry.get(("a", "torch"))  # "b" devient le moins récemment utilisé
+    registry.load(("c", "torch"), _loader(MB, loads))
+
+    assert registry.status(("b", "torch"))["status"] == "evicted"
+    assert registry.status(("a", "torch"))["status"] == "ready"
+    assert registry.resident_bytes() == 2 * MB
+
+
+def test_leased_model_is_never_evicted():
+    registry = ModelRegistry(budget_bytes=MB)
+    loads = []
+    with registry.lease(("a", "torch"), _loader(MB, loads)):
+        registry.load(("b", "torch"), _loader(MB, loads))
+        assert registry.status(("a", "torch"))["status"] == "ready"
+    # Bail rendu : le budget est de nouveau respecté
+    assert registry.resident_bytes() <= MB
+
+
+def test_evicted_model_is_reloaded_in_the_background():
+    registry = ModelRegistry(budget_bytes=MB)
+    loads = []
+    registry.load(("a", "torch"), _loader(MB, loads))
+    registry.load(("b", "torch"), _loader(MB, loads))
+    assert registry.status(("a", "torch"))["status"] == "evicted"
+
+    slow_loader = _loader(MB, loads, delay=0.3)
+    started = time.perf_counter()
+    assert registry.prefetch(("a", "torch"), slow_loader)
+    assert time.perf_counter() - started < 0.1
+    assert registry.status(("a", "torch"))["status"] == "loading"
+
+    # Une requête pressée n'attend pas tout le rechargement...
+    with pytest.raises(ModelUnavailableError):
+        with registry.lease(("a", "torch"), slow_loader, timeout=0.01):
+            pass
+    # ... qui continue et profite à la suivante (un seul rechargement)
+    with registry.lease(("a", "torch"), slow_loader, timeout=5) as (tokenizer, model, device):
+        assert tokenizer == "tokenizer"
+    assert len(loads) == 3
+
+
+def test_prefetch_ignores_models_never_loaded():
+    registry = ModelRegistry()
+
+    assert not registry.prefetch(("inconnu", "torch"), _loader(MB, []))
+    assert registry.status(("inconnu", "torch")) is None
+
+
+def test_concurrent_leases_share_one_load():
+    registry = ModelRegistry()
+    loads = []
+    loader = _loader(MB, loads, delay=0.1)
+
+    def use_model():
+        with registry.lease(("a", "torch"), loader):
+            pass
+
+    threads = [threading.Thread(target=use_model) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
@@ -0,0 +1,44 @@
+import pytest
+
+from segmentation import TooManySegmentsError, join_segments, split_into_segments
+
+
+def test_sentences_are_split_after_final_punctuation():
+    segments = split_into_segments("Bonjour. Comment ça va ? Bien!")
+
+    assert [segment.text for segment in segments] == ["Bonjour.", "Comment ça va ?", "Bien!"]
+
+
+def test_numbers_and_glued_sentences():
+    segments = split_into_segments("Il est 12:30 et il fait 3.5 degrés.faadiye.Hi")
+
+    assert [segment.text for segment in segments] == ["Il est 12:30 et il fait 3.5 degrés.", "faadiye.", "Hi"]
+
+
+def test_long_sentence_is_split_into_clauses():
+    sentence = ", ".join(["une proposition assez longue"] * 4) + "."
+    segments = split_into_segments(sentence + "\nFin.", max_segment_chars=40)
+
+    assert all(len(segment.text) <= 40 for segment in segments)
+    assert segments[3].text == "une proposition assez longue."
+    # Le séparateur de la phrase découpée est repris par sa dernière proposition
+    assert segments[3].separator == "\n"
+
+
+def test_join_keeps_newlines_and_normalizes_other_separators():
+    segments = split_into_segments("Un.Deux.\n\nTrois.")
+    translations = [" one ", "two", "three"]
+
+    assert join_segments(segments, translations) == "one two\n\nthree"
+
+
+def test_blank_text_has_no_segment():
+    assert split_into_segments("   \n ") == []
+
+
+def test_too_many_segments_is_refused_before_the_model(app):
+    from routes.translation import translate_segmented
+
+    text = " ".join(f"Phrase {index}." for index in range(app.config["TRANSLATION_MAX_SEGMENTS"] + 1))
+    with app.app_context(), pytest.raises(TooManySegmentsError):
+        translate_segmented("direction-inconnue", text)
@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+def test_closing_the_stream_stops_generation(tiny_model_dir):
+    from inference import load_model_and_tokenizer, stream_translation
+
+    tokenizer, model, device = load_model_and_tokenizer(tiny_model_dir, "torch")
+    steps = []
+
+    def slow_step(*args):
+        # Chaque pas de décodage dure au moins 50 ms : une génération complète prendrait des secondes
+        steps.append(time.perf_counter())
+        time.sleep(0.05)
+
+    hook = model.get_decoder().register_forward_hook(slow_step)
+    try:
+        pieces = stream_translation(
+            "Bonjour tout le monde, comment allez-vous aujourd'hui ?", tokenizer, model, device,
+            "fra_Latn", "arb_Latn", profile="quality"
+        )
+        assert next(pieces)
+
+        started = time.perf_counter()
+        pieces.close()
+        assert time.perf_counter() - started < 1.0
+        assert not any(thread.name == "stream-generate" for thread in threading.enumerate())
+        # Plus aucun pas de décodage après la fermeture
+        closed_steps = len(steps)
+        time.sleep(0.3)
+        assert len(steps) == closed_steps
+    finally:
+        hook.remove()
@@ -0,0 +1,10 @@
+from corpus_preprocessing import clean_text
+from translation_cache import normalize_text
+
+
+def test_corpus_cleaning_and_cache_keys_fold_the_same_characters():
+    raw = "Salam ya\u2011akhuuy\u02bc  \u00c7a\u200b va\u2019?\n"
+
+    assert clean_text(raw) == "Salam ya-akhuuy' Ça va'?"
+    # La clé du cache ajoute seulement la casse : une phrase du corpus retrouve son entrée
+    assert normalize_text(raw.replace("\u200b", "")) == clean_text(raw).casefold()
@@ -0,0 +1,44 @@
+from translation_cache import TranslationCache, normalize_text
+
+
+def test_normalized_variants_share_one_entry():
+    cache = TranslationCache()
+    cache.put("fr", "ar-TD", "Salut  l’ami !", "salam")
+
+    assert cache.get("fr", "ar-TD", "salut l'ami !") == "salam"
+    assert normalize_text("A‑B") == "a-b"
+    assert cache.get("ar-TD", "fr", "salut l'ami !") is None
+
+
+def test_byte_limit_evicts_least_recently_used():
+    probe = TranslationCache()
+    probe.put("fr", "ar-TD", "source 0", "x" * 100)
+    entry_bytes = probe.stats()["bytes"]
+
+    cache = TranslationCache(max_entries=100, max_bytes=3 * entry_bytes)
+    for index in range(3):
+        cache.put("fr", "ar-TD", f"source {index}", "x" * 100)
+    cache.get("fr", "ar-TD", "source 0")  # devient la plus récente
+    cache.put("fr", "ar-TD", "source 3", "x" * 100)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["evictions"] == 1
+    assert cache.get("fr", "ar-TD", "source 1") is None
+    assert cache.get("fr", "ar-TD", "source 0") is not None
+
+
+def test_entry_larger_than_budget_is_not_stored():
+    cache = TranslationCache(max_bytes=1000)
+    cache.put("fr", "ar-TD", "source", "x" * 5000)
+
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_model_output_never_replaces_a_correction():
+    cache = TranslationCache()
+    cache.put_correction("fr", "ar-TD", "bonjour", "correction")
+    cache.put("fr", "ar-TD", "bonjour", "sortie du modèle")
+
+    assert cache.get("fr", "ar-TD", "bonjour") == "correction"
@@ -0,0 +1,70 @@
+from translation_memory import TranslationMemory
+
+SOURCE = "Le chien mange la viande rouge."
+NEGATION = "Le chien ne mange la viande rouge."
+
+
+def _memory(threshold=0.9):
+    memory = TranslationMemory(threshold=threshold)
+    memory.ready = True
+    return memory
+
+
+def test_model_output_only_matches_the_exact_source():
+    memory = _memory()
+    memory.add("fr", "ar-TD", SOURCE, "al kalib yaakul al laham al ahmar.")
+
+    assert memory.lookup("fr", "ar-TD", "le chien  mange la viande rouge.")["score"] == 1.0
+    # Phrase presque identique mais de sens opposé : jamais servie depuis une sortie du modèle
+    assert memory.lookup("fr", "ar-TD", NEGATION) is None
+
+
+def test_correction_matches_above_the_threshold():
+    memory = _memory()
+    memory.add_correction("fr", "ar-TD", SOURCE, "correction")
+
+    match = memory.lookup("fr", "ar-TD", "Le chien mange la viande rouge !")
+    assert match["isCorrection"]
+    assert 0.9 <= match["score"] < 1.0
+    assert match["translatedText"] == "correction"
+
+
+def test_correction_below_the_threshold_is_ignored():
+    memory = _memory(threshold=0.95)
+    memory.add_correction("fr", "ar-TD", SOURCE, "correction")
+
+    assert memory.lookup("fr", "ar-TD", NEGATION) is None
+    assert memory.lookup("fr", "ar-TD", NEGATION, threshold=0.9)["translatedText"] == "correction"
+
+
+def test_numbers_must_match_for_a_fuzzy_match():
+    memory = _memory(threshold=0.8)
+    memory.add_correction("fr", "ar-TD", "Lisez le verset 12 du chapitre.", "correction")
+
+    assert memory.lookup("fr", "ar-TD", "Lisez le verset 13 du chapitre.") is None
+
+
+def test_correction_replaces_model_output_but_not_the_reverse():
+    memory = _memory()
+    memory.add("fr", "ar-TD", SOURCE, "sortie du modèle")
+    memory.add_correction("fr", "ar-TD", SOURCE, "correction")
+    memory.add("fr", "ar-TD", SOURCE, "nouvelle sortie du modèle")
+
+    match = memory.lookup("fr", "ar-TD", SOURCE)
+    assert match["translatedText"] == "correction"
+    # Devenue une correction, l'entrée sert aussi la recherche floue
+    assert memory.lookup("fr", "ar-TD", "Le chien mange la viande rouge !")["translatedText"] == "correction"
+
+
+def test_many_similar_model_outputs_do_not_hide_a_correction():
+    memory = _memory(threshold=0.8)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for first in letters:
+        for second in letters:
+            memory.add("fr", "ar-TD", f"{SOURCE} {first}{second}", f"sortie {first}{second}")
+    memory.add_correction("fr", "ar-TD", f"{SOURCE} !!", "correction")
+
+    match = memory.lookup("fr", "ar-TD", f"{SOURCE} ?")
+    assert match is not None and match["translatedText"] == "correction"
+    # Les sorties du modèle restent servies pour leur source exacte
+    assert memory.lookup("fr", "ar-TD", f"{SOURCE} zz")["translatedText"] == "sortie zz"
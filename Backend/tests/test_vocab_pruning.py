@@ -0,0 +1,66 @@
+import pytest
+
+from vocab_pruning import PrunedVocabTokenizer, collect_used_token_ids, load_tokenizer, prune_checkpoint
+
+PAIRS = [("Bonjour tout le monde.", "salam aleekum"), ("Le chien mange.", "al kalib yaakul")]
+
+
+@pytest.fixture(scope="module")
+def pruned(tiny_model_dir, tiny_model_config, tmp_path_factory):
+    from transformers import AutoTokenizer
+
+    base = AutoTokenizer.from_pretrained(tiny_model_dir)
+    kept_ids = collect_used_token_ids(base, tiny_model_config, PAIRS)
+    output_dir = str(tmp_path_factory.mktemp("pruned"))
+    report = prune_checkpoint(tiny_model_dir, output_dir, kept_ids)
+    return base, kept_ids, output_dir, report
+
+
+def test_pruned_tokenizer_maps_ids_both_ways(pruned):
+    base, kept_ids, output_dir, report = pruned
+    tokenizer = load_tokenizer(output_dir)
+    assert isinstance(tokenizer, PrunedVocabTokenizer)
+    assert report["prunedVocabSize"] == len(kept_ids) < report["originalVocabSize"]
+
+    base.src_lang = tokenizer.src_lang = "fra_Latn"
+    original = base("Bonjour tout le monde.")["input_ids"]
+    mapped = tokenizer("Bonjour tout le monde.")["input_ids"]
+    assert mapped == [kept_ids.index(old_id) for old_id in original]
+    assert tokenizer.decode(mapped, skip_special_tokens=True) == base.decode(original, skip_special_tokens=True)
+    assert tokenizer.convert_tokens_to_ids("__arb_Latn__") == kept_ids.index(base.convert_tokens_to_ids("__arb_Latn__"))
+
+
+def test_removed_token_is_spelled_with_kept_characters(pruned):
+    base, kept_ids, output_dir, _ = pruned
+    tokenizer = load_tokenizer(output_dir)
+    removed = next(
+        old_id for piece, old_id in sorted(base.get_vocab().items(), key=lambda item: item[1])
+        if old_id not in kept_ids and len(piece.replace("▁", "")) > 2 and piece.replace("▁", "").isalpha()
+    )
+
+    spelled = tokenizer.map_ids([removed])
+    assert len(spelled) == len(base.convert_ids_to_tokens(removed).replace("▁", ""))
+    assert tokenizer.unk_token_id not in spelled
+    assert tokenizer.decode(spelled).strip() == base.decode([removed]).strip()
+
+
+def test_pruned_model_keeps_the_logits_of_kept_tokens(pruned, tiny_model_dir):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    base, kept_ids, output_dir, _ = pruned
+    tokenizer = load_tokenizer(output_dir)
+    original_model = AutoModelForSeq2SeqLM.from_pretrained(tiny_model_dir).eval()
+    pruned_model = AutoModelForSeq2SeqLM.from_pretrained(output_dir).eval()
+
+    base.src_lang = tokenizer.src_lang = "fra_Latn"
+    original_inputs = base("Le chien mange.", return_tensors="pt")
+    pruned_inputs = tokenizer("Le chien mange.", return_tensors="pt")
+    start = [[base.convert_tokens_to_ids("__arb_Latn__")]]
+    with torch.no_grad():
+        original_logits = original_model(**original_inputs, decoder_input_ids=torch.tensor(start)).logits
+        pruned_logits = pruned_model(
+            **pruned_inputs, decoder_input_ids=torch.tensor([[kept_ids.index(start[0][0])]])
+        ).logits
+
+    assert torch.allclose(pruned_logits, original_logits[..., kept_ids], atol=1e-5)
@@ -0,0 +1,63 @@
+import os
+import signal
+import time
+
+import pytest
+
+from worker_pool import InferenceWorkerPool
+
+TEXTS = ["Bonjour tout le monde, comment allez-vous aujourd'hui ?"] * 32
+
+
+@pytest.fixture(scope="module")
+def pool(tiny_model_config):
+    pool = InferenceWorkerPool()
+    pool.num_workers = 1
+    pool.model_configs = {"fr_to_ar-TD": tiny_model_config}
+    pool.result_timeout = 120.0
+    # Premier batch : démarrage du worker (import de torch) et chargement du modèle
+    pool.translate_batch("fr_to_ar-TD", ["Bonjour."])
+    yield pool
+    pool.shutdown()
+
+
+def test_dead_worker_fails_its_batch_and_is_respawned(pool):
+    future = pool.submit("fr_to_ar-TD", TEXTS, profile="quality")
+    time.sleep(0.05)
+    os.kill(pool._workers[0].process.pid, signal.SIGKILL)
+
+    with pytest.raises(RuntimeError, match="s'est arrêté"):
+        future.result(timeout=10)
+    assert pool.stats()["pendingBatches"] == 0
+
+    assert len(pool.translate_batch("fr_to_ar-TD", ["Salut."])) == 1
+    assert pool.stats()["restarts"] >= 1
+    assert pool.stats()["alive"] == 1
+
+
+def test_batch_wait_is_bounded(pool):
+    with pytest.raises(TimeoutError, match="Aucune réponse"):
+        pool.translate_batch("fr_to_ar-TD", TEXTS, timeout=0.01)
+    assert pool.stats()["pendingBatches"] == 0
+
+
+def test_wait_defaults_to_the_deadline(pool):
+    started = time.perf_counter()
+    pool.result_timeout = 0.01
+    try:
+        assert pool.translate_batch("fr_to_ar-TD", ["Salut."], deadline=time.monotonic() + 60)
+    finally:
+        pool.result_timeout = 120.0
+    assert time.perf_counter() - started < 60
+
+
+def test_worker_metrics_reach_the_parent(pool):
+    from metrics import GENERATIONS
+
+    def generations():
+        return sum(value for key, value in GENERATIONS._values.items() if key[0] == "fr_to_ar-TD")
+
+    before = generations()
+    pool.translate_batch("fr_to_ar-TD", ["Salut."])
+
+    assert generations() == before + 1
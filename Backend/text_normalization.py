@@ -0,0 +1,36 @@
+# backend/text_normalization.py
+# Normalisation Unicode partagée par le cache / la mémoire de traduction (clés de
+# recherche) et la préparation du corpus (flask preprocess-corpus) : une phrase du
+# corpus et la même phrase saisie dans l'interface doivent avoir la même forme.
+import re
+import unicodedata
+
+# Variantes Unicode présentes dans le corpus (tirets insécables U+2011, apostrophes
+# modificatrices U+02BC, etc.) ramenées à leur forme ASCII.
+CHAR_FOLDING = str.maketrans({
+    "\u2010": "-",  # trait d'union
+    "\u2011": "-",  # trait d'union insécable
+    "\u2012": "-",
+    "\u2013": "-",
+    "\u2014": "-",
+    "\u2212": "-",
+    "\u02bc": "'",  # lettre modificative apostrophe
+    "\u02bb": "'",
+    "\u2018": "'",
+    "\u2019": "'",
+    "\u00b4": "'",
+    "`": "'",
+    "\u00a0": " ",  # espace insécable
+    "\u202f": " ",
+})
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fold_characters(text):
+    """NFKC puis repli des tirets, apostrophes et espaces insécables sur leur forme ASCII."""
+    return unicodedata.normalize("NFKC", text).translate(CHAR_FOLDING)
+
+
+def collapse_whitespace(text):
+    """Remplace toute suite de blancs par une espace et retire ceux des extrémités."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
@@ -0,0 +1,148 @@
+# backend/translation_cache.py
+# Cache des résultats de traduction, indexé par (direction, texte source normalisé).
+# Les phrases courtes (salutations, versets bibliques...) reviennent très souvent :
+# un hit évite complètement le passage encodeur + décodeur NLLB.
+import sys
+import threading
+from collections import OrderedDict
+from models import Translation, db
+from text_normalization import collapse_whitespace, fold_characters
+
+# Surcoût approximatif (en octets) d'une entrée : tuple de clé, noeud de l'OrderedDict...
+_ENTRY_OVERHEAD = 200
+
+
+def normalize_text(text):
+    """Forme canonique d'un texte source utilisée comme clé de cache."""
+    return collapse_whitespace(fold_characters(text or "")).casefold()
+
+
+class TranslationCache:
+    """Cache LRU borné à la fois en nombre d'entrées et en mémoire estimée.
+
+    Les corrections des utilisateurs remplacent la sortie du modèle pour la même
+    source et ne sont jamais écrasées par une nouvelle sortie du modèle.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get("TRANSLATION_CACHE_MAX_ENTRIES", self.max_entries)
+        self.max_bytes = app.config.get("TRANSLATION_CACHE_MAX_BYTES", self.max_bytes)
+        warmup_size = app.config.get("TRANSLATION_CACHE_WARMUP_SIZE", 0)
+        if warmup_size:
+            with app.app_context():
+                try:
+                    loaded = self.warm_up(warmup_size)
+                    print(f"Cache de traduction préchargé avec {loaded} entrées.")
+                except Exception as e:
+                    print(f"Avertissement: préchargement du cache de traduction impossible: {e}")
+
+    @staticmethod
+    def _key(from_lang, to_lang, source_text):
+        return (from_lang, to_lang, normalize_text(source_text))
+
+    @staticmethod
+    def _entry_size(key, translated_text):
+        return sys.getsizeof(key[2]) + sys.getsizeof(translated_text) + _ENTRY_OVERHEAD
+
+    def get(self, from_lang, to_lang, source_text):
+        key = self._key(from_lang, to_lang, source_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, from_lang, to_lang, source_text, translated_text, is_correction=False):
+        key = self._key(from_lang, to_lang, source_text)
+        if not key[2] or not translated_text:
+            return
+        size = self._entry_size(key, translated_text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Une sortie du modèle ne remplace jamais une correction utilisateur.
+                if existing[1] and not is_correction:
+                    self._entries.move_to_end(key)
+                    return
+                self._bytes -= existing[2]
+            self._entries[key] = (translated_text, is_correction, size)
+            self._entries.move_to_end(key)
+            self._bytes += size
+            self._evict()
+
+    def put_correction(self, from_lang, to_lang, source_text, corrected_text):
+        self.put(from_lang, to_lang, source_text, corrected_text, is_correction=True)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def warm_up(self, limit):
+        """Précharge les `limit` sources les plus fréquentes de la table Translation.
+
+        Doit être appelé dans un contexte d'application. Pour chaque source, la
+        correction la plus récente l'emporte sur la traduction d'origine.
+        """
+        frequent = (
+            db.session.query(Translation.from_lang, Translation.to_lang, Translation.source_text)
+            .group_by(Translation.from_lang, Translation.to_lang, Translation.source_text)
+            .order_by(db.func.count(Translation.id).desc())
+            .limit(limit)
+            .all()
+        )
+        if not frequent:
+            return 0
+
+        wanted = {(row.from_lang, row.to_lang, row.source_text) for row in frequent}
+        rows = (
+            Translation.query
+            .filter(Translation.source_text.in_(list({source for _, _, source in wanted})))
+            .order_by(Translation.timestamp.asc(), Translation.id.asc())
+            .all()
+        )
+        # Parcours chronologique : la dernière correction (ou, à défaut, la dernière
+        # traduction) de chaque source reste dans le cache.
+        for row in rows:
+            if (row.from_lang, row.to_lang, row.source_text) in wanted:
+                self.put(row.from_lang, row.to_lang, row.source_text, row.translated_text,
+                         is_correction=bool(row.is_correction))
+        return len(self._entries)
+
+
+translation_cache = TranslationCache()
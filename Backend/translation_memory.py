@@ -0,0 +1,268 @@
+# backend/translation_memory.py
+# Mémoire de traduction construite à partir de la table Translation.
+# Les corrections des utilisateurs (is_correction) et les traductions d'origine sont
+# indexées par direction ; pour une même source, la correction la plus récente l'emporte.
+# /api/translate interroge la mémoire avant le modèle : une correspondance exacte, ou
+# floue au-dessus du seuil, évite complètement model.generate.
+# Seules les corrections servent à la recherche floue : une sortie du modèle n'est
+# réutilisée que pour la même source exacte (une phrase proche, par exemple la même
+# phrase à la forme négative, peut avoir un sens opposé).
+#
+# Recherche floue : signature MinHash (hachage à permutation unique, K compartiments)
+# des trigrammes de caractères du texte normalisé, indexée par LSH en bandes. Une
+# recherche ne lit que les quelques entrées qui partagent une bande avec la requête,
+# quel que soit le nombre d'entrées (< 1 ms à ~1M), puis vérifie chaque candidat avec
+# le score exact : coefficient de Dice entre ensembles de trigrammes. Seules les
+# corrections sont dans les bandes LSH. Compter ~1,5 Ko de mémoire par correction
+# (textes, index exact et bandes LSH) et un peu moins par sortie du modèle.
+import re
+import threading
+from array import array
+
+from models import Translation, db
+from translation_cache import normalize_text
+
+# En dessous de cette longueur, seule la correspondance exacte est utilisée
+# (les trigrammes d'un texte très court ne discriminent pas assez).
+_MIN_FUZZY_CHARS = 12
+# Nombre maximal de candidats vérifiés par recherche floue
+_MAX_CANDIDATES = 200
+# LSH : _BANDS bandes de _ROWS valeurs MinHash. Deux textes de similarité de Jaccard
+# J (trigrammes) partagent au moins une bande avec une probabilité 1 - (1 - J^5)^10 :
+# ~99 % pour J = 0.82 (Dice 0.9), ~0.01 % pour J = 0.1.
+_BANDS = 10
+_ROWS = 5
+_NUM_BINS = _BANDS * _ROWS
+_HASH_MASK = (1 << 64) - 1
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _trigrams(normalized):
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash_signature(grams):
+    """Signature MinHash à permutation unique : minimum des hachages par compartiment.
+
+    Les compartiments vides (textes courts) reprennent la valeur du compartiment
+    non vide suivant (densification par rotation), décalée de la distance parcourue.
+    """
+    bins = [None] * _NUM_BINS
+    # hash() des chaînes varie d'un processus à l'autre : l'index n'est jamais persisté
+    for gram in grams:
+        value = hash(gram) & _HASH_MASK
+        index = value % _NUM_BINS
+        value //= _NUM_BINS
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    filled = [index for index, value in enumerate(bins) if value is not None]
+    if not filled:
+        return bins
+    for index in range(_NUM_BINS):
+        if bins[index] is None:
+            distance = next((offset for offset in range(1, _NUM_BINS) if bins[(index + offset) % _NUM_BINS] is not None))
+            bins[index] = bins[(index + distance) % _NUM_BINS] + distance * (1 << 58)
+    return bins
+
+
+def _band_keys(signature):
+    return [hash(tuple(signature[band * _ROWS:(band + 1) * _ROWS])) for band in range(_BANDS)]
+
+
+def dice_score(grams_a, grams_b):
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class _DirectionIndex:
+    """Entrées et index de trigrammes d'une direction (from_lang, to_lang)."""
+
+    def __init__(self):
+        self.sources = []        # texte source normalisé, par id d'entrée
+        self.targets = []        # traduction retenue
+        self.corrections = []    # True si la traduction retenue est une correction
+        self.gram_counts = array("H")  # nombre de trigrammes (corrections seulement)
+        self.by_source = {}      # texte normalisé -> id d'entrée
+        self.buckets = [{} for _ in range(_BANDS)]  # clé de bande -> id de correction ou array d'ids
+
+    def __len__(self):
+        return len(self.sources)
+
+    def upsert(self, normalized, translated_text, is_correction):
+        entry_id = self.by_source.get(normalized)
+        if entry_id is not None:
+            # Une traduction d'origine ne remplace jamais une correction
+            if self.corrections[entry_id] and not is_correction:
+                return False
+            if is_correction and not self.corrections[entry_id]:
+                self._index_fuzzy(entry_id, normalized)
+            self.targets[entry_id] = translated_text
+            self.corrections[entry_id] = is_correction
+            return False
+
+        entry_id = len(self.sources)
+        self.sources.append(normalized)
+        self.targets.append(translated_text)
+        self.corrections.append(is_correction)
+        self.gram_counts.append(0)
+        self.by_source[normalized] = entry_id
+        if is_correction:
+            self._index_fuzzy(entry_id, normalized)
+        return True
+
+    def _index_fuzzy(self, entry_id, normalized):
+        """Ajoute une correction aux bandes LSH. Les sorties du modèle n'y entrent pas :
+        elles ne servent qu'à la correspondance exacte et prendraient la place des
+        corrections parmi les _MAX_CANDIDATES candidats d'une recherche."""
+        grams = _trigrams(normalized)
+        self.gram_counts[entry_id] = min(len(grams), 0xFFFF)
+        for bucket, key in zip(self.buckets, _band_keys(minhash_signature(grams))):
+            # Un seul id (cas courant) est stocké tel quel, pour limiter la mémoire
+            existing = bucket.get(key)
+            if existing is None:
+                bucket[key] = entry_id
+            elif isinstance(existing, int):
+                bucket[key] = array("I", (existing, entry_id))
+            else:
+                existing.append(entry_id)
+
+    def lookup(self, normalized, threshold):
+        entry_id = self.by_source.get(normalized)
+        if entry_id is not None:
+            return entry_id, 1.0
+        if threshold >= 1.0 or len(normalized) < _MIN_FUZZY_CHARS:
+            return None, 0.0
+
+        query_grams = _trigrams(normalized)
+        candidates = set()
+        for bucket, key in zip(self.buckets, _band_keys(minhash_signature(query_grams))):
+            found = bucket.get(key)
+            if found is None:
+                continue
+            if isinstance(found, int):
+                candidates.add(found)
+            else:
+                candidates.update(found[:_MAX_CANDIDATES])
+            if len(candidates) >= _MAX_CANDIDATES:
+                break
+
+        # Bornes de taille : Dice >= t  =>  |C| entre t·|Q|/(2-t) et |Q|·(2-t)/t
+        min_size = threshold * len(query_grams) / (2 - threshold)
+        max_size = len(query_grams) * (2 - threshold) / threshold
+        query_digits = _DIGITS_RE.findall(normalized)
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            if not min_size <= self.gram_counts[candidate] <= max_size:
+                continue
+            source = self.sources[candidate]
+            # Un nombre différent (versets, quantités) change le sens de la phrase
+            if _DIGITS_RE.findall(source) != query_digits:
+                continue
+            score = dice_score(query_grams, _trigrams(source))
+            if score > best_score:
+                best_id, best_score = candidate, score
+        if best_score >= threshold:
+            return best_id, best_score
+        return None, 0.0
+
+
+class TranslationMemory:
+    """Mémoire de traduction en mémoire, mise à jour entrée par entrée."""
+
+    def __init__(self, threshold=0.9):
+        self.enabled = True
+        self.threshold = threshold
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.ready = False
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("TRANSLATION_MEMORY_ENABLED", self.enabled)
+        self.threshold = app.config.get("TRANSLATION_MEMORY_THRESHOLD", self.threshold)
+        if not self.enabled:
+            return
+
+        def build():
+            with app.app_context():
+                try:
+                    loaded = self.load_from_db()
+                    print(f"Mémoire de traduction construite avec {loaded} entrées.")
+                except Exception as e:
+                    print(f"Avertissement: construction de la mémoire de traduction impossible: {e}")
+
+        # Construite en arrière-plan : les requêtes passent par le modèle en attendant
+        threading.Thread(target=build, name="translation-memory", daemon=True).start()
+
+    def add(self, from_lang, to_lang, source_text, translated_text, is_correction=False):
+        normalized = normalize_text(source_text)
+        if not self.enabled or not normalized or not translated_text:
+            return
+        with self._lock:
+            index = self._indexes.get((from_lang, to_lang))
+            if index is None:
+                index = self._indexes[(from_lang, to_lang)] = _DirectionIndex()
+            index.upsert(normalized, translated_text, bool(is_correction))
+
+    def add_correction(self, from_lang, to_lang, source_text, corrected_text):
+        self.add(from_lang, to_lang, source_text, corrected_text, is_correction=True)
+
+    def lookup(self, from_lang, to_lang, source_text, threshold=None):
+        """Renvoie {translatedText, score, matchedSource, isCorrection} ou None."""
+        if not self.enabled:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        normalized = normalize_text(source_text)
+        with self._lock:
+            index = self._indexes.get((from_lang, to_lang))
+            entry_id, score = index.lookup(normalized, threshold) if index is not None else (None, 0.0)
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if score < 1.0:
+                self.fuzzy_hits += 1
+            return {
+                "translatedText": index.targets[entry_id],
+                "score": round(score, 4),
+                "matchedSource": index.sources[entry_id],
+                "isCorrection": index.corrections[entry_id],
+            }
+
+    def load_from_db(self, batch_size=5000):
+        """Indexe toute la table Translation, dans l'ordre chronologique.
+
+        Doit être appelé dans un contexte d'application. Les lignes sont lues par
+        lots (yield_per) pour ne pas matérialiser la table entière.
+        """
+        rows = (
+            db.session.query(Translation.from_lang, Translation.to_lang, Translation.source_text,
+                             Translation.translated_text, Translation.is_correction)
+            .order_by(Translation.timestamp.asc(), Translation.id.asc())
+            .yield_per(batch_size)
+        )
+        for row in rows:
+            self.add(row.from_lang, row.to_lang, row.source_text, row.translated_text, row.is_correction)
+        self.ready = True
+        return sum(len(index) for index in self._indexes.values())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "threshold": self.threshold,
+                "entries": {f"{src}_to_{tgt}": len(index) for (src, tgt), index in self._indexes.items()},
+                "hits": self.hits,
+                "fuzzyHits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+translation_memory = TranslationMemory()
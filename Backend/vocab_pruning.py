@@ -0,0 +1,241 @@
+# backend/vocab_pruning.py
+# Réduction du vocabulaire des checkpoints NLLB aux tokens réellement utilisés.
+# NLLB partage ~256k tokens entre 200 langues ; nos deux directions n'utilisent que le
+# français et l'arabe tchadien en écriture latine. Le checkpoint réduit ne garde que
+# les lignes utiles des embeddings et de la tête de sortie (liées) : moins de RAM, et un
+# softmax bien plus petit à chaque pas de décodage.
+#
+# Le tokenizer d'origine est conservé tel quel dans le dossier réduit, avec
+# pruned_vocab.json (ids d'origine gardés, dans l'ordre des nouveaux ids) ;
+# load_tokenizer() l'enveloppe dans PrunedVocabTokenizer, qui convertit les ids dans
+# les deux sens. Un token retiré (mot jamais vu) est réécrit en caractères isolés,
+# tous conservés. Le dossier réduit se sert comme n'importe quel checkpoint :
+# "id": "<dossier>" dans MODEL_CONFIGS (ou le fichier du registre).
+import json
+import os
+
+import numpy as np
+
+PRUNED_VOCAB_FILE = "pruned_vocab.json"
+_SPACE_PIECE = "▁"
+_GENERATION_TOKEN_FIELDS = ("bos_token_id", "eos_token_id", "pad_token_id", "decoder_start_token_id",
+                            "forced_bos_token_id", "forced_eos_token_id")
+
+
+class PrunedVocabTokenizer:
+    """Tokenizer d'origine dont les ids sont convertis vers le vocabulaire réduit.
+
+    Couvre ce qu'utilisent inference.py, worker_pool.py et corpus_preprocessing.py :
+    appel (avec text_target), pad, convert_tokens_to_ids, decode / batch_decode ;
+    le reste est délégué au tokenizer d'origine.
+    """
+
+    def __init__(self, base_tokenizer, kept_ids):
+        self.base = base_tokenizer
+        self.kept_ids = np.asarray(kept_ids, dtype=np.int64)
+        self.unk_token_id = self._new_id_or_none(base_tokenizer.unk_token_id)
+        self._old_to_new = np.full(max(len(base_tokenizer), int(self.kept_ids.max()) + 1), -1, dtype=np.int64)
+        self._old_to_new[self.kept_ids] = np.arange(len(self.kept_ids))
+        self._fallbacks = {}
+        # pad() et generate() utilisent les ids spéciaux tels quels : ils ne doivent pas bouger
+        for special_id in (base_tokenizer.pad_token_id, base_tokenizer.eos_token_id, base_tokenizer.bos_token_id):
+            if special_id is not None and self._old_to_new[special_id] != special_id:
+                raise ValueError(f"Vocabulaire réduit invalide : le token spécial {special_id} a changé d'id.")
+
+    def _new_id_or_none(self, old_id):
+        positions = np.flatnonzero(self.kept_ids == old_id) if old_id is not None else []
+        return int(positions[0]) if len(positions) else None
+
+    def __len__(self):
+        return len(self.kept_ids)
+
+    def __getattr__(self, name):
+        if name == "base":
+            raise AttributeError(name)
+        return getattr(self.base, name)
+
+    @property
+    def src_lang(self):
+        return self.base.src_lang
+
+    @src_lang.setter
+    def src_lang(self, value):
+        self.base.src_lang = value
+
+    @property
+    def tgt_lang(self):
+        return self.base.tgt_lang
+
+    @tgt_lang.setter
+    def tgt_lang(self, value):
+        self.base.tgt_lang = value
+
+    # --- Ids d'origine -> ids réduits ---
+
+    def _fallback(self, old_id):
+        """Ids réduits d'un token retiré : ses caractères un à un (le 1er avec ▁ si besoin)."""
+        new_ids = self._fallbacks.get(old_id)
+        if new_ids is None:
+            piece = self.base.convert_ids_to_tokens(int(old_id))
+            new_ids = []
+            for index, char in enumerate(piece.replace(_SPACE_PIECE, "") if piece else ""):
+                candidates = [f"{_SPACE_PIECE}{char}", char] if index == 0 and piece.startswith(_SPACE_PIECE) else [char]
+                for candidate in candidates:
+                    candidate_id = self.base.convert_tokens_to_ids(candidate)
+                    if candidate_id is not None and self._old_to_new[candidate_id] >= 0 and candidate_id != self.base.unk_token_id:
+                        new_ids.append(int(self._old_to_new[candidate_id]))
+                        break
+                else:
+                    new_ids.append(self.unk_token_id)
+            self._fallbacks[old_id] = new_ids = new_ids or [self.unk_token_id]
+        return new_ids
+
+    def map_ids(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        mapped = self._old_to_new[ids]
+        if (mapped >= 0).all():
+            return mapped.tolist()
+        result = []
+        for old_id, new_id in zip(ids.tolist(), mapped.tolist()):
+            result.extend(self._fallback(old_id) if new_id < 0 else [new_id])
+        return result
+
+    def __call__(self, *args, **kwargs):
+        return_tensors = kwargs.pop("return_tensors", None)
+        padding = kwargs.pop("padding", False)
+        encoded = self.base(*args, **kwargs)
+        single = bool(encoded["input_ids"]) and isinstance(encoded["input_ids"][0], int)
+        mapped = [self.map_ids(ids) for ids in ([encoded["input_ids"]] if single else encoded["input_ids"])]
+        # Un token retiré peut devenir plusieurs caractères : masque recalculé
+        batch = {"input_ids": mapped, "attention_mask": [[1] * len(ids) for ids in mapped]}
+        if padding or return_tensors:
+            return self.base.pad(batch, padding=padding or "longest", return_tensors=return_tensors)
+        encoded["input_ids"] = mapped[0] if single else mapped
+        if "attention_mask" in encoded:
+            encoded["attention_mask"] = batch["attention_mask"][0] if single else batch["attention_mask"]
+        return encoded
+
+    def convert_tokens_to_ids(self, tokens):
+        old_ids = self.base.convert_tokens_to_ids(tokens)
+        if isinstance(tokens, str):
+            return self._new_id_or_unk(old_ids)
+        return [self._new_id_or_unk(old_id) for old_id in old_ids]
+
+    def _new_id_or_unk(self, old_id):
+        if old_id is None or old_id >= len(self._old_to_new) or self._old_to_new[old_id] < 0:
+            return self.unk_token_id
+        return int(self._old_to_new[old_id])
+
+    # --- Ids réduits -> ids d'origine ---
+
+    def _to_old(self, ids):
+        if hasattr(ids, "tolist"):
+            ids = ids.tolist()
+        return self.kept_ids[np.asarray(ids, dtype=np.int64)].tolist()
+
+    def decode(self, token_ids, **kwargs):
+        return self.base.decode(self._to_old(token_ids), **kwargs)
+
+    def batch_decode(self, sequences, **kwargs):
+        return [self.decode(ids, **kwargs) for ids in sequences]
+
+    def convert_ids_to_tokens(self, ids, **kwargs):
+        if isinstance(ids, int):
+            return self.base.convert_ids_to_tokens(int(self.kept_ids[ids]), **kwargs)
+        return self.base.convert_ids_to_tokens(self._to_old(ids), **kwargs)
+
+
+def load_tokenizer(model_id):
+    """AutoTokenizer, enveloppé dans PrunedVocabTokenizer pour un checkpoint réduit."""
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    vocab_path = os.path.join(model_id, PRUNED_VOCAB_FILE)
+    if os.path.isfile(vocab_path):
+        with open(vocab_path, encoding="utf-8") as vocab_file:
+            tokenizer = PrunedVocabTokenizer(tokenizer, json.load(vocab_file)["keptIds"])
+    return tokenizer
+
+
+def collect_used_token_ids(tokenizer, model_config, corpus_pairs, history_pairs=(), batch_size=1000):
+    """Ids d'origine nécessaires à une direction (ensemble trié).
+
+    Sont gardés : les tokens des phrases source et cible (corpus + historique), les
+    tokens spéciaux, les codes des deux langues (formes "fra_Latn" et "__fra_Latn__",
+    cette dernière étant celle que cherche perform_batch_translation) et tous les
+    caractères isolés du vocabulaire, pour pouvoir épeler un mot jamais vu.
+    """
+    used = set(tokenizer.all_special_ids)
+    for lang in (model_config["source_lang_nllb"], model_config["target_lang_nllb"]):
+        for token in (lang, f"__{lang}__"):
+            token_id = tokenizer.convert_tokens_to_ids(token)
+            if token_id is not None and token_id != tokenizer.unk_token_id:
+                used.add(token_id)
+    for piece, token_id in tokenizer.get_vocab().items():
+        if len(piece.replace(_SPACE_PIECE, "")) <= 1:
+            used.add(token_id)
+
+    tokenizer.src_lang = model_config["source_lang_nllb"]
+    tokenizer.tgt_lang = model_config["target_lang_nllb"]
+    pairs = list(corpus_pairs) + list(history_pairs)
+    for start in range(0, len(pairs), batch_size):
+        chunk = pairs[start:start + batch_size]
+        for ids in tokenizer([source for source, _ in chunk])["input_ids"]:
+            used.update(ids)
+        for ids in tokenizer(text_target=[target for _, target in chunk])["input_ids"]:
+            used.update(ids)
+    return sorted(used)
+
+
+def prune_checkpoint(model_id, output_dir, kept_ids, metadata=None):
+    """Écrit dans `output_dir` le modèle réduit aux ids `kept_ids` (triés) et son tokenizer."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    kept_ids = sorted(kept_ids)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_id)
+    index = torch.tensor(kept_ids, dtype=torch.long)
+    old_to_new = {old_id: new_id for new_id, old_id in enumerate(kept_ids)}
+
+    # Toutes les couches qui partagent la matrice d'embedding (shared, encoder/decoder
+    # embed_tokens, lm_head liée) reçoivent la même matrice réduite.
+    old_weight = model.get_input_embeddings().weight
+    new_weight = torch.nn.Parameter(old_weight.data[index].clone())
+    for module in model.modules():
+        if isinstance(module, torch.nn.Embedding) and module.weight is old_weight:
+            module.weight = new_weight
+            module.num_embeddings = len(kept_ids)
+            if module.padding_idx is not None:
+                module.padding_idx = old_to_new.get(module.padding_idx)
+    output_embeddings = model.get_output_embeddings()
+    if output_embeddings is not None:
+        if output_embeddings.weight is old_weight:
+            output_embeddings.weight = new_weight
+        else:
+            output_embeddings.weight = torch.nn.Parameter(output_embeddings.weight.data[index].clone())
+        output_embeddings.out_features = len(kept_ids)
+        if getattr(output_embeddings, "bias", None) is not None:
+            output_embeddings.bias = torch.nn.Parameter(output_embeddings.bias.data[index].clone())
+    final_logits_bias = getattr(model, "final_logits_bias", None)
+    if final_logits_bias is not None:
+        model.final_logits_bias = final_logits_bias[:, index].clone()
+
+    model.config.vocab_size = len(kept_ids)
+    for config in (model.config, model.generation_config):
+        for field in _GENERATION_TOKEN_FIELDS:
+            value = getattr(config, field, None)
+            if isinstance(value, int):
+                setattr(config, field, old_to_new.get(value))
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, PRUNED_VOCAB_FILE), "w", encoding="utf-8") as vocab_file:
+        json.dump({"sourceModel": model_id, "originalVocabSize": len(tokenizer), "keptIds": kept_ids,
+                   **(metadata or {})}, vocab_file)
+    return {
+        "originalVocabSize": len(tokenizer),
+        "prunedVocabSize": len(kept_ids),
+        "parameters": sum(parameter.numel() for parameter in model.parameters()),
+    }
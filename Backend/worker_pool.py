@@ -0,0 +1,333 @@
+# backend/worker_pool.py
+# Pool de processus d'inférence dédiés.
+# Les threads Flask partagent un seul modèle et se disputent le GIL et le pool de
+# threads intra-op de torch. Ici, N processus indépendants traduisent en parallèle :
+#   - chaque worker fixe son nombre de threads torch (pas de sur-souscription) ;
+#   - les poids sont chargés depuis safetensors en mmap (load_torch_model_mmap),
+#     donc partagés copy-on-write via le cache de fichiers au lieu d'être dupliqués ;
+#   - chaque worker a ses propres tokenizers (pas de course sur tokenizer.src_lang) ;
+#   - chaque worker charge ses modèles dans son propre ModelRegistry, avec une part
+#     égale du budget mémoire (MODEL_MEMORY_BUDGET_MB / nombre de workers) ;
+#   - le serveur web envoie chaque batch au worker le moins chargé par sa connexion ;
+#   - un worker mort est détecté (fin du processus), ses batches échouent et il est relancé ;
+#   - les métriques du worker (étapes, tokens, generate) sont renvoyées avant chaque résultat.
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from metrics import registry as metrics_registry
+from model_registry import model_registry
+
+_STOP = None
+
+
+def _load_worker_model(model_config):
+    from inference_backends import DEFAULT_BACKEND, load_backend_model, load_torch_model_mmap
+    from vocab_pruning import load_tokenizer
+
+    backend = model_config.get("backend", DEFAULT_BACKEND)
+    tokenizer = load_tokenizer(model_config["id"])
+    if backend == "torch":
+        try:
+            return tokenizer, load_torch_model_mmap(model_config["id"]), "cpu"
+        except Exception as e:
+            print(f"Worker {os.getpid()}: chargement mmap impossible pour '{model_config['id']}' ({e}), chargement classique.")
+    model, device = load_backend_model(model_config["id"], backend, "cpu")
+    return tokenizer, model, device
+
+
+def _worker_main(worker_index, model_configs, num_threads, preload, conn, memory_budget_bytes=0):
+    """Boucle d'un worker : reçoit (id, direction, textes, profil, budget) et renvoie (id, traductions, erreur).
+
+    Le budget (secondes restantes avant l'échéance, ou None) est reconverti en échéance
+    sur l'horloge du worker. Les modèles sont évincés (LRU) au-delà de `memory_budget_bytes`.
+    """
+    import torch
+    from inference import perform_batch_translation
+    from inference_backends import DEFAULT_BACKEND
+    from model_registry import ModelRegistry
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    registry = ModelRegistry(memory_budget_bytes)
+
+    def model_lease(model_key):
+        model_config = model_configs[model_key]
+        return registry.lease(
+            (model_config["id"], model_config.get("backend", DEFAULT_BACKEND)),
+            lambda: _load_worker_model(model_config), model_config.get("pinned", False)
+        )
+
+    started = time.perf_counter()
+    if preload:
+        for model_key in model_configs:
+            try:
+                with model_lease(model_key):
+                    pass
+            except Exception as e:
+                print(f"Worker {worker_index}: préchargement de '{model_key}' impossible: {e}")
+    conn.send(("ready", worker_index, round(time.perf_counter() - started, 3)))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is _STOP:
+            break
+        request_id, model_key, texts, profile, time_budget = message
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        try:
+            model_config = model_configs[model_key]
+            with model_lease(model_key) as (tokenizer, model, device):
+                translations = perform_batch_translation(
+                    texts, tokenizer, model, device,
+                    model_config["source_lang_nllb"], model_config["target_lang_nllb"],
+                    direction=model_key, profile=profile, deadline=deadline
+                )
+            result = ("result", request_id, translations)
+        except Exception as e:
+            result = ("error", request_id, f"{type(e).__name__}: {str(e)}")
+        # Métriques du batch d'abord : elles sont fusionnées avant que la requête soit servie
+        conn.send(("metrics", worker_index, metrics_registry.drain()))
+        conn.send(result)
+
+
+class _WorkerSlot:
+    """Un processus worker, sa connexion et les batches qui lui ont été confiés."""
+
+    def __init__(self, index, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.assigned = set()
+
+
+class InferenceWorkerPool:
+    """Répartit les batches de traduction sur des processus workers.
+
+    Chaque worker a sa propre connexion (Pipe) : le thread de résultats surveille à la
+    fois les connexions et la fin des processus. Les batches d'un worker mort sont mis
+    en échec tout de suite et le worker est relancé.
+    """
+
+    # Marge ajoutée à l'échéance d'un batch pour recevoir sa réponse
+    RESULT_GRACE_SECONDS = 1.0
+
+    def __init__(self):
+        self.num_workers = 0
+        self.threads_per_worker = 1
+        self.preload = False
+        self.model_configs = {}
+        self.result_timeout = 30.0
+        # Budget mémoire des modèles de chaque worker (0 = illimité)
+        self.worker_budget_bytes = 0
+        self._context = None
+        self._workers = []
+        self._pending = {}
+        self._ready_workers = {}
+        self._restarts = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self._stopping = False
+
+    @property
+    def enabled(self):
+        return self.num_workers > 0
+
+    def init_app(self, app):
+        from inference import MODEL_CONFIGS
+
+        self.num_workers = app.config.get("INFERENCE_WORKERS", 0)
+        self.threads_per_worker = app.config.get("INFERENCE_THREADS_PER_WORKER") or max(
+            1, (os.cpu_count() or 1) // max(1, self.num_workers)
+        )
+        self.preload = app.config.get("PRELOAD_MODELS", False)
+        # Attente maximale d'un batch sans échéance (même borne que la file d'admission)
+        self.result_timeout = app.config.get("INFERENCE_QUEUE_TIMEOUT_MS", self.result_timeout * 1000) / 1000.0
+        self.model_configs = MODEL_CONFIGS
+
+    def _spawn(self, worker_index):
+        parent_conn, child_conn = self._context.Pipe()
+        model_configs = {key: dict(config) for key, config in self.model_configs.items()}
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_index, model_configs, self.threads_per_worker, self.preload, child_conn,
+                  self.worker_budget_bytes),
+            name=f"inference-worker-{worker_index}",
+            daemon=True,
+        )
+        process.start()
+        # Seul le worker garde l'autre extrémité : sa mort ferme la connexion (EOFError)
+        child_conn.close()
+        return _WorkerSlot(worker_index, process, parent_conn)
+
+    def start(self):
+        """Démarre les workers (au premier besoin : le processus parent du reloader n'en lance pas)."""
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            # "spawn" : les workers n'héritent pas de l'état de torch (threads) du serveur web
+            self._context = multiprocessing.get_context("spawn")
+            # Le budget global (config ou fichier du registre) est partagé entre les workers
+            self.worker_budget_bytes = model_registry.budget_bytes // self.num_workers if model_registry.budget_bytes else 0
+            self._workers = [self._spawn(worker_index) for worker_index in range(self.num_workers)]
+            threading.Thread(target=self._dispatch_results, name="inference-results", daemon=True).start()
+            self._started = True
+            print(f"Pool d'inférence démarré : {self.num_workers} workers x {self.threads_per_worker} threads torch.")
+
+    def _dispatch_results(self):
+        while not self._stopping:
+            with self._lock:
+                workers = list(self._workers)
+            by_handle = {}
+            for worker in workers:
+                by_handle[worker.conn] = worker
+                by_handle[worker.process.sentinel] = worker
+            # Délai borné : la liste des workers est relue après un redémarrage ou un arrêt
+            for handle in multiprocessing.connection.wait(list(by_handle), timeout=1.0):
+                worker = by_handle[handle]
+                if worker.conn.closed:
+                    # Connexion et fin du processus signalées ensemble : déjà traité
+                    continue
+                if handle is worker.conn:
+                    try:
+                        message = worker.conn.recv()
+                    except (EOFError, OSError):
+                        self._handle_worker_exit(worker)
+                        continue
+                    self._handle_message(worker, message)
+                elif not worker.conn.poll():
+                    # Processus terminé et plus rien à lire sur sa connexion
+                    self._handle_worker_exit(worker)
+
+    def _handle_message(self, worker, message):
+        kind, key, payload = message
+        if kind == "ready":
+            self._ready_workers[key] = payload
+            return
+        if kind == "metrics":
+            metrics_registry.merge(payload)
+            return
+        with self._lock:
+            future = self._pending.pop(key, None)
+            worker.assigned.discard(key)
+        if future is None:
+            return
+        if kind == "result":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _handle_worker_exit(self, worker):
+        """Met en échec les batches d'un worker mort et le remplace (sauf pendant l'arrêt)."""
+        worker.process.join(timeout=1)
+        with self._lock:
+            if worker not in self._workers:
+                return
+            failed = [self._pending.pop(request_id, None) for request_id in worker.assigned]
+            worker.assigned.clear()
+            self._ready_workers.pop(worker.index, None)
+            replacement = None
+            if not self._stopping:
+                replacement = self._spawn(worker.index)
+                self._workers[self._workers.index(worker)] = replacement
+                self._restarts += 1
+        worker.conn.close()
+        error = RuntimeError(
+            f"Le worker d'inférence {worker.index} s'est arrêté (code {worker.process.exitcode}) pendant le batch."
+        )
+        for future in failed:
+            if future is not None:
+                future.set_exception(error)
+        if replacement is not None:
+            print(f"Worker d'inférence {worker.index} arrêté (code {worker.process.exitcode}), relancé.")
+
+    def submit(self, model_key, texts, profile=None, deadline=None):
+        """Envoie un batch au worker le moins chargé ; renvoie un Future de la liste des traductions."""
+        self.start()
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            worker = min(
+                self._workers, key=lambda candidate: (not candidate.process.is_alive(), len(candidate.assigned))
+            )
+            self._pending[request_id] = future
+            worker.assigned.add(request_id)
+        time_budget = deadline - time.monotonic() if deadline is not None else None
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, model_key, list(texts), profile, time_budget))
+        except (OSError, ValueError) as e:
+            # Worker mort entre-temps : le thread de résultats le relancera
+            with self._lock:
+                self._pending.pop(request_id, None)
+                worker.assigned.discard(request_id)
+            future.set_exception(RuntimeError(f"Le worker d'inférence {worker.index} est indisponible: {e}"))
+        return future
+
+    def translate_batch(self, model_key, texts, timeout=None, profile=None, deadline=None):
+        """Version bloquante de `submit`, toujours bornée dans le temps.
+
+        Sans `timeout`, l'attente est bornée par l'échéance (plus une marge) ou, sans
+        échéance, par INFERENCE_QUEUE_TIMEOUT_MS.
+        """
+        if timeout is None:
+            timeout = (
+                max(0.0, deadline - time.monotonic()) + self.RESULT_GRACE_SECONDS
+                if deadline is not None else self.result_timeout
+            )
+        future = self.submit(model_key, texts, profile, deadline)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                for request_id, pending in list(self._pending.items()):
+                    if pending is future:
+                        del self._pending[request_id]
+                        for worker in self._workers:
+                            worker.assigned.discard(request_id)
+            raise TimeoutError(f"Aucune réponse du pool d'inférence pour '{model_key}' après {timeout:.1f} s.")
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+            workers = list(self._workers)
+        return {
+            "workers": self.num_workers,
+            "threadsPerWorker": self.threads_per_worker,
+            "started": self._started,
+            "readyWorkers": len(self._ready_workers),
+            "alive": sum(worker.process.is_alive() for worker in workers),
+            "restarts": self._restarts,
+            "workerBudgetBytes": self.worker_budget_bytes,
+            "pendingBatches": pending,
+        }
+
+    def shutdown(self):
+        if not self._started:
+            return
+        self._stopping = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(_STOP)
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+
+
+inference_worker_pool = InferenceWorkerPool()
@@ -7,7 +7,7 @@ import TranslateButton from './TranslateButton';
 import CorrectionPanel from './CorrectionPanel';
 import CorrectionHistory from './CorrectionHistory';
 
-import { translateText } from '../utils/translator';
+import { translateTextStream } from '../utils/translator';
 
 function TranslationPanel({ user }) {
     const [sourceText, setSourceText] = useState('');
@@ -64,7 +64,8 @@ function TranslationPanel({ user }) {
         console.log("4. DEBUG TPanel: handleTranslate - States reset.");
 
         try {
-            const result = await translateText(sourceText, sourceLang, targetLang, user ? user.id : null);
+            // Le texte s'affiche au fil de la génération (Server-Sent Events)
+            const result = await translateTextStream(sourceText, sourceLang, targetLang, user ? user.id : null, setTranslatedText);
 
             if (typeof result === 'string') {
                 // Si la traduction est une simple chaîne (erreur ou réponse non formatée)
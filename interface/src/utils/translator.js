@@ -89,6 +89,91 @@ export async function translateText(text, sourceLang, targetLang, userId = null)
 }
 
 
+/**
+ * Variante de translateText qui utilise /api/translate/stream (Server-Sent Events) :
+ * le texte partiel est transmis à onPartial au fur et à mesure de la génération.
+ *
+ * @param {string} text - Le texte à traduire.
+ * @param {string} sourceLang - La langue source.
+ * @param {string} targetLang - La langue cible.
+ * @param {string | null} userId - L'ID de l'utilisateur connecté, ou null si non connecté.
+ * @param {function(string): void} onPartial - Appelée avec le texte traduit partiel.
+ * @returns {Promise<object | string>} L'objet traduit complet (avec ID) ou un message d'erreur.
+ */
+export async function translateTextStream(text, sourceLang, targetLang, userId = null, onPartial = () => {}) {
+    try {
+        const token = userId ? localStorage.getItem('authToken') : null;
+        const headers = {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        };
+        if (token) {
+            headers["Authorization"] = `Bearer ${token}`;
+        }
+
+        const res = await fetch('http://localhost:5000/api/translate/stream', {
+            method: "POST",
+            headers: headers,
+            body: JSON.stringify({
+                source_text: text,
+                from_lang: sourceLang,
+                to_lang: targetLang,
+                user_id: userId
+            })
+        });
+
+        if (!res.ok || !res.body) {
+            const errorPayload = await res.json().catch(() => ({}));
+            console.error(`HTTP error ${res.status} from /translate/stream:`, errorPayload.error || res.statusText);
+            return errorPayload.error || "Erreur de traduction.";
+        }
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let partial = '';
+        const segments = [];
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Les événements SSE sont séparés par une ligne vide.
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event: ')) eventName = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                const payload = data ? JSON.parse(data) : {};
+
+                if (eventName === 'token') {
+                    partial += payload.text;
+                    onPartial(partial);
+                } else if (eventName === 'segment') {
+                    segments[payload.index] = payload.text;
+                    onPartial(segments.filter(Boolean).join(' '));
+                } else if (eventName === 'error') {
+                    return payload.error || "Erreur de traduction.";
+                } else if (eventName === 'done') {
+                    return payload;
+                }
+            }
+        }
+        return "Erreur de traduction : flux interrompu.";
+    } catch (error) {
+        console.error("Fetch error to /translate/stream:", error);
+        return "Erreur de connexion au service.";
+    }
+}
+
+
 /**
  * Récupère l'historique des traductions depuis le backend pour un utilisateur spécifique.
  * @param {string} userId - L'ID de l'utilisateur pour lequel récupérer l'historique.
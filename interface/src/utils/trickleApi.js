@@ -47,34 +47,45 @@ export async function trickleCreateObject(type, data) {
 }
 
 // Fonction pour lister les objets (utilisée pour l'historique des traductions, y compris les corrections)
+// `limit` est la taille de chaque page : toutes les pages sont chargées en suivant l'en-tête X-Next-Cursor
 export async function trickleListObjects(type, limit = 50, includeDetails = false) {
-    console.log(`Tentative de lister les objets réels: type=${type}, limite=${limit}`);
+    console.log(`Tentative de lister les objets réels: type=${type}, taille de page=${limit}`);
 
     if (type === 'translation_correction') {
         // Pour l'historique, nous allons appeler votre route get_translations
         const token = getAuthToken();
         try {
-            const response = await fetch("http://localhost:5000/api/get_translations", {
-                method: "GET",
-                headers: {
-                    "Content-Type": "application/json",
-                    "Authorization": `Bearer ${token}`
+            // Historique paginé côté serveur (curseur keyset) : on enchaîne les pages tant que
+            // le serveur renvoie un curseur pour la suivante
+            const items = [];
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({ limit: String(limit) });
+                if (cursor) {
+                    params.set('cursor', cursor);
                 }
+                const response = await fetch(`http://localhost:5000/api/get_translations?${params.toString()}`, {
+                    method: "GET",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "Authorization": `Bearer ${token}`
+                    }
+                });
 
-            });
-        
-            if (!response.ok) {
-                const errorData = await response.json();
-                console.error(`Erreur HTTP lors de la récupération des traductions/corrections: ${response.status}`, errorData);
-                throw new Error(errorData.error || `Échec de la récupération: ${response.statusText}`);
-            }
+                if (!response.ok) {
+                    const errorData = await response.json();
+                    console.error(`Erreur HTTP lors de la récupération des traductions/corrections: ${response.status}`, errorData);
+                    throw new Error(errorData.error || `Échec de la récupération: ${response.statusText}`);
+                }
+
+                items.push(...await response.json());
+                cursor = response.headers.get('X-Next-Cursor');
+            } while (cursor);
 
-            const items = await response.json();
             console.log("Données d'historique récupérées avec succès:", items);
             // La route get_translations renvoie directement le tableau des items
             // Donc, nous mappons simplement pour correspondre à la structure attendue par correction.js si nécessaire
             return { items: items.map(item => ({ objectData: item })) };
-            
 
         } catch (error) {
             console.error('Erreur lors de l\'appel API get_translations:', error);